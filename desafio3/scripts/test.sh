@@ -37,8 +37,15 @@ curl -s $BASE_URL/products | python3 -m json.tool
 echo ""
 echo ""
 
-# 5. Obtém estatísticas
-echo "5️⃣ Obtendo estatísticas..."
+# 5. Busca produtos
+echo "5️⃣ Buscando produtos (q=pro)..."
+echo ""
+curl -s "$BASE_URL/products/search?q=pro&limit=5" | python3 -m json.tool
+echo ""
+echo ""
+
+# 6. Obtém estatísticas
+echo "6️⃣ Obtendo estatísticas..."
 echo ""
 curl -s $BASE_URL/stats | python3 -m json.tool
 echo ""
@@ -1,13 +1,22 @@
 import os
+import io
+import csv
 import json
+import hashlib
 import logging
 import sys
-from datetime import datetime, timedelta
-from flask import Flask, jsonify, request
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from fnmatch import fnmatchcase
+from flask import Flask, g, jsonify, request
+from werkzeug.http import http_date
 import psycopg2
 from psycopg2.extras import RealDictCursor
 import redis
 import time
+import random
+import threading
+from bisect import bisect_right
 
 logging.basicConfig(
     level=logging.INFO,
@@ -34,14 +43,73 @@ REDIS_CONFIG = {
 }
 
 CACHE_TTL = int(os.getenv('CACHE_TTL', 60))
+NEGATIVE_CACHE_TTL = int(os.getenv('NEGATIVE_CACHE_TTL', 10))
+SEARCH_CACHE_TTL = int(os.getenv('SEARCH_CACHE_TTL', 15))
+
+# Limites do namespace de cache de produtos (chaves product:* e products:*)
+CACHE_MAX_VALUE_BYTES = int(os.getenv('CACHE_MAX_VALUE_BYTES', 512 * 1024))
+CACHE_MEMORY_BUDGET_BYTES = int(os.getenv('CACHE_MEMORY_BUDGET_BYTES', 64 * 1024 * 1024))
+CACHE_USAGE_SAMPLE_KEYS = int(os.getenv('CACHE_USAGE_SAMPLE_KEYS', 1000))
+CACHE_USAGE_SAMPLE_INTERVAL = int(os.getenv('CACHE_USAGE_SAMPLE_INTERVAL', 30))
+# Valores até este tamanho (ex.: product:<id>) são admitidos mesmo com o orçamento esgotado
+CACHE_SMALL_VALUE_BYTES = int(os.getenv('CACHE_SMALL_VALUE_BYTES', 4 * 1024))
+CACHE_NAMESPACE = 'product'
+
+# Detecção de hot keys (count-min sketch com decaimento + top-K)
+HOT_KEY_TOP_K = int(os.getenv('HOT_KEY_TOP_K', 20))
+HOT_KEY_MIN_COUNT = int(os.getenv('HOT_KEY_MIN_COUNT', 50))
+# Entre 1e-6 e 1 (0 dividiria por zero ao escalar as contagens)
+HOT_KEY_SAMPLE_RATE = min(max(float(os.getenv('HOT_KEY_SAMPLE_RATE', 1.0)), 1e-6), 1.0)
+HOT_KEY_DECAY_INTERVAL = int(os.getenv('HOT_KEY_DECAY_INTERVAL', 60))
+HOT_KEY_PIN_TTL = int(os.getenv('HOT_KEY_PIN_TTL', 10))
+# 1 = registra todos os hits locais (randrange(0) levantaria exceção)
+HOT_KEY_LOG_SAMPLE = max(1, int(os.getenv('HOT_KEY_LOG_SAMPLE', 100)))
+SEARCH_MAX_LIMIT = 100
+# Contador incluído nas chaves de busca; incrementá-lo invalida todas de uma vez
+SEARCH_GENERATION_KEY = 'search:generation'
+
+# Limites inferiores das faixas de preço do histograma de facets
+FACET_PRICE_BUCKETS = [
+    Decimal(edge) for edge in os.getenv(
+        'FACET_PRICE_BUCKETS', '0,50,100,250,500,1000,2500,5000'
+    ).split(',')
+]
+FACET_DEFAULT_CATEGORY = 'uncategorized'
+
+IMPORT_MAX_REPORTED_ERRORS = int(os.getenv('IMPORT_MAX_REPORTED_ERRORS', 1000))
+# Chaves removidas por comando ao limpar o cache negativo após uma importação
+IMPORT_INVALIDATE_CHUNK = 1000
+IMPORT_COLUMNS = ('name', 'description', 'price', 'stock', 'category')
+# Limites da coluna stock (INTEGER)
+STOCK_MIN, STOCK_MAX = -2 ** 31, 2 ** 31 - 1
+
+# Mesma expressão usada no índice GIN, para que o planner consiga usá-lo
+SEARCH_TSVECTOR = (
+    "to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(description, ''))"
+)
 
 redis_client = None
 db_stats = {
     'queries': 0,
     'cache_hits': 0,
-    'cache_misses': 0
+    'cache_misses': 0,
+    'negative_cache_hits': 0,
+    'not_modified': 0,
+    'cache_rejected_oversize': 0,
+    'cache_rejected_budget': 0,
+    'hot_cache_hits': 0
 }
 
+# Estimativa de uso do namespace, amostrada via SCAN + MEMORY USAGE
+cache_usage = {
+    'namespace_bytes': 0,
+    'by_prefix': {},
+    'sampled_keys': 0,
+    'sampled_at': 0.0
+}
+# Impede amostragens simultâneas em background
+cache_usage_lock = threading.Lock()
+
 
 def get_redis_client():
     global redis_client
@@ -95,6 +163,18 @@ def init_database():
                            """
             )
             
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_products_name_trgm
+                ON products USING GIN (name gin_trgm_ops)
+            """)
+            
+            cursor.execute(f"""
+                CREATE INDEX IF NOT EXISTS idx_products_search_tsv
+                ON products USING GIN ({SEARCH_TSVECTOR})
+            """)
+            
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS request_logs (
                     id SERIAL PRIMARY KEY,
@@ -105,6 +185,35 @@ def init_database():
                 )
             """)
             
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS category_facets (
+                    category VARCHAR(100) PRIMARY KEY,
+                    product_count INTEGER NOT NULL DEFAULT 0,
+                    price_sum DECIMAL(14, 2) NOT NULL DEFAULT 0,
+                    min_price DECIMAL(10, 2),
+                    max_price DECIMAL(10, 2),
+                    stock_total BIGINT NOT NULL DEFAULT 0,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS category_price_histogram (
+                    category VARCHAR(100) NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    product_count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (category, bucket)
+                )
+            """)
+            
+            # Bancos criados antes dos facets precisam da carga inicial
+            cursor.execute("SELECT EXISTS (SELECT 1 FROM category_facets)")
+            facets_ready = cursor.fetchone()[0]
+            cursor.execute("SELECT EXISTS (SELECT 1 FROM products)")
+            has_products = cursor.fetchone()[0]
+            if has_products and not facets_ready:
+                rebuild_facets(cursor)
+            
             conn.commit()
             cursor.close()
             conn.close()
@@ -146,6 +255,9 @@ def init_redis():
 
 
 def log_request(endpoint, method, cache_hit=False):
+    # Hits servidos pelas cópias locais das hot keys são amostrados
+    if g.get('served_from_hot_cache') and random.randrange(HOT_KEY_LOG_SAMPLE):
+        return
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
@@ -160,7 +272,131 @@ def log_request(endpoint, method, cache_hit=False):
         logger.error(f"Erro ao registrar requisição: {e}")
 
 
-def get_from_cache(key):
+class HotKeyDetector:
+    """
+    Estima a frequência de acesso das chaves com um count-min sketch.
+    
+    As contagens caem pela metade a cada decay_interval segundos, então o
+    top-K reflete o tráfego recente. Chaves no top-K com contagem mínima
+    são consideradas quentes e ficam fixadas em memória no processo web.
+    """
+    
+    def __init__(self, width=2048, depth=4, top_k=HOT_KEY_TOP_K,
+                 min_count=HOT_KEY_MIN_COUNT, sample_rate=HOT_KEY_SAMPLE_RATE,
+                 decay_interval=HOT_KEY_DECAY_INTERVAL):
+        self.width = width
+        self.depth = depth
+        self.top_k = top_k
+        self.min_count = min_count
+        self.sample_rate = sample_rate
+        self.scale = 1 / sample_rate if sample_rate < 1.0 else 1
+        self.decay_interval = decay_interval
+        self.table = [[0] * width for _ in range(depth)]
+        self.heavy_hitters = {}
+        self.last_decay = time.time()
+        self.lock = threading.Lock()
+    
+    def _cells(self, key):
+        return [(row, hash((row, key)) % self.width) for row in range(self.depth)]
+    
+    def _decay(self, now):
+        periods = int((now - self.last_decay) // self.decay_interval)
+        if periods <= 0:
+            return
+        shift = min(periods, 31)
+        for row in self.table:
+            for i, value in enumerate(row):
+                if value:
+                    row[i] = value >> shift
+        self.heavy_hitters = {
+            key: count >> shift
+            for key, count in self.heavy_hitters.items() if count >> shift
+        }
+        self.last_decay += periods * self.decay_interval
+    
+    def record(self, key):
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        
+        with self.lock:
+            self._decay(time.time())
+            
+            estimate = None
+            for row, col in self._cells(key):
+                self.table[row][col] += 1
+                value = self.table[row][col]
+                estimate = value if estimate is None else min(estimate, value)
+            
+            if key in self.heavy_hitters or len(self.heavy_hitters) < self.top_k:
+                self.heavy_hitters[key] = estimate
+            else:
+                coldest = min(self.heavy_hitters, key=self.heavy_hitters.get)
+                if estimate > self.heavy_hitters[coldest]:
+                    del self.heavy_hitters[coldest]
+                    self.heavy_hitters[key] = estimate
+    
+    def is_hot(self, key):
+        return self.heavy_hitters.get(key, 0) * self.scale >= self.min_count
+    
+    def top(self):
+        with self.lock:
+            self._decay(time.time())
+            items = sorted(self.heavy_hitters.items(), key=lambda item: -item[1])
+        return [(key, round(count * self.scale)) for key, count in items]
+    
+    def reset(self):
+        with self.lock:
+            self.table = [[0] * self.width for _ in range(self.depth)]
+            self.heavy_hitters = {}
+
+
+hot_keys = HotKeyDetector()
+
+# Cópias locais das hot keys: chave -> (valor, expira_em, metadados)
+# Listagens fixam também ETag/Last-Modified, para não ler <chave>:meta no Redis
+pinned_cache = {}
+
+
+def pin_hot_key(key, value, ttl=HOT_KEY_PIN_TTL, meta=None):
+    """Fixa (ou atualiza) a cópia local, sem passar do TTL restante no Redis."""
+    if ttl is None or ttl <= 0:
+        return
+    pinned_cache[key] = (value, time.time() + min(ttl, HOT_KEY_PIN_TTL), meta)
+
+
+def get_pinned_entry(key):
+    entry = pinned_cache.get(key)
+    if entry is None:
+        return None
+    if entry[1] < time.time() or not hot_keys.is_hot(key):
+        pinned_cache.pop(key, None)
+        return None
+    return entry
+
+
+def get_pinned(key):
+    entry = get_pinned_entry(key)
+    return entry[0] if entry else None
+
+
+def unpin_keys(pattern):
+    # list() copia as chaves de uma vez: outras threads fixam e removem
+    # entradas enquanto o padrão é comparado
+    for key in [k for k in list(pinned_cache) if fnmatchcase(k, pattern)]:
+        pinned_cache.pop(key, None)
+
+
+def get_from_cache(key, meta=None):
+    """Lê do cache; `meta` (de get_cache_meta) é fixado junto se a chave for quente."""
+    hot_keys.record(key)
+    
+    pinned = get_pinned(key)
+    if pinned is not None:
+        db_stats['cache_hits'] += 1
+        db_stats['hot_cache_hits'] += 1
+        g.served_from_hot_cache = True
+        return pinned
+    
     try:
         client = get_redis_client()
         if client:
@@ -168,7 +404,10 @@ def get_from_cache(key):
             if value:
                 db_stats['cache_hits'] += 1
                 logger.info(f"✓ Cache HIT: {key}")
-                return json.loads(value)
+                value = json.loads(value)
+                if hot_keys.is_hot(key):
+                    pin_hot_key(key, value, client.ttl(key), meta)
+                return value
             else:
                 db_stats['cache_misses'] += 1
                 logger.info(f"✗ Cache MISS: {key}")
@@ -177,20 +416,240 @@ def get_from_cache(key):
     return None
 
 
+def json_default(value):
+    """Serializa tipos do PostgreSQL no mesmo formato usado pelo jsonify."""
+    if isinstance(value, date):
+        return http_date(value)
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Tipo não serializável: {type(value).__name__}")
+
+
+def cache_key_prefix(key):
+    """Agrupa chaves por família: product:42 -> product, products:search:ab12 -> products:search."""
+    parts = key.split(':')
+    if len(parts) > 2:
+        return ':'.join(parts[:2])
+    if len(parts) == 2 and parts[1].isdigit():
+        return parts[0]
+    return key
+
+
+def sample_cache_usage(client):
+    """
+    Estima chaves e bytes por prefixo a partir de uma amostra do keyspace.
+    
+    Lê até CACHE_USAGE_SAMPLE_KEYS chaves com SCAN, mede cada uma com
+    MEMORY USAGE e extrapola a amostra para o DBSIZE total.
+    """
+    keys = []
+    for key in client.scan_iter(count=500):
+        keys.append(key)
+        if len(keys) >= CACHE_USAGE_SAMPLE_KEYS:
+            break
+    
+    pipe = client.pipeline(transaction=False)
+    for key in keys:
+        pipe.memory_usage(key, samples=0)
+    sizes = pipe.execute() if keys else []
+    
+    scale = client.dbsize() / len(keys) if keys else 0
+    by_prefix = {}
+    for key, size in zip(keys, sizes):
+        entry = by_prefix.setdefault(cache_key_prefix(key), {'keys': 0, 'bytes': 0})
+        entry['keys'] += 1
+        entry['bytes'] += size or 0
+    for entry in by_prefix.values():
+        entry['keys'] = round(entry['keys'] * scale)
+        entry['bytes'] = round(entry['bytes'] * scale)
+    
+    cache_usage['by_prefix'] = by_prefix
+    cache_usage['namespace_bytes'] = sum(
+        entry['bytes'] for prefix, entry in by_prefix.items()
+        if prefix.startswith(CACHE_NAMESPACE)
+    )
+    cache_usage['sampled_keys'] = len(keys)
+    cache_usage['sampled_at'] = time.time()
+    return cache_usage
+
+
+def refresh_cache_usage(client):
+    """
+    Dispara uma nova amostragem em background quando a atual expirou.
+    
+    Só uma thread amostra por vez; a requisição que percebe a expiração
+    não espera o SCAN + MEMORY USAGE e segue com a estimativa anterior.
+    """
+    if time.time() - cache_usage['sampled_at'] <= CACHE_USAGE_SAMPLE_INTERVAL:
+        return
+    if not cache_usage_lock.acquire(blocking=False):
+        return
+    
+    def sample():
+        try:
+            sample_cache_usage(client)
+        except Exception as e:
+            logger.error(f"Erro ao amostrar uso do cache: {e}")
+            # Evita nova tentativa a cada gravação enquanto o Redis falha
+            cache_usage['sampled_at'] = time.time()
+        finally:
+            cache_usage_lock.release()
+    
+    threading.Thread(target=sample, daemon=True).start()
+
+
+def admit_to_cache(client, key, size):
+    """
+    Política de admissão: recusa valores acima de CACHE_MAX_VALUE_BYTES e,
+    com o orçamento CACHE_MEMORY_BUDGET_BYTES do namespace esgotado, valores
+    maiores que CACHE_SMALL_VALUE_BYTES; as entradas pequenas por ID
+    continuam sendo gravadas no lugar das listagens e buscas grandes.
+    """
+    if size > CACHE_MAX_VALUE_BYTES:
+        db_stats['cache_rejected_oversize'] += 1
+        logger.warning(f"⚠ Cache SKIP: {key} ({size} bytes > {CACHE_MAX_VALUE_BYTES})")
+        return False
+    
+    refresh_cache_usage(client)
+    
+    if (size > CACHE_SMALL_VALUE_BYTES
+            and cache_usage['namespace_bytes'] + size > CACHE_MEMORY_BUDGET_BYTES):
+        db_stats['cache_rejected_budget'] += 1
+        logger.warning(f"⚠ Cache SKIP: {key} (orçamento de {CACHE_MEMORY_BUDGET_BYTES} bytes esgotado)")
+        return False
+    
+    # Contabiliza o valor admitido até a próxima amostragem
+    cache_usage['namespace_bytes'] += size
+    return True
+
+
 def set_to_cache(key, value, ttl=CACHE_TTL):
     """Salva valor no cache."""
     try:
         client = get_redis_client()
         if client:
-            client.setex(key, ttl, json.dumps(value))
+            serialized = json.dumps(value, default=json_default)
+            if not admit_to_cache(client, key, len(serialized)):
+                return
+            client.setex(key, ttl, serialized)
             logger.info(f"✓ Cache SET: {key} (TTL: {ttl}s)")
+            if hot_keys.is_hot(key):
+                pin_hot_key(key, json.loads(serialized), ttl)
+    except Exception as e:
+        logger.error(f"Erro ao salvar no cache: {e}")
+
+
+def meta_cache_key(key):
+    return f'{key}:meta'
+
+
+def get_cache_meta(key):
+    """Lê ETag e Last-Modified guardados ao lado do payload em cache."""
+    pinned = get_pinned_entry(key)
+    if pinned and pinned[2]:
+        return pinned[2]
+    
+    try:
+        client = get_redis_client()
+        if client:
+            meta = client.hgetall(meta_cache_key(key))
+            if meta.get('etag'):
+                return meta
+    except Exception as e:
+        logger.error(f"Erro ao ler metadados do cache: {e}")
+    return None
+
+
+def set_list_to_cache(key, products_list, ttl=CACHE_TTL):
+    """
+    Salva uma listagem no cache junto com seus validadores HTTP.
+
+    O ETag é o hash do payload serializado e o Last-Modified é o maior
+    updated_at da listagem. Retorna os metadados mesmo sem Redis.
+    """
+    serialized = json.dumps(products_list, default=json_default, sort_keys=True)
+    meta = {'etag': hashlib.sha256(serialized.encode('utf-8')).hexdigest()[:32]}
+    updated = [p['updated_at'] for p in products_list if p.get('updated_at')]
+    if updated:
+        meta['last_modified'] = http_date(max(updated))
+    
+    try:
+        client = get_redis_client()
+        if client and admit_to_cache(client, key, len(serialized)):
+            pipe = client.pipeline()
+            pipe.setex(key, ttl, serialized)
+            pipe.delete(meta_cache_key(key))
+            pipe.hset(meta_cache_key(key), mapping=meta)
+            pipe.expire(meta_cache_key(key), ttl)
+            pipe.execute()
+            logger.info(f"✓ Cache SET: {key} (TTL: {ttl}s, ETag: {meta['etag']})")
+            if hot_keys.is_hot(key):
+                pin_hot_key(key, json.loads(serialized), ttl, meta)
     except Exception as e:
         logger.error(f"Erro ao salvar no cache: {e}")
+    return meta
+
+
+def not_modified_response(meta):
+    """Retorna 304 se o If-None-Match do cliente casa com o ETag em cache."""
+    if meta and request.if_none_match.contains(meta['etag']):
+        response = app.response_class(status=304)
+        return with_validators(response, meta)
+    return None
+
+
+def with_validators(response, meta):
+    if meta:
+        response.set_etag(meta['etag'])
+        if meta.get('last_modified'):
+            response.headers['Last-Modified'] = meta['last_modified']
+    return response
+
+
+def negative_cache_key(product_id):
+    return f'product:missing:{product_id}'
+
+
+def is_negatively_cached(product_id):
+    """Verifica se o ID está marcado como inexistente no cache."""
+    key = negative_cache_key(product_id)
+    try:
+        client = get_redis_client()
+        if client and client.exists(key):
+            db_stats['negative_cache_hits'] += 1
+            logger.info(f"✓ Cache HIT (negativo): {key}")
+            return True
+    except Exception as e:
+        logger.error(f"Erro ao ler cache negativo: {e}")
+    return False
+
+
+def set_negative_cache(product_id, ttl=NEGATIVE_CACHE_TTL):
+    """Marca um ID como inexistente por um TTL curto."""
+    key = negative_cache_key(product_id)
+    try:
+        client = get_redis_client()
+        if client:
+            client.setex(key, ttl, 1)
+            logger.info(f"✓ Cache SET (negativo): {key} (TTL: {ttl}s)")
+    except Exception as e:
+        logger.error(f"Erro ao salvar cache negativo: {e}")
+
+
+def clear_negative_cache(product_id):
+    """Remove a marcação de inexistente de um ID."""
+    try:
+        client = get_redis_client()
+        if client:
+            client.delete(negative_cache_key(product_id))
+    except Exception as e:
+        logger.error(f"Erro ao limpar cache negativo: {e}")
 
 
 def invalidate_cache_pattern(pattern):
     """Invalida cache por padrão."""
     try:
+        unpin_keys(pattern)
         client = get_redis_client()
         if client:
             keys = client.keys(pattern)
@@ -201,6 +660,171 @@ def invalidate_cache_pattern(pattern):
         logger.error(f"Erro ao invalidar cache: {e}")
 
 
+def facet_category(category):
+    return category if category is not None else FACET_DEFAULT_CATEGORY
+
+
+def price_bucket(price):
+    """Índice da faixa de preço (mesma semântica do width_bucket do PostgreSQL)."""
+    return bisect_right(FACET_PRICE_BUCKETS, price)
+
+
+def apply_facet_delta(cursor, product, sign):
+    """
+    Aplica a inclusão (sign=1) ou remoção (sign=-1) de um produto nos facets.
+    
+    Deve ser chamada na mesma transação da escrita em products e depois dela,
+    para que o recálculo de min/max enxergue o estado já atualizado.
+    """
+    category = facet_category(product['category'])
+    price = product['price']
+    stock = product['stock'] or 0
+    
+    if sign > 0:
+        cursor.execute(
+            """
+            INSERT INTO category_facets
+                (category, product_count, price_sum, min_price, max_price, stock_total)
+            VALUES (%s, 1, %s, %s, %s, %s)
+            ON CONFLICT (category) DO UPDATE SET
+                product_count = category_facets.product_count + 1,
+                price_sum = category_facets.price_sum + EXCLUDED.price_sum,
+                min_price = LEAST(category_facets.min_price, EXCLUDED.min_price),
+                max_price = GREATEST(category_facets.max_price, EXCLUDED.max_price),
+                stock_total = category_facets.stock_total + EXCLUDED.stock_total,
+                updated_at = CURRENT_TIMESTAMP
+            """,
+            (category, price, price, price, stock)
+        )
+    else:
+        cursor.execute(
+            """
+            UPDATE category_facets SET
+                product_count = product_count - 1,
+                price_sum = price_sum - %s,
+                stock_total = stock_total - %s,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE category = %s
+            RETURNING product_count, min_price, max_price
+            """,
+            (price, stock, category)
+        )
+        row = cursor.fetchone()
+        if row and row['product_count'] <= 0:
+            cursor.execute("DELETE FROM category_facets WHERE category = %s", (category,))
+        elif row and price in (row['min_price'], row['max_price']):
+            # Só o extremo removido exige recalcular, e apenas nesta categoria
+            cursor.execute(
+                """
+                UPDATE category_facets SET
+                    min_price = agg.min_price,
+                    max_price = agg.max_price
+                FROM (
+                    SELECT MIN(price) AS min_price, MAX(price) AS max_price
+                    FROM products
+                    WHERE COALESCE(category, %s) = %s
+                ) agg
+                WHERE category_facets.category = %s
+                """,
+                (FACET_DEFAULT_CATEGORY, category, category)
+            )
+    
+    cursor.execute(
+        """
+        INSERT INTO category_price_histogram (category, bucket, product_count)
+        VALUES (%s, %s, %s)
+        ON CONFLICT (category, bucket) DO UPDATE SET
+            product_count = category_price_histogram.product_count + EXCLUDED.product_count
+        """,
+        (category, price_bucket(price), sign)
+    )
+    if sign < 0:
+        cursor.execute(
+            "DELETE FROM category_price_histogram WHERE category = %s AND product_count <= 0",
+            (category,)
+        )
+
+
+def apply_facet_batch(cursor, aggregates):
+    """
+    Soma nos facets os agregados de um lote de inserções.
+    
+    Args:
+        aggregates: {categoria: {count, price_sum, min_price, max_price,
+                     stock_total, buckets: {bucket: count}}}
+    """
+    for category, agg in aggregates.items():
+        cursor.execute(
+            """
+            INSERT INTO category_facets
+                (category, product_count, price_sum, min_price, max_price, stock_total)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            ON CONFLICT (category) DO UPDATE SET
+                product_count = category_facets.product_count + EXCLUDED.product_count,
+                price_sum = category_facets.price_sum + EXCLUDED.price_sum,
+                min_price = LEAST(category_facets.min_price, EXCLUDED.min_price),
+                max_price = GREATEST(category_facets.max_price, EXCLUDED.max_price),
+                stock_total = category_facets.stock_total + EXCLUDED.stock_total,
+                updated_at = CURRENT_TIMESTAMP
+            """,
+            (category, agg['count'], agg['price_sum'], agg['min_price'],
+             agg['max_price'], agg['stock_total'])
+        )
+        for bucket, count in agg['buckets'].items():
+            cursor.execute(
+                """
+                INSERT INTO category_price_histogram (category, bucket, product_count)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (category, bucket) DO UPDATE SET
+                    product_count = category_price_histogram.product_count + EXCLUDED.product_count
+                """,
+                (category, bucket, count)
+            )
+
+
+def rebuild_facets(cursor):
+    """Recalcula todos os facets a partir da tabela products."""
+    # Bloqueia escritas concorrentes nos facets até o fim da transação
+    cursor.execute(
+        "LOCK TABLE category_facets, category_price_histogram IN EXCLUSIVE MODE"
+    )
+    cursor.execute("DELETE FROM category_facets")
+    cursor.execute("DELETE FROM category_price_histogram")
+    cursor.execute(
+        """
+        INSERT INTO category_facets
+            (category, product_count, price_sum, min_price, max_price, stock_total)
+        SELECT COALESCE(category, %s), COUNT(*), SUM(price), MIN(price), MAX(price),
+               COALESCE(SUM(stock), 0)
+        FROM products
+        GROUP BY COALESCE(category, %s)
+        """,
+        (FACET_DEFAULT_CATEGORY, FACET_DEFAULT_CATEGORY)
+    )
+    cursor.execute(
+        """
+        INSERT INTO category_price_histogram (category, bucket, product_count)
+        SELECT COALESCE(category, %s), width_bucket(price, %s::numeric[]), COUNT(*)
+        FROM products
+        GROUP BY 1, 2
+        """,
+        (FACET_DEFAULT_CATEGORY, FACET_PRICE_BUCKETS)
+    )
+    logger.info("✓ Facets recalculados a partir da tabela products")
+
+
+@app.cli.command('rebuild-facets')
+def rebuild_facets_command():
+    """Recalcula os facets de categoria (flask --app app rebuild-facets)."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    rebuild_facets(cursor)
+    conn.commit()
+    cursor.close()
+    conn.close()
+    invalidate_cache_pattern("products:facets*")
+
+
 @app.route('/')
 def index():
     return jsonify({
@@ -220,8 +844,13 @@ def index():
             "PUT /products/<id>": "Atualiza produto",
             "DELETE /products/<id>": "Remove produto",
             "GET /products/category/<category>": "Produtos por categoria",
+            "GET /products/search?q=": "Busca produtos (nome/descrição, preço, categoria)",
+            "POST /products/import": "Importação em lote (CSV ou NDJSON) via COPY",
+            "GET /products/facets": "Contagem, preços e estoque por categoria",
+            "POST /products/facets/rebuild": "Recalcula facets a partir da tabela products",
             "GET /stats": "Estatísticas (DB + Cache)",
             "GET /cache/clear": "Limpa todo o cache",
+            "GET /cache/hotkeys": "Top-K de chaves mais acessadas (hot keys)",
             "GET /services": "Status dos serviços"
         }
     }), 200
@@ -299,6 +928,17 @@ def services_status():
             status["cache"]["keys"] = client.dbsize()
             status["cache"]["memory_used"] = info.get("used_memory_human", "N/A")
             status["cache"]["uptime_seconds"] = info.get("uptime_in_seconds", 0)
+            
+            usage = sample_cache_usage(client)
+            status["cache"]["namespaces"] = usage["by_prefix"]
+            status["cache"]["budget"] = {
+                "namespace": f"{CACHE_NAMESPACE}*",
+                "used_bytes": usage["namespace_bytes"],
+                "limit_bytes": CACHE_MEMORY_BUDGET_BYTES,
+                "max_value_bytes": CACHE_MAX_VALUE_BYTES,
+                "small_value_bytes": CACHE_SMALL_VALUE_BYTES,
+                "sampled_keys": usage["sampled_keys"]
+            }
     except Exception as e:
         status["cache"]["error"] = str(e)
     
@@ -309,15 +949,22 @@ def services_status():
 def get_products():
     cache_key = 'products:all'
     
-    cached_data = get_from_cache(cache_key)
+    meta = get_cache_meta(cache_key)
+    not_modified = not_modified_response(meta)
+    if not_modified:
+        db_stats['not_modified'] += 1
+        log_request('/products', 'GET', cache_hit=True)
+        return not_modified
+    
+    cached_data = get_from_cache(cache_key, meta)
     if cached_data:
         log_request('/products', 'GET', cache_hit=True)
-        return jsonify({
+        return with_validators(jsonify({
             "success": True,
             "source": "cache",
             "count": len(cached_data),
             "products": cached_data
-        }), 200
+        }), meta), 200
     
     try:
         conn = get_db_connection()
@@ -331,18 +978,23 @@ def get_products():
         
         products_list = [dict(p) for p in products]
         
-        set_to_cache(cache_key, products_list)
+        meta = set_list_to_cache(cache_key, products_list)
         
         log_request('/products', 'GET', cache_hit=False)
         
         logger.info(f"Listados {len(products_list)} produtos do banco")
         
-        return jsonify({
+        not_modified = not_modified_response(meta)
+        if not_modified:
+            db_stats['not_modified'] += 1
+            return not_modified
+        
+        return with_validators(jsonify({
             "success": True,
             "source": "database",
             "count": len(products_list),
             "products": products_list
-        }), 200
+        }), meta), 200
     except Exception as e:
         logger.error(f"Erro ao listar produtos: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
@@ -379,12 +1031,14 @@ def create_product():
         )
         
         product = cursor.fetchone()
+        apply_facet_delta(cursor, product, 1)
         conn.commit()
         cursor.close()
         conn.close()
         
         db_stats['queries'] += 1
         
+        clear_negative_cache(product['id'])
         invalidate_cache_pattern("products:*")
         
         logger.info(f"✓ Produto criado: {data['name']}")
@@ -413,6 +1067,9 @@ def get_product(product_id):
             "product": cached_data
         }), 200
     
+    if is_negatively_cached(product_id):
+        return jsonify({"success": False, "error": "Produto não encontrado"}), 404
+    
     try:
         conn = get_db_connection()
         cursor = conn.cursor(cursor_factory=RealDictCursor)
@@ -424,6 +1081,7 @@ def get_product(product_id):
         db_stats['queries'] += 1
         
         if not product:
+            set_negative_cache(product_id)
             return jsonify({"success": False, "error": "Produto não encontrado"}), 404
         
         product_dict = dict(product)
@@ -450,6 +1108,12 @@ def update_product(product_id):
         conn = get_db_connection()
         cursor = conn.cursor(cursor_factory=RealDictCursor)
         
+        cursor.execute(
+            "SELECT price, stock, category FROM products WHERE id = %s FOR UPDATE",
+            (product_id,)
+        )
+        previous = cursor.fetchone()
+        
         cursor.execute(
             """
             UPDATE products 
@@ -473,6 +1137,9 @@ def update_product(product_id):
         )
         
         product = cursor.fetchone()
+        if product:
+            apply_facet_delta(cursor, previous, -1)
+            apply_facet_delta(cursor, product, 1)
         conn.commit()
         cursor.close()
         conn.close()
@@ -502,9 +1169,14 @@ def update_product(product_id):
 def delete_product(product_id):
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM products WHERE id = %s RETURNING id", (product_id,))
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        cursor.execute(
+            "DELETE FROM products WHERE id = %s RETURNING id, price, stock, category",
+            (product_id,)
+        )
         deleted = cursor.fetchone()
+        if deleted:
+            apply_facet_delta(cursor, deleted, -1)
         conn.commit()
         cursor.close()
         conn.close()
@@ -529,20 +1201,240 @@ def delete_product(product_id):
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+def parse_import_row(row):
+    """
+    Valida uma linha de importação.
+    
+    Returns:
+        tuple: valores na ordem de IMPORT_COLUMNS
+        
+    Raises:
+        ValueError: com a descrição do problema da linha
+    """
+    if not isinstance(row, dict):
+        raise ValueError("Linha deve ser um objeto JSON")
+    
+    # O COPY rejeitaria o arquivo inteiro por um NUL em qualquer linha
+    for field in ('name', 'description', 'category'):
+        if '\x00' in str(row.get(field) or ''):
+            raise ValueError(f"{field} contém caractere NUL")
+    
+    name = str(row.get('name') or '').strip()
+    if not name:
+        raise ValueError("Campo obrigatório: name")
+    if len(name) > 200:
+        raise ValueError("name excede 200 caracteres")
+    
+    try:
+        price = Decimal(str(row.get('price'))).quantize(Decimal('0.01'), ROUND_HALF_UP)
+    except InvalidOperation:
+        raise ValueError(f"price inválido: {row.get('price')!r}")
+    if not price.is_finite() or price < 0 or price >= Decimal('1e8'):
+        raise ValueError(f"price fora do intervalo: {row.get('price')!r}")
+    
+    stock = row.get('stock')
+    try:
+        stock = int(stock) if stock not in (None, '') else 0
+    except (TypeError, ValueError):
+        raise ValueError(f"stock inválido: {row.get('stock')!r}")
+    if not STOCK_MIN <= stock <= STOCK_MAX:
+        raise ValueError(f"stock fora do intervalo: {row.get('stock')!r}")
+    
+    category = str(row.get('category') or 'general')
+    if len(category) > 100:
+        raise ValueError("category excede 100 caracteres")
+    
+    return name, str(row.get('description') or ''), price, stock, category
+
+
+def read_import_rows(stream, content_type):
+    """Itera (número da linha, dict) do corpo CSV ou NDJSON sem carregá-lo inteiro."""
+    text = io.TextIOWrapper(io.BufferedReader(stream), encoding='utf-8', newline='')
+    
+    if 'csv' in content_type:
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, ValueError(f"JSON inválido: {e.msg}")
+
+
+class CopyRowStream:
+    """
+    Arquivo somente-leitura que entrega linhas CSV para o COPY sob demanda.
+    
+    O corpo da requisição é consumido conforme o PostgreSQL pede dados,
+    então a importação não precisa manter o arquivo inteiro em memória.
+    """
+    
+    def __init__(self, rows):
+        self.rows = rows
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer, quoting=csv.QUOTE_ALL)
+        self.pending = ''
+    
+    def read(self, size=-1):
+        while size < 0 or len(self.pending) < size:
+            row = next(self.rows, None)
+            if row is None:
+                break
+            self.writer.writerow(row)
+            if self.buffer.tell() >= 64 * 1024:
+                self.pending += self.buffer.getvalue()
+                self.buffer.seek(0)
+                self.buffer.truncate()
+        
+        self.pending += self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        
+        if size < 0:
+            size = len(self.pending)
+        chunk, self.pending = self.pending[:size], self.pending[size:]
+        return chunk
+
+
+@app.route('/products/import', methods=['POST'])
+def import_products():
+    """
+    Importa produtos em lote via COPY numa única transação.
+    
+    Body: CSV com cabeçalho (Content-Type: text/csv) ou NDJSON
+    (Content-Type: application/x-ndjson) com os campos de IMPORT_COLUMNS.
+    Linhas inválidas são ignoradas e listadas no relatório de erros.
+    """
+    content_type = request.content_type or ''
+    errors = []
+    error_count = 0
+    aggregates = {}
+    imported = 0
+    
+    def valid_rows():
+        nonlocal error_count, imported
+        for line_number, row in read_import_rows(request.stream, content_type):
+            try:
+                if isinstance(row, Exception):
+                    raise row
+                values = parse_import_row(row)
+            except ValueError as e:
+                error_count += 1
+                if len(errors) < IMPORT_MAX_REPORTED_ERRORS:
+                    errors.append({"line": line_number, "error": str(e)})
+                continue
+            
+            _, _, price, stock, category = values
+            agg = aggregates.setdefault(category, {
+                'count': 0, 'price_sum': Decimal(0), 'min_price': price,
+                'max_price': price, 'stock_total': 0, 'buckets': {}
+            })
+            agg['count'] += 1
+            agg['price_sum'] += price
+            agg['min_price'] = min(agg['min_price'], price)
+            agg['max_price'] = max(agg['max_price'], price)
+            agg['stock_total'] += stock
+            bucket = price_bucket(price)
+            agg['buckets'][bucket] = agg['buckets'].get(bucket, 0) + 1
+            
+            imported += 1
+            yield values
+    
+    started = time.perf_counter()
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        # Faixa de IDs atribuída pelo COPY, para limpar só esses marcadores negativos
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM products")
+        max_id_before = cursor.fetchone()[0]
+        cursor.copy_expert(
+            f"COPY products ({', '.join(IMPORT_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            CopyRowStream(valid_rows())
+        )
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM products")
+        max_id_after = cursor.fetchone()[0]
+        apply_facet_batch(cursor, aggregates)
+        conn.commit()
+        cursor.close()
+        conn.close()
+    except Exception as e:
+        logger.error(f"Erro ao importar produtos: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+    elapsed = time.perf_counter() - started
+    
+    db_stats['queries'] += 1
+    
+    if imported:
+        invalidate_after_import(aggregates.keys(), range(max_id_before + 1, max_id_after + 1))
+    
+    logger.info(f"✓ Importação: {imported} produtos em {elapsed:.2f}s ({error_count} erros)")
+    log_request('/products/import', 'POST', cache_hit=False)
+    
+    return jsonify({
+        "success": True,
+        "imported": imported,
+        "failed": error_count,
+        "categories": sorted(aggregates.keys()),
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(imported / elapsed, 1) if elapsed > 0 else None,
+        "errors": errors,
+        "errors_truncated": error_count > len(errors)
+    }), 200 if imported or not error_count else 400
+
+
+def invalidate_after_import(categories, new_ids):
+    """Invalida, uma única vez, só as chaves afetadas por uma importação."""
+    keys = ['products:all', meta_cache_key('products:all'), 'products:facets']
+    for category in categories:
+        keys.append(f"products:category:{category}")
+        keys.append(meta_cache_key(f"products:category:{category}"))
+    for key in keys:
+        pinned_cache.pop(key, None)
+    
+    try:
+        client = get_redis_client()
+        if client:
+            client.delete(*keys)
+            logger.info(f"✓ Cache invalidado após importação ({len(keys)} chaves)")
+            
+            # Buscas em cache podem passar a incluir os novos produtos, e os
+            # novos IDs podem ter sido marcados como inexistentes
+            client.incr(SEARCH_GENERATION_KEY)
+            pipe = client.pipeline(transaction=False)
+            for start in range(0, len(new_ids), IMPORT_INVALIDATE_CHUNK):
+                chunk = new_ids[start:start + IMPORT_INVALIDATE_CHUNK]
+                pipe.unlink(*[negative_cache_key(product_id) for product_id in chunk])
+            pipe.execute()
+    except Exception as e:
+        logger.error(f"Erro ao invalidar cache: {e}")
+
+
 @app.route('/products/category/<category>')
 def get_products_by_category(category):
     cache_key = f"products:category:{category}"
     
-    cached_data = get_from_cache(cache_key)
+    meta = get_cache_meta(cache_key)
+    not_modified = not_modified_response(meta)
+    if not_modified:
+        db_stats['not_modified'] += 1
+        log_request(f'/products/category/{category}', 'GET', cache_hit=True)
+        return not_modified
+    
+    cached_data = get_from_cache(cache_key, meta)
     if cached_data:
         log_request(f'/products/category/{category}', 'GET', cache_hit=True)
-        return jsonify({
+        return with_validators(jsonify({
             "success": True,
             "source": "cache",
             "category": category,
             "count": len(cached_data),
             "products": cached_data
-        }), 200
+        }), meta), 200
     
     try:
         conn = get_db_connection()
@@ -559,37 +1451,256 @@ def get_products_by_category(category):
         
         products_list = [dict(p) for p in products]
         
-        set_to_cache(cache_key, products_list)
+        meta = set_list_to_cache(cache_key, products_list)
         
         log_request(f'/products/category/{category}', 'GET', cache_hit=False)
         
-        return jsonify({
+        not_modified = not_modified_response(meta)
+        if not_modified:
+            db_stats['not_modified'] += 1
+            return not_modified
+        
+        return with_validators(jsonify({
             "success": True,
             "source": "database",
             "category": category,
             "count": len(products_list),
             "products": products_list
+        }), meta), 200
+    except Exception as e:
+        logger.error(f"Erro ao buscar produtos: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+def normalize_search_params(args):
+    """
+    Normaliza os parâmetros de busca.
+
+    Returns:
+        tuple: (params, error_message)
+    """
+    query = ' '.join(args.get('q', '').lower().split())
+    if not query:
+        return None, "Parâmetro obrigatório: q"
+    
+    params = {'q': query, 'category': args.get('category') or None}
+    try:
+        params['min_price'] = float(args['min_price']) if args.get('min_price') else None
+        params['max_price'] = float(args['max_price']) if args.get('max_price') else None
+        params['limit'] = min(int(args.get('limit', 20)), SEARCH_MAX_LIMIT)
+        params['cursor'] = int(args['cursor']) if args.get('cursor') else None
+    except ValueError:
+        return None, "Parâmetros numéricos inválidos (min_price, max_price, limit, cursor)"
+    
+    if params['limit'] < 1:
+        return None, "limit deve ser maior que zero"
+    
+    return params, None
+
+
+def search_generation():
+    """Geração atual das buscas em cache (0 sem Redis ou antes da 1ª importação)."""
+    try:
+        client = get_redis_client()
+        if client:
+            return int(client.get(SEARCH_GENERATION_KEY) or 0)
+    except Exception as e:
+        logger.error(f"Erro ao ler geração das buscas: {e}")
+    return 0
+
+
+def search_cache_key(params):
+    digest = hashlib.sha1(
+        json.dumps(params, sort_keys=True).encode('utf-8')
+    ).hexdigest()
+    return f"products:search:{search_generation()}:{digest}"
+
+
+@app.route('/products/search')
+def search_products():
+    """
+    Busca produtos por texto com paginação por cursor (keyset).
+    
+    Query Parameters:
+        q (str): Texto buscado em nome (trigram) e nome/descrição (full-text)
+        min_price, max_price (float): Faixa de preço
+        category (str): Categoria exata
+        limit (int): Itens por página (máx. 100)
+        cursor (int): Valor de next_cursor da página anterior
+    """
+    params, error = normalize_search_params(request.args)
+    if error:
+        return jsonify({"success": False, "error": error}), 400
+    
+    cache_key = search_cache_key(params)
+    
+    cached_data = get_from_cache(cache_key)
+    if cached_data:
+        log_request('/products/search', 'GET', cache_hit=True)
+        return jsonify({
+            "success": True,
+            "source": "cache",
+            "query": params,
+            **cached_data
+        }), 200
+    
+    escaped = (
+        params['q'].replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    )
+    conditions = [
+        f"(name ILIKE %s OR {SEARCH_TSVECTOR} @@ plainto_tsquery('simple', %s))"
+    ]
+    values = [f"%{escaped}%", params['q']]
+    
+    if params['min_price'] is not None:
+        conditions.append("price >= %s")
+        values.append(params['min_price'])
+    if params['max_price'] is not None:
+        conditions.append("price <= %s")
+        values.append(params['max_price'])
+    if params['category']:
+        conditions.append("category = %s")
+        values.append(params['category'])
+    if params['cursor'] is not None:
+        conditions.append("id < %s")
+        values.append(params['cursor'])
+    
+    values.append(params['limit'] + 1)
+    
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        cursor.execute(
+            f"""
+            SELECT * FROM products
+            WHERE {' AND '.join(conditions)}
+            ORDER BY id DESC
+            LIMIT %s
+            """,
+            values
+        )
+        products = cursor.fetchall()
+        cursor.close()
+        conn.close()
+        
+        db_stats['queries'] += 1
+        
+        products_list = [dict(p) for p in products[:params['limit']]]
+        has_more = len(products) > params['limit']
+        
+        result = {
+            "count": len(products_list),
+            "products": products_list,
+            "next_cursor": products_list[-1]['id'] if has_more else None
+        }
+        
+        set_to_cache(cache_key, result, ttl=SEARCH_CACHE_TTL)
+        
+        log_request('/products/search', 'GET', cache_hit=False)
+        
+        return jsonify({
+            "success": True,
+            "source": "database",
+            "query": params,
+            **result
         }), 200
     except Exception as e:
         logger.error(f"Erro ao buscar produtos: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+@app.route('/products/facets')
+def get_facets():
+    """Facets por categoria, lidos dos agregados mantidos a cada escrita."""
+    cache_key = 'products:facets'
+    
+    cached_data = get_from_cache(cache_key)
+    if cached_data:
+        log_request('/products/facets', 'GET', cache_hit=True)
+        return jsonify({
+            "success": True,
+            "source": "cache",
+            "facets": cached_data
+        }), 200
+    
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        cursor.execute("SELECT * FROM category_facets ORDER BY category")
+        categories = cursor.fetchall()
+        cursor.execute(
+            "SELECT category, bucket, product_count FROM category_price_histogram ORDER BY bucket"
+        )
+        histogram = cursor.fetchall()
+        cursor.close()
+        conn.close()
+        
+        db_stats['queries'] += 1
+        
+        facets = {}
+        for row in categories:
+            facets[row['category']] = {
+                "count": row['product_count'],
+                "min_price": row['min_price'],
+                "max_price": row['max_price'],
+                "avg_price": round(row['price_sum'] / row['product_count'], 2),
+                "stock_total": row['stock_total'],
+                "price_histogram": []
+            }
+        for row in histogram:
+            if row['category'] not in facets:
+                continue
+            bucket = row['bucket']
+            facets[row['category']]["price_histogram"].append({
+                "min": FACET_PRICE_BUCKETS[bucket - 1] if bucket > 0 else None,
+                "max": FACET_PRICE_BUCKETS[bucket] if bucket < len(FACET_PRICE_BUCKETS) else None,
+                "count": row['product_count']
+            })
+        
+        set_to_cache(cache_key, facets)
+        
+        log_request('/products/facets', 'GET', cache_hit=False)
+        
+        return jsonify({
+            "success": True,
+            "source": "database",
+            "facets": facets
+        }), 200
+    except Exception as e:
+        logger.error(f"Erro ao obter facets: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@app.route('/products/facets/rebuild', methods=['POST'])
+def rebuild_facets_endpoint():
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        rebuild_facets(cursor)
+        conn.commit()
+        cursor.close()
+        conn.close()
+        
+        invalidate_cache_pattern("products:facets*")
+        
+        return jsonify({
+            "success": True,
+            "message": "Facets recalculados com sucesso"
+        }), 200
+    except Exception as e:
+        logger.error(f"Erro ao recalcular facets: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
 @app.route('/stats')
 def get_stats():
     try:
         conn = get_db_connection()
         cursor = conn.cursor(cursor_factory=RealDictCursor)
         
-        cursor.execute("SELECT COUNT(*) as total FROM products")
-        total_products = cursor.fetchone()['total']
-        
-        cursor.execute("""
-            SELECT category, COUNT(*) as count 
-            FROM products 
-            GROUP BY category
-        """)
+        cursor.execute("SELECT category, product_count as count FROM category_facets")
         by_category = cursor.fetchall()
+        total_products = sum(row['count'] for row in by_category)
         
         cursor.execute("SELECT COUNT(*) as total FROM request_logs")
         total_requests = cursor.fetchone()['total']
@@ -628,7 +1739,8 @@ def get_stats():
                 "requests": {
                     "total": total_requests,
                     "cache_hits": cache_hits_db,
-                    "cache_hit_rate": f"{hit_rate:.2f}%"
+                    "cache_hit_rate": f"{hit_rate:.2f}%",
+                    "negative_cache_hits": db_stats['negative_cache_hits']
                 },
                 "cache": cache_stats,
                 "runtime_stats": db_stats
@@ -645,6 +1757,7 @@ def clear_cache():
         client = get_redis_client()
         if client:
             client.flushdb()
+            pinned_cache.clear()
             logger.info("✓ Cache limpo")
             return jsonify({
                 "success": True,
@@ -660,12 +1773,39 @@ def clear_cache():
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+@app.route('/cache/hotkeys')
+def get_hot_keys():
+    top = hot_keys.top()
+    return jsonify({
+        "success": True,
+        "top_k": [
+            {
+                "key": key,
+                "estimated_count": count,
+                "hot": count >= HOT_KEY_MIN_COUNT,
+                "pinned": key in pinned_cache
+            }
+            for key, count in top
+        ],
+        "pinned_keys": len(pinned_cache),
+        "config": {
+            "top_k": HOT_KEY_TOP_K,
+            "min_count": HOT_KEY_MIN_COUNT,
+            "sample_rate": HOT_KEY_SAMPLE_RATE,
+            "decay_interval_seconds": HOT_KEY_DECAY_INTERVAL,
+            "pin_ttl_seconds": HOT_KEY_PIN_TTL,
+            "request_log_sample": HOT_KEY_LOG_SAMPLE
+        }
+    }), 200
+
+
 if __name__ == '__main__':
     logger.info("=" * 70)
     logger.info("Iniciando Product Catalog API")
     logger.info(f"Database: {DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}")
     logger.info(f"Cache: {REDIS_CONFIG['host']}:{REDIS_CONFIG['port']}")
     logger.info(f"Cache TTL: {CACHE_TTL}s")
+    logger.info(f"Negative Cache TTL: {NEGATIVE_CACHE_TTL}s")
     logger.info("=" * 70)
     
     db_ready = init_database()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Benchmark dos modos de execução do Profile Service (Service B)
+
+Compara o modo threaded (Flask) com o modo async (aiohttp) sob 10, 100 e
+1000 clientes simultâneos, cada um repetindo requisições até o fim da
+janela de medição. Para cada modo e nível de concorrência reporta
+requisições/s, erros e latências p50/p90/p99.
+
+Por padrão mede serviços já rodando (--threaded-url / --async-url). Com
+--start o script sobe as duas versões do Service B localmente, apontadas
+para o Service A através de um proxy que adiciona --upstream-latency ms a
+cada chamada (simulando um Service A lento) e com o cache de respostas do
+cliente desligado, para que toda requisição chegue ao Service A.
+
+Uso:
+    python3 scripts/benchmark_serving_modes.py --threaded-url http://localhost:5001 \\
+        --async-url http://localhost:5002
+    python3 scripts/benchmark_serving_modes.py --start --service-a-url http://localhost:5000 \\
+        --upstream-latency 50 --duration 10 --output benchmark.json
+
+Precisa do aiohttp (gerador de carga); --start precisa também das
+dependências do service-b instaladas.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+import urllib.request
+
+import aiohttp
+from aiohttp import web
+
+SERVICE_B_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'service-b')
+
+
+# ============================================================================
+# SERVICE A LENTO (PROXY COM LATÊNCIA)
+# ============================================================================
+
+def run_latency_proxy(port, target, latency):
+    """Repassa cada requisição para `target` depois de `latency` segundos"""
+    async def forward(request):
+        await asyncio.sleep(latency)
+        session = request.app['session']
+        async with session.request(request.method, target + request.path_qs,
+                                   data=await request.read(),
+                                   headers={'Content-Type': request.content_type}) as response:
+            body = await response.read()
+            headers = {name: value for name, value in response.headers.items()
+                       if name.lower().startswith('x-change-')}
+            return web.Response(body=body, status=response.status,
+                                content_type=response.content_type, headers=headers)
+
+    async def session_context(app):
+        app['session'] = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0))
+        yield
+        await app['session'].close()
+
+    app = web.Application()
+    app.router.add_route('*', '/{path:.*}', forward)
+    app.cleanup_ctx.append(session_context)
+    web.run_app(app, host='127.0.0.1', port=port, access_log=None, print=None)
+
+
+# ============================================================================
+# SERVIÇOS LOCAIS
+# ============================================================================
+
+def wait_ready(url, timeout=20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=2):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'{url} did not become ready in {timeout}s')
+
+
+def start_service_b(mode, port, users_service_url):
+    env = dict(os.environ,
+               SERVING_MODE=mode,
+               PORT=str(port),
+               USERS_SERVICE_URL=users_service_url,
+               # Sem cache de respostas: toda requisição paga a latência do Service A
+               CLIENT_CACHE_TTL='0',
+               CLIENT_CACHE_STALE_TTL='0')
+    process = subprocess.Popen([sys.executable, 'app.py'], cwd=SERVICE_B_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    wait_ready(f'http://127.0.0.1:{port}/')
+    return process
+
+
+# ============================================================================
+# CARGA
+# ============================================================================
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return round(sorted_values[index] * 1000, 2)
+
+
+async def run_level(base_url, path, max_id, clients, duration, timeout):
+    """`clients` clientes simultâneos repetindo GET `path` por `duration` segundos"""
+    latencies = []
+    statuses = {}
+    errors = 0
+    connector = aiohttp.TCPConnector(limit=0, force_close=False)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=client_timeout) as session:
+        deadline = time.monotonic() + duration
+
+        async def client():
+            nonlocal errors
+            while time.monotonic() < deadline:
+                url = base_url + path.format(id=random.randint(1, max_id))
+                started = time.perf_counter()
+                try:
+                    async with session.get(url) as response:
+                        await response.read()
+                        statuses[response.status] = statuses.get(response.status, 0) + 1
+                        if response.status >= 500:
+                            errors += 1
+                        else:
+                            latencies.append(time.perf_counter() - started)
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'clients': clients,
+        'requests': len(latencies),
+        'errors': errors,
+        'status': {str(code): count for code, count in sorted(statuses.items())},
+        'elapsed_seconds': round(elapsed, 2),
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'latency_ms': {
+            'p50': percentile(latencies, 0.50),
+            'p90': percentile(latencies, 0.90),
+            'p99': percentile(latencies, 0.99),
+            'max': round(latencies[-1] * 1000, 2) if latencies else None
+        }
+    }
+
+
+def raise_file_limit():
+    """1000 clientes abrem 1000 conexões no gerador e no serviço"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or hard > soft:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard if hard != resource.RLIM_INFINITY else 65536, hard))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare threaded and async serving modes of the Profile Service')
+    parser.add_argument('--threaded-url', default='http://localhost:5001')
+    parser.add_argument('--async-url', default='http://localhost:5002')
+    parser.add_argument('--start', action='store_true',
+                        help='start both modes locally behind a slow Service A proxy')
+    parser.add_argument('--service-a-url', default=os.getenv('SERVICE_A_URL', 'http://localhost:5000'))
+    parser.add_argument('--upstream-latency', type=float, default=50, help='ms added to each Service A call (--start)')
+    parser.add_argument('--clients', default='10,100,1000', help='comma-separated concurrency levels')
+    parser.add_argument('--duration', type=float, default=10, help='seconds per level')
+    parser.add_argument('--path', default='/profiles/{id}', help='request path; {id} is a random user id')
+    parser.add_argument('--max-id', type=int, default=6, help='user ids are drawn from 1..max-id')
+    parser.add_argument('--timeout', type=float, default=30, help='client timeout per request')
+    parser.add_argument('--output', help='write the JSON report to this file')
+    args = parser.parse_args()
+
+    raise_file_limit()
+    levels = [int(level) for level in args.clients.split(',')]
+    modes = {'threaded': args.threaded_url, 'async': args.async_url}
+    processes = []
+
+    try:
+        if args.start:
+            proxy = multiprocessing.Process(
+                target=run_latency_proxy,
+                args=(5190, args.service_a_url.rstrip('/'), args.upstream_latency / 1000),
+                daemon=True
+            )
+            proxy.start()
+            processes.append(proxy)
+            wait_ready('http://127.0.0.1:5190/health')
+            modes = {'threaded': 'http://127.0.0.1:5191', 'async': 'http://127.0.0.1:5192'}
+            for port, mode in ((5191, 'threaded'), (5192, 'async')):
+                processes.append(start_service_b(mode, port, 'http://127.0.0.1:5190'))
+
+        report = {
+            'path': args.path,
+            'max_id': args.max_id,
+            'duration_seconds': args.duration,
+            'upstream_latency_ms': args.upstream_latency if args.start else None,
+            'results': {}
+        }
+        for mode, base_url in modes.items():
+            report['results'][mode] = []
+            for clients in levels:
+                result = asyncio.run(run_level(base_url.rstrip('/'), args.path, args.max_id,
+                                               clients, args.duration, args.timeout))
+                report['results'][mode].append(result)
+                latency = result['latency_ms']
+                print(f"{mode:>8} {clients:>5} clients: {result['throughput_rps']:>8} req/s  "
+                      f"p50 {latency['p50']} ms  p99 {latency['p99']} ms  errors {result['errors']}")
+    finally:
+        for process in processes:
+            process.terminate()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'Report written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Suíte de benchmarks dos dois serviços com dados sintéticos
+
+Para cada tamanho pedido (padrão 10k, 100k e 1M usuários) completa o
+Service A até esse número de usuários sintéticos via POST /admin/seed
+(mesma semente, então cada tamanho reaproveita os usuários do anterior) e
+mede:
+
+- Service A: filtros de GET /users (departamento raro, cargo, página de
+  um departamento grande) e /stats;
+- Service B: /profiles filtrado, /profiles?ids= e /profiles/<id>/summary.
+
+Cada cenário roda por --duration segundos (ou --max-requests requisições)
+com --concurrency clientes; a primeira requisição é reportada à parte
+(custo "frio"). O resultado vai para um relatório JSON com o commit atual,
+e --compare mostra a variação contra um relatório anterior.
+
+Uso:
+    python3 scripts/benchmark_suite.py --output report.json
+    python3 scripts/benchmark_suite.py --sizes 10000,100000 --compare report.json
+
+Os tamanhos devem ser crescentes: usuários já criados não são removidos.
+Só usa a biblioteca padrão.
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime
+
+
+# ============================================================================
+# CENÁRIOS
+# ============================================================================
+
+# (nome, serviço, caminho); {id} e {ids} são sorteados a cada requisição
+SCENARIOS = (
+    ('users_filter_rare_department', 'a', '/users?department=Legal&active=true'),
+    ('users_filter_role', 'a', '/users?role=Data%20Scientist'),
+    ('users_filter_page', 'a', '/users?department=Engineering&active=true&limit=100'),
+    ('stats', 'a', '/stats'),
+    ('profiles_filter_rare_department', 'b', '/profiles?department=Legal&active=true'),
+    ('profiles_by_ids', 'b', '/profiles?ids={ids}'),
+    ('profile_summary', 'b', '/profiles/{id}/summary')
+)
+
+
+def fetch(url, method='GET', body=None, timeout=600):
+    """(status, bytes do corpo, segundos) de uma requisição"""
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(url, data=data, method=method,
+                                     headers={'Content-Type': 'application/json'})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            payload = response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        payload = e.read()
+        status = e.code
+    return status, payload, time.perf_counter() - started
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return round(sorted_values[index] * 1000, 2)
+
+
+def run_scenario(base_url, path, max_id, duration, max_requests, concurrency, timeout):
+    """Repete GET `path` com `concurrency` clientes até o prazo ou o limite de requisições"""
+    def build_url():
+        return base_url + path.format(
+            id=random.randint(1, max_id),
+            ids=','.join(str(random.randint(1, max_id)) for _ in range(50))
+        )
+
+    status, payload, first = fetch(build_url(), timeout=timeout)
+
+    lock = threading.Lock()
+    latencies = []
+    statuses = {}
+    total_bytes = [0]
+    issued = [0]
+    deadline = time.monotonic() + duration
+
+    def client():
+        while time.monotonic() < deadline:
+            with lock:
+                if issued[0] >= max_requests:
+                    return
+                issued[0] += 1
+            try:
+                status, payload, elapsed = fetch(build_url(), timeout=timeout)
+            except OSError:
+                status, payload, elapsed = 'error', b'', None
+            with lock:
+                statuses[status] = statuses.get(status, 0) + 1
+                if elapsed is not None:
+                    latencies.append(elapsed)
+                    total_bytes[0] += len(payload)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'first_request_ms': round(first * 1000, 2),
+        'first_status': status,
+        'requests': len(latencies),
+        'status': {str(code): count for code, count in sorted(statuses.items(), key=str)},
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed > 0 else None,
+        'mean_bytes': round(total_bytes[0] / len(latencies)) if latencies else None,
+        'latency_ms': {
+            'p50': percentile(latencies, 0.50),
+            'p90': percentile(latencies, 0.90),
+            'p99': percentile(latencies, 0.99),
+            'max': round(latencies[-1] * 1000, 2) if latencies else None
+        }
+    }
+
+
+# ============================================================================
+# RELATÓRIO
+# ============================================================================
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline):
+    """Variação de p50 e throughput contra um relatório anterior"""
+    previous = {(size['users'], name): result
+                for size in baseline['sizes'] for name, result in size['scenarios'].items()}
+    print(f"\nComparison with {baseline.get('git_commit') or 'baseline'} ({baseline.get('generated_at')}):")
+    for size in report['sizes']:
+        for name, result in size['scenarios'].items():
+            old = previous.get((size['users'], name))
+            if not old or not old['latency_ms']['p50'] or not result['latency_ms']['p50']:
+                continue
+            p50_change = (result['latency_ms']['p50'] / old['latency_ms']['p50'] - 1) * 100
+            rps_change = (result['throughput_rps'] / old['throughput_rps'] - 1) * 100 if old['throughput_rps'] else 0
+            print(f"  {size['users']:>8} {name:<32} p50 {p50_change:+7.1f}%  throughput {rps_change:+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark both services at several synthetic data sizes')
+    parser.add_argument('--service-a-url', default=os.getenv('SERVICE_A_URL', 'http://localhost:5000'))
+    parser.add_argument('--service-b-url', default=os.getenv('SERVICE_B_URL', 'http://localhost:5001'))
+    parser.add_argument('--sizes', default='10000,100000,1000000', help='comma-separated, increasing')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--duration', type=float, default=10, help='seconds per scenario')
+    parser.add_argument('--max-requests', type=int, default=500, help='requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--timeout', type=float, default=120, help='client timeout per request')
+    parser.add_argument('--scenarios', help='comma-separated subset of scenario names')
+    parser.add_argument('--output', help='write the JSON report to this file')
+    parser.add_argument('--compare', help='previous JSON report to compare against')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    if sizes != sorted(sizes):
+        parser.error('--sizes must be increasing (seeded users are never removed)')
+    selected = set(args.scenarios.split(',')) if args.scenarios else None
+    urls = {'a': args.service_a_url.rstrip('/'), 'b': args.service_b_url.rstrip('/')}
+    random.seed(args.seed)
+
+    report = {
+        'generated_at': datetime.now().isoformat(),
+        'git_commit': git_commit(),
+        'seed': args.seed,
+        'config': {
+            'duration_seconds': args.duration,
+            'max_requests': args.max_requests,
+            'concurrency': args.concurrency,
+            'service_a_url': urls['a'],
+            'service_b_url': urls['b']
+        },
+        'sizes': []
+    }
+
+    for size in sizes:
+        status, payload, elapsed = fetch(f"{urls['a']}/admin/seed", 'POST', {'users': size, 'seed': args.seed})
+        if status not in (200, 201):
+            print(f'Seeding {size} users failed ({status}): {payload[:200]!r}')
+            sys.exit(1)
+        seeded = json.loads(payload)
+        print(f"{size} synthetic users: {seeded['created']} created in {seeded['seconds']}s "
+              f"(store total {seeded['total_users']})")
+
+        entry = {'users': size, 'store_total': seeded['total_users'], 'seed_result': seeded, 'scenarios': {}}
+        for name, service, path in SCENARIOS:
+            if selected and name not in selected:
+                continue
+            result = run_scenario(urls[service], path, seeded['total_users'], args.duration,
+                                  args.max_requests, args.concurrency, args.timeout)
+            entry['scenarios'][name] = result
+            latency = result['latency_ms']
+            print(f"  {name:<32} {result['throughput_rps']:>9} req/s  p50 {latency['p50']} ms  "
+                  f"p99 {latency['p99']} ms  first {result['first_request_ms']} ms  status {result['status']}")
+        report['sizes'].append(entry)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'Report written to {args.output}')
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
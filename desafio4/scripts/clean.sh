@@ -12,6 +12,7 @@ echo ""
 echo "⚠️  ATENÇÃO: Este script irá remover:"
 echo "   - Todos os containers"
 echo "   - Todas as imagens"
+echo "   - Volume de dados do Users Service"
 echo "   - Rede Docker"
 echo ""
 read -p "Deseja continuar? (s/N) " -n 1 -r
@@ -24,7 +25,7 @@ fi
 
 echo ""
 echo "🧹 Parando e removendo containers..."
-docker compose down
+docker compose down -v
 
 echo ""
 echo "🗑️  Removendo imagens..."
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Teste de estresse de concorrência do Users Service (Service A)
+
+Dispara escritores (criação com usernames únicos e repetidos, atualização
+e desativação) em paralelo com leitores de /users e /stats e, ao final,
+verifica os invariantes do store:
+
+- nenhum ID ou username duplicado;
+- cada username repetido criado exatamente uma vez;
+- total, ativos e agrupamentos de /stats batem com a listagem;
+- nenhuma resposta 5xx nem exceção nos leitores.
+
+Uso:
+    python3 scripts/stress_test.py                  # contra http://localhost:5000
+    python3 scripts/stress_test.py --url http://host:5000 --writers 16 --readers 8
+    python3 scripts/stress_test.py --in-process     # importa service-a/app.py direto
+
+Só usa a biblioteca padrão (o modo --in-process precisa do Flask instalado).
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import Counter
+
+
+# ============================================================================
+# CLIENTES
+# ============================================================================
+
+class HttpClient:
+    """Cliente HTTP mínimo sobre urllib"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(
+            self.base_url + path, data=data, method=method,
+            headers={'Content-Type': 'application/json'}
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=30) as resp:
+                return resp.status, json.loads(resp.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read() or b'{}')
+
+
+class InProcessClient:
+    """Mesma interface do HttpClient usando o test client do Flask"""
+
+    def __init__(self):
+        sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'service-a'))
+        import app as service_a
+        service_a.initialize_sample_data()
+        self.app = service_a.app
+
+    def request(self, method, path, body=None):
+        with self.app.test_client() as client:
+            resp = client.open(path, method=method, json=body)
+            return resp.status_code, resp.get_json()
+
+
+# ============================================================================
+# CARGA
+# ============================================================================
+
+class Results:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.status = Counter()
+        self.errors = []
+        self.created = []
+
+    def record(self, status):
+        with self.lock:
+            self.status[status] += 1
+
+    def fail(self, message):
+        with self.lock:
+            self.errors.append(message)
+
+
+def writer(client, results, run_id, worker, operations, contended):
+    for i in range(operations):
+        # Metade das criações disputa o mesmo conjunto de usernames
+        if i % 2 and contended:
+            username = f'{run_id}_shared_{(i // 2) % contended}'
+        else:
+            username = f'{run_id}_w{worker}_{i}'
+        status, body = client.request('POST', '/users', {
+            'username': username,
+            'email': f'{username}@example.com',
+            'full_name': f'Stress {worker} {i}',
+            'role': ('Developer', 'QA Engineer', 'Designer')[i % 3],
+            'department': ('Engineering', 'Product', 'Operations')[worker % 3]
+        })
+        results.record(status)
+        if status == 201:
+            user = body['user']
+            with results.lock:
+                results.created.append((user['id'], user['username']))
+            if i % 5 == 0:
+                status, _ = client.request('PUT', f"/users/{user['id']}", {'department': 'Analytics'})
+                results.record(status)
+            if i % 7 == 0:
+                status, _ = client.request('DELETE', f"/users/{user['id']}")
+                results.record(status)
+        elif status != 400:
+            results.fail(f'POST /users -> {status}: {body}')
+
+
+def reader(client, results, stop):
+    while not stop.is_set():
+        for path in ('/users', '/stats', '/users?active=true&department=engineering'):
+            status, body = client.request('GET', path)
+            results.record(status)
+            if status != 200:
+                results.fail(f'GET {path} -> {status}')
+            elif path == '/users' and body['total'] != len(body['users']):
+                results.fail('GET /users returned inconsistent total')
+
+
+# ============================================================================
+# VERIFICAÇÃO
+# ============================================================================
+
+def verify(client, results, run_id, contended):
+    _, listing = client.request('GET', '/users')
+    _, stats = client.request('GET', '/stats')
+    users = listing['users']
+
+    ids = Counter(user['id'] for user in users)
+    usernames = Counter(user['username'] for user in users)
+    duplicated_ids = [user_id for user_id, n in ids.items() if n > 1]
+    duplicated_names = [name for name, n in usernames.items() if n > 1]
+    if duplicated_ids:
+        results.fail(f'Duplicated ids: {duplicated_ids[:10]}')
+    if duplicated_names:
+        results.fail(f'Duplicated usernames: {duplicated_names[:10]}')
+    if [user['id'] for user in users] != sorted(ids):
+        results.fail('GET /users is not ordered by id')
+
+    created_ids = [user_id for user_id, _ in results.created]
+    if len(created_ids) != len(set(created_ids)):
+        results.fail('The same id was returned by two creations')
+    shared = sum(1 for name in usernames if name.startswith(f'{run_id}_shared_'))
+    if contended and shared != contended:
+        results.fail(f'Expected {contended} shared usernames, found {shared}')
+
+    totals = stats['users']
+    active = sum(1 for user in users if user['active'])
+    departments = Counter(user.get('department', 'Unknown') for user in users)
+    roles = Counter(user.get('role', 'Unknown') for user in users)
+    if totals['total'] != len(users) or totals['active'] != active:
+        results.fail(f"/stats totals {totals['total']}/{totals['active']} != listing {len(users)}/{active}")
+    if totals['by_department'] != dict(departments) or totals['by_role'] != dict(roles):
+        results.fail('/stats grouped counters do not match the listing')
+
+    return len(users)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrency stress test for the Users Service')
+    parser.add_argument('--url', default=os.getenv('SERVICE_A_URL', 'http://localhost:5000'))
+    parser.add_argument('--in-process', action='store_true', help='run against service-a/app.py imported in this process')
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--operations', type=int, default=200, help='creations per writer')
+    parser.add_argument('--contended', type=int, default=20, help='usernames disputed by all writers')
+    args = parser.parse_args()
+
+    client = InProcessClient() if args.in_process else HttpClient(args.url)
+    results = Results()
+    run_id = uuid.uuid4().hex[:8]
+    stop = threading.Event()
+
+    writers = [threading.Thread(target=writer, args=(client, results, run_id, n, args.operations, args.contended))
+               for n in range(args.writers)]
+    readers = [threading.Thread(target=reader, args=(client, results, stop)) for _ in range(args.readers)]
+
+    started = time.perf_counter()
+    for thread in readers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    stop.set()
+    for thread in readers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    total_users = verify(client, results, run_id, args.contended)
+    requests_done = sum(results.status.values())
+
+    print(f'Requests: {requests_done} in {elapsed:.2f}s ({requests_done / elapsed:.0f} req/s)')
+    print(f'Status: {dict(sorted(results.status.items()))}')
+    print(f'Users created: {len(results.created)} (store total: {total_users})')
+    if results.errors:
+        print(f'FAILED: {len(results.errors)} error(s)')
+        for message in results.errors[:20]:
+            print(f'  - {message}')
+        sys.exit(1)
+    print('OK: no duplicates, no 5xx, counters consistent')
+
+
+if __name__ == '__main__':
+    main()
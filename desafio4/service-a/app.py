@@ -1,8 +1,22 @@
-from flask import Flask, jsonify, request
+from flask import Flask, g, jsonify, request
 from datetime import datetime, timedelta
+import gc
+import glob
+import io
+import itertools
+import json
 import logging
+import os
+import pickle
 import random
+import sys
+import threading
+import time
 import uuid
+import zlib
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
 
 logging.basicConfig(
     level=logging.INFO,
@@ -13,7 +27,824 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
-USERS_DB = {}
+# Persistência (snapshot + journal)
+PERSISTENCE_ENABLED = os.getenv('PERSISTENCE_ENABLED', 'true').lower() == 'true'
+DATA_DIR = os.getenv('DATA_DIR', '/data')
+JOURNAL_FSYNC_BATCH = int(os.getenv('JOURNAL_FSYNC_BATCH', 64))
+JOURNAL_FSYNC_INTERVAL = float(os.getenv('JOURNAL_FSYNC_INTERVAL', 1.0))
+SNAPSHOT_INTERVAL = int(os.getenv('SNAPSHOT_INTERVAL', 300))
+SNAPSHOT_FILE = 'users-snapshot.pkl.z'
+STORE_SHARD_SIZE = int(os.getenv('STORE_SHARD_SIZE', 512))
+
+# Paginação de GET /users
+MAX_PAGE_LIMIT = int(os.getenv('MAX_PAGE_LIMIT', 1000))
+MAX_BATCH_IDS = int(os.getenv('MAX_BATCH_IDS', 1000))
+
+# Log de alterações (GET /users/changes)
+CHANGE_LOG_RETENTION = int(os.getenv('CHANGE_LOG_RETENTION', 10000))
+CHANGES_MAX_WAIT = float(os.getenv('CHANGES_MAX_WAIT', 30))
+
+# Importação em lote (POST /users/bulk)
+BULK_MAX_USERS = int(os.getenv('BULK_MAX_USERS', 100000))
+
+# Usuários sintéticos (POST /admin/seed ou SYNTHETIC_USERS na inicialização)
+SYNTHETIC_USERS = int(os.getenv('SYNTHETIC_USERS', 0))
+SYNTHETIC_SEED = int(os.getenv('SYNTHETIC_SEED', 42))
+SYNTHETIC_MAX_USERS = int(os.getenv('SYNTHETIC_MAX_USERS', 2000000))
+USER_FIELDS = (
+    'id', 'username', 'email', 'full_name', 'role', 'department', 'active',
+    'registration_date', 'last_login', 'projects', 'skills', 'location'
+)
+
+
+def encode_json(value):
+    # Mesmo formato do jsonify fora de debug: chaves ordenadas e compacto
+    return json.dumps(value, sort_keys=True, separators=(',', ':'))
+
+
+class UserRecord:
+    """
+    Representação compacta de um usuário
+    
+    Usa __slots__ em vez de um dict por usuário, tuplas no lugar das listas
+    e strings internadas para os campos de baixa cardinalidade (cargo,
+    departamento e localização), que passam a ser compartilhadas entre
+    registros. Aceita acesso estilo dict (user['id'], user.get(...)) e só
+    vira dict (mesmo formato JSON de antes) na borda, com to_dict().
+    """
+    
+    __slots__ = USER_FIELDS + ('_json',)
+    INTERNED_FIELDS = ('role', 'department', 'location')
+    LIST_FIELDS = ('projects', 'skills')
+    
+    def __init__(self, id, username, email, full_name, role, department, active,
+                 registration_date, last_login, projects, skills, location):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.full_name = full_name
+        self.role = self._intern(role)
+        self.department = self._intern(department)
+        self.active = active
+        self.registration_date = registration_date
+        self.last_login = last_login
+        self.projects = self._freeze(projects)
+        self.skills = self._freeze(skills)
+        self.location = self._intern(location)
+    
+    @staticmethod
+    def _intern(value):
+        return sys.intern(value) if isinstance(value, str) else value
+    
+    @staticmethod
+    def _freeze(value):
+        return tuple(value) if isinstance(value, list) else value
+    
+    @classmethod
+    def from_dict(cls, data):
+        return cls(*(data.get(field) for field in USER_FIELDS))
+    
+    def to_dict(self):
+        user = {field: getattr(self, field) for field in USER_FIELDS}
+        for field in self.LIST_FIELDS:
+            if isinstance(user[field], tuple):
+                user[field] = list(user[field])
+        return user
+    
+    def to_json(self):
+        """
+        Usuário já serializado (mesmo JSON que o jsonify geraria)
+        
+        O fragmento é guardado no próprio registro na primeira chamada. Como
+        registros são imutáveis e update() grava um novo registro, o cache é
+        invalidado automaticamente a cada alteração.
+        """
+        try:
+            return self._json
+        except AttributeError:
+            self._json = encode_json(self.to_dict())
+            return self._json
+    
+    def project(self, fields):
+        """Dict só com os campos pedidos (parâmetro fields= de GET /users)"""
+        user = {field: getattr(self, field) for field in fields}
+        for field in self.LIST_FIELDS:
+            if isinstance(user.get(field), tuple):
+                user[field] = list(user[field])
+        return user
+    
+    def replace(self, **changes):
+        """Cópia do registro com os campos alterados"""
+        values = {field: getattr(self, field) for field in USER_FIELDS}
+        values.update(changes)
+        return UserRecord(**values)
+    
+    def __getitem__(self, field):
+        try:
+            return getattr(self, field)
+        except AttributeError:
+            raise KeyError(field)
+    
+    def get(self, field, default=None):
+        return getattr(self, field, default)
+
+
+class StoreShard:
+    """
+    Faixa contígua de IDs do store (registros + índices dessa faixa)
+    
+    Um shard publicado nunca é alterado: o escritor clona o shard antes da
+    primeira modificação (copy-on-write), então o custo de cada escrita é
+    limitado ao tamanho do shard e não ao total de usuários.
+    """
+    
+    __slots__ = ('users', 'by_active', 'by_department', 'by_role')
+    
+    def __init__(self):
+        self.users = {}
+        self.by_active = {True: set(), False: set()}
+        self.by_department = {}
+        self.by_role = {}
+    
+    def clone(self):
+        shard = StoreShard()
+        shard.users = dict(self.users)
+        shard.by_active = {key: set(ids) for key, ids in self.by_active.items()}
+        shard.by_department = {key: set(ids) for key, ids in self.by_department.items()}
+        shard.by_role = {key: set(ids) for key, ids in self.by_role.items()}
+        return shard
+    
+    def filter_ids(self, active, department_key, role_key):
+        candidates = []
+        if active is not None:
+            candidates.append(self.by_active[active])
+        if department_key is not None:
+            candidates.append(self.by_department.get(department_key, ()))
+        if role_key is not None:
+            candidates.append(self.by_role.get(role_key, ()))
+        candidates.sort(key=len)
+        if not candidates[0]:
+            return []
+        return sorted(set(candidates[0]).intersection(*candidates[1:]))
+
+
+class StoreView:
+    """
+    Snapshot imutável do store, usado pelos leitores
+    
+    Obtido com UserStore.snapshot() sem lock: é só a leitura de uma
+    referência que os escritores substituem ao final de cada escrita.
+    """
+    
+    __slots__ = ('shards', 'department_counts', 'role_counts', 'active', 'size', 'seq')
+    
+    def __init__(self, shards, department_counts, role_counts, active, size, seq=0):
+        self.shards = shards
+        self.department_counts = department_counts
+        self.role_counts = role_counts
+        self.active = active
+        self.size = size
+        # Seq do ChangeLog que esta view já reflete (ponto de partida de réplicas)
+        self.seq = seq
+    
+    def __len__(self):
+        return self.size
+    
+    def get(self, user_id):
+        index = (user_id - 1) // STORE_SHARD_SIZE
+        if 0 <= index < len(self.shards):
+            return self.shards[index].users.get(user_id)
+        return None
+    
+    def values(self):
+        """Todos os usuários, em ordem de ID"""
+        users = []
+        for shard in self.shards:
+            users.extend(shard.users.values())
+        return users
+    
+    def filter(self, active=None, department=None, role=None):
+        """
+        Filtra usuários pela interseção dos índices de cada shard
+        
+        Returns:
+            list: usuários ordenados por ID
+        """
+        return self.page(active=active, department=department, role=role)[0]
+    
+    def page(self, after=0, limit=None, active=None, department=None, role=None):
+        """
+        Página de usuários com ID maior que `after`, em ordem de ID
+        
+        Os shards são faixas de IDs, então a busca começa direto no shard
+        do cursor e para assim que a página enche: o custo é proporcional
+        ao tamanho da página, não ao total de usuários.
+        
+        Returns:
+            tuple: (usuários, há_mais_páginas)
+        """
+        filtered = active is not None or department or role
+        department_key = UserStore._fold(department) if department else None
+        role_key = UserStore._fold(role) if role else None
+        wanted = limit + 1 if limit is not None else None
+        users = []
+        for shard in self.shards[max(after, 0) // STORE_SHARD_SIZE:]:
+            if filtered:
+                ids = shard.filter_ids(active, department_key, role_key)
+                matches = [shard.users[user_id] for user_id in ids if user_id > after]
+            elif after:
+                matches = [user for user_id, user in shard.users.items() if user_id > after]
+            else:
+                matches = shard.users.values()
+            users.extend(matches)
+            if wanted is not None and len(users) >= wanted:
+                break
+        if wanted is not None and len(users) >= wanted:
+            return users[:limit], True
+        return users, False
+
+
+class ChangeLog:
+    """
+    Log sequenciado de alterações (create, update, deactivate) em memória
+    
+    Mantém só os últimos CHANGE_LOG_RETENTION eventos. O `epoch` muda a cada
+    início do processo: um consumidor com epoch diferente, ou cujo `since`
+    já saiu da janela de retenção, precisa refazer a carga completa
+    (resync). Cada evento guarda o UserRecord imutável já alterado, então
+    o log não duplica os dados dos usuários.
+    """
+    
+    def __init__(self, retention=CHANGE_LOG_RETENTION):
+        self.epoch = uuid.uuid4().hex
+        self.retention = retention
+        self.events = deque(maxlen=retention)
+        self.seq = 0
+        self.condition = threading.Condition()
+    
+    def extend(self, changes):
+        """Registra uma lista de (op, UserRecord) e acorda os long-polls"""
+        with self.condition:
+            at = datetime.now().isoformat()
+            for op, user in changes:
+                self.seq += 1
+                self.events.append((self.seq, op, user, at))
+            self.condition.notify_all()
+    
+    def oldest_seq(self) -> int:
+        return self.events[0][0] if self.events else self.seq + 1
+    
+    def read(self, since, limit, timeout=0):
+        """
+        Eventos com seq > since, esperando até `timeout` segundos se não
+        houver nenhum
+        
+        Returns:
+            list: eventos (seq, op, user, at), ou None se since está fora da
+            janela de retenção (resync necessário)
+        """
+        with self.condition:
+            if since > self.seq:
+                return None
+            if since == self.seq and timeout > 0:
+                self.condition.wait_for(lambda: self.seq > since, timeout)
+            # Os seqs na janela são contíguos, então o índice é direto
+            start = since - self.oldest_seq() + 1
+            if start < 0:
+                return None
+            return list(itertools.islice(self.events, start, start + limit))
+    
+    def to_dict(self):
+        return {
+            'epoch': self.epoch,
+            'latest_seq': self.seq,
+            'oldest_seq': self.oldest_seq(),
+            'retained': len(self.events),
+            'retention': self.retention
+        }
+
+
+class UserStore:
+    """
+    Armazenamento em memória dos usuários com índices secundários
+    
+    Mantém índices hash por username, departamento e cargo (case-folded)
+    e por status ativo, além de um alocador de IDs monotônico. Os registros
+    (UserRecord) nunca são alterados no lugar: toda atualização grava um
+    novo registro.
+    
+    Os contadores por departamento e cargo (com o valor original, como
+    exibido em /stats) são mantidos junto com os índices.
+    
+    Concorrência: escritores são serializados por um lock e trabalham em
+    cópias (copy-on-write) dos shards que alteram; ao final da escrita um
+    novo StoreView é publicado, junto com os eventos do lote no ChangeLog. Leitores usam o StoreView atual sem lock,
+    então listagens e estatísticas nunca esperam por escritas nem veem
+    estruturas mudando durante a iteração.
+    """
+    
+    INDEXED_FIELDS = ('username', 'active', 'department', 'role')
+    
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.journal = None
+        self.changes = ChangeLog()
+        self.by_username = {}
+        self.last_id = 0
+        self.view = StoreView((), {}, {}, 0, 0)
+        self._batch_depth = 0
+    
+    @staticmethod
+    def _fold(value) -> str:
+        return (value or '').casefold()
+    
+    @staticmethod
+    def _count(counts, value, delta):
+        counts[value] = counts.get(value, 0) + delta
+        if counts[value] <= 0:
+            del counts[value]
+    
+    # ------------------------------------------------------------------
+    # Leitura (sem lock, sobre o StoreView publicado)
+    # ------------------------------------------------------------------
+    
+    def snapshot(self) -> StoreView:
+        return self.view
+    
+    def __len__(self):
+        return len(self.view)
+    
+    def get(self, user_id):
+        return self.view.get(user_id)
+    
+    def values(self):
+        return self.view.values()
+    
+    def filter(self, active=None, department=None, role=None):
+        return self.view.filter(active, department, role)
+    
+    def page(self, after=0, limit=None, active=None, department=None, role=None):
+        return self.view.page(after, limit, active, department, role)
+    
+    def active_count(self) -> int:
+        return self.view.active
+    
+    @property
+    def department_counts(self):
+        return self.view.department_counts
+    
+    @property
+    def role_counts(self):
+        return self.view.role_counts
+    
+    # ------------------------------------------------------------------
+    # Escrita (serializada pelo lock, copy-on-write por shard)
+    # ------------------------------------------------------------------
+    
+    @contextmanager
+    def write_batch(self):
+        """
+        Agrupa escritas: cada shard é clonado uma única vez e o novo
+        StoreView é publicado só ao final do lote mais externo
+        
+        O lote é tudo ou nada: se algo levantar exceção, os shards clonados e
+        os eventos são descartados, by_username e last_id voltam ao estado
+        anterior e nada é gravado no journal.
+        """
+        with self.lock:
+            if self._batch_depth == 0:
+                view = self.view
+                self._shards = list(view.shards)
+                self._dirty = set()
+                self._department_counts = dict(view.department_counts)
+                self._role_counts = dict(view.role_counts)
+                self._active = view.active
+                self._size = view.size
+                self._events = []
+                self._journal_entries = []
+                self._username_undo = []
+                self._last_id = self.last_id
+            self._batch_depth += 1
+            committed = False
+            try:
+                yield
+                committed = True
+            finally:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    try:
+                        if committed:
+                            self._commit()
+                        else:
+                            self._rollback()
+                    finally:
+                        del self._shards, self._dirty, self._events
+                        del self._journal_entries, self._username_undo
+    
+    def _commit(self):
+        try:
+            if self.journal and self._journal_entries:
+                self.journal.append_many(self._journal_entries)
+        except Exception:
+            self._rollback()
+            raise
+        if self.changes and self._events:
+            self.changes.extend(self._events)
+        self.view = StoreView(
+            tuple(self._shards), self._department_counts,
+            self._role_counts, self._active, self._size,
+            self.changes.seq if self.changes else self.view.seq
+        )
+    
+    def _rollback(self):
+        for username, previous in reversed(self._username_undo):
+            if previous is None:
+                self.by_username.pop(username, None)
+            else:
+                self.by_username[username] = previous
+        self.last_id = self._last_id
+    
+    def _log(self, op, user_id, data):
+        """Registro de journal do lote, gravado só se o lote inteiro der certo"""
+        if self.journal:
+            self._journal_entries.append((op, user_id, data))
+    
+    def _shard_for_write(self, user_id) -> StoreShard:
+        index = (user_id - 1) // STORE_SHARD_SIZE
+        while len(self._shards) <= index:
+            self._shards.append(StoreShard())
+            self._dirty.add(len(self._shards) - 1)
+        if index not in self._dirty:
+            self._shards[index] = self._shards[index].clone()
+            self._dirty.add(index)
+        return self._shards[index]
+    
+    def _index_field(self, shard, user, field):
+        user_id = user['id']
+        if field == 'username':
+            self._username_undo.append((user['username'], self.by_username.get(user['username'])))
+            self.by_username[user['username']] = user_id
+        elif field == 'active':
+            shard.by_active[bool(user['active'])].add(user_id)
+            if user['active']:
+                self._active += 1
+        elif field == 'department':
+            shard.by_department.setdefault(self._fold(user.get('department')), set()).add(user_id)
+            self._count(self._department_counts, user.get('department', 'Unknown'), 1)
+        elif field == 'role':
+            shard.by_role.setdefault(self._fold(user.get('role')), set()).add(user_id)
+            self._count(self._role_counts, user.get('role', 'Unknown'), 1)
+    
+    def _unindex_field(self, shard, user, field):
+        user_id = user['id']
+        if field == 'username':
+            self._username_undo.append((user['username'], self.by_username.get(user['username'])))
+            self.by_username.pop(user['username'], None)
+        elif field == 'active':
+            shard.by_active[bool(user['active'])].discard(user_id)
+            if user['active']:
+                self._active -= 1
+        elif field in ('department', 'role'):
+            index = shard.by_department if field == 'department' else shard.by_role
+            counts = self._department_counts if field == 'department' else self._role_counts
+            key = self._fold(user.get(field))
+            ids = index.get(key)
+            if ids is not None:
+                ids.discard(user_id)
+                if not ids:
+                    del index[key]
+            self._count(counts, user.get(field, 'Unknown'), -1)
+    
+    def username_exists(self, username) -> bool:
+        return username in self.by_username
+    
+    def contains(self, user_id) -> bool:
+        """Existência do ID do ponto de vista do escritor (inclui o lote em curso)"""
+        with self.lock:
+            shards = self._shards if self._batch_depth else self.view.shards
+            index = (user_id - 1) // STORE_SHARD_SIZE
+            return 0 <= index < len(shards) and user_id in shards[index].users
+    
+    def _insert(self, user):
+        shard = self._shard_for_write(user.id)
+        shard.users[user.id] = user
+        for field in self.INDEXED_FIELDS:
+            self._index_field(shard, user, field)
+        self._size += 1
+        self.last_id = max(self.last_id, user.id)
+    
+    def create(self, data):
+        """
+        Cria usuário com ID novo; checagem de username e alocação de ID
+        acontecem sob o mesmo lock, então não há IDs nem usernames duplicados
+        
+        Raises:
+            ValueError: username já existe
+        """
+        with self.write_batch():
+            if data['username'] in self.by_username:
+                raise ValueError(f"Username '{data['username']}' already exists")
+            return self.add({**data, 'id': self.last_id + 1})
+    
+    def create_many(self, items):
+        """
+        Cria vários usuários de forma atômica
+        
+        Todos os usernames são verificados antes da primeira inserção e o
+        lote inteiro é publicado num único StoreView: leitores veem todos os
+        usuários novos ou nenhum.
+        
+        Raises:
+            ValueError: algum username já existe (nada é inserido)
+        """
+        with self.write_batch():
+            seen = set()
+            for data in items:
+                if data['username'] in self.by_username or data['username'] in seen:
+                    raise ValueError(f"Username '{data['username']}' already exists")
+                seen.add(data['username'])
+            return [self._add({**data, 'id': self.last_id + 1}) for data in items]
+    
+    def add(self, data):
+        """Insere um usuário (com ID já definido) a partir de um dict"""
+        with self.write_batch():
+            return self._add(data)
+    
+    def _add(self, data):
+        user = UserRecord.from_dict(data)
+        self._insert(user)
+        self._log('create', user.id, user.to_dict())
+        self._events.append(('create', user))
+        return user
+    
+    def load(self, users):
+        """
+        Carga em lote de UserRecords usada no restore: mesmo efeito de add()
+        para cada usuário, sem journal e numa única publicação
+        """
+        with self.write_batch():
+            for user in users:
+                self._insert(user)
+    
+    def update(self, user_id, changes, op='update'):
+        """
+        Substitui o registro por uma cópia com as alterações aplicadas
+        
+        Só os índices e contadores dos campos que realmente mudaram são tocados.
+        """
+        with self.write_batch():
+            shard = self._shard_for_write(user_id)
+            old = shard.users[user_id]
+            new = old.replace(**changes)
+            shard.users[user_id] = new
+            for field in self.INDEXED_FIELDS:
+                if field in changes and old.get(field) != new.get(field):
+                    self._unindex_field(shard, old, field)
+                    self._index_field(shard, new, field)
+            self._log(op, user_id, changes)
+            self._events.append(('deactivate' if op == 'delete' else op, new))
+        return new
+    
+    def deactivate(self, user_id):
+        return self.update(user_id, {'active': False}, op='delete')
+    
+    def checkpoint(self):
+        """
+        Captura um estado consistente para snapshot
+        
+        O StoreView publicado já é imutável, então basta rotacionar o journal
+        e pegar a view sob o lock; a serialização acontece fora dele.
+        """
+        with self.lock:
+            seq = self.journal.rotate() if self.journal else 0
+            return seq, self.last_id, self.view
+
+
+users_store = UserStore()
+
+
+# ============================================================================
+# PERSISTÊNCIA - JOURNAL + SNAPSHOT
+# ============================================================================
+
+class UserJournal:
+    """
+    Journal append-only das escritas (NDJSON, um registro por linha)
+    
+    Cada registro tem um número de sequência. O fsync é feito em lotes: a
+    cada JOURNAL_FSYNC_BATCH registros ou a cada JOURNAL_FSYNC_INTERVAL
+    segundos, o que vier primeiro (JOURNAL_FSYNC_BATCH=1 sincroniza sempre).
+    O journal é dividido em segmentos journal-<primeira seq>.log, rotacionados
+    a cada snapshot.
+    """
+    
+    def __init__(self, directory, seq=0, fsync_batch=JOURNAL_FSYNC_BATCH,
+                 fsync_interval=JOURNAL_FSYNC_INTERVAL):
+        self.directory = directory
+        self.seq = seq
+        self.fsync_batch = max(1, fsync_batch)
+        self.fsync_interval = fsync_interval
+        self.pending = 0
+        self.lock = threading.Lock()
+        self.file = self._open_segment()
+        threading.Thread(target=self._flush_loop, daemon=True).start()
+    
+    def _open_segment(self):
+        path = os.path.join(self.directory, f"journal-{self.seq + 1:012d}.log")
+        return open(path, 'a', encoding='utf-8')
+    
+    def _sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.pending = 0
+    
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.fsync_interval)
+            with self.lock:
+                if self.pending:
+                    self._sync()
+    
+    def append(self, op, user_id, data):
+        self.append_many([(op, user_id, data)])
+    
+    def append_many(self, entries):
+        """Grava os registros de um lote com uma única escrita"""
+        with self.lock:
+            lines = []
+            seq = self.seq
+            for op, user_id, data in entries:
+                seq += 1
+                lines.append(json.dumps({
+                    'seq': seq, 'op': op, 'id': user_id, 'data': data
+                }) + '\n')
+            self.file.write(''.join(lines))
+            self.seq = seq
+            self.pending += len(lines)
+            if self.pending >= self.fsync_batch:
+                self._sync()
+    
+    def rotate(self) -> int:
+        """Fecha o segmento atual e abre outro; retorna a última seq gravada"""
+        with self.lock:
+            self._sync()
+            self.file.close()
+            self.file = self._open_segment()
+            return self.seq
+
+
+SNAPSHOT_LOCK = threading.Lock()
+
+
+def journal_segments(directory):
+    return sorted(glob.glob(os.path.join(directory, 'journal-*.log')))
+
+
+def write_snapshot(store, directory):
+    """
+    Grava snapshot compacto e remove os segmentos de journal já cobertos
+    
+    O snapshot é colunar (uma lista por campo), serializado com pickle e
+    comprimido com zlib; como os UserRecords já internam departamento, cargo
+    e localização, o pickle grava cada um desses valores uma única vez.
+    """
+    # snapshot_loop e POST /admin/snapshot não podem gravar ao mesmo tempo:
+    # os dois usariam o mesmo .tmp e apagariam segmentos um do outro
+    with SNAPSHOT_LOCK:
+        started = time.perf_counter()
+        seq, last_id, view = store.checkpoint()
+        covered = [path for path in journal_segments(directory)
+                   if int(os.path.basename(path)[8:20]) <= seq]
+        
+        records = view.values()
+        columns = {field: [getattr(user, field) for user in records] for field in USER_FIELDS}
+        payload = zlib.compress(pickle.dumps({
+            'seq': seq,
+            'last_id': last_id,
+            'columns': columns
+        }, protocol=pickle.HIGHEST_PROTOCOL), 1)
+        
+        tmp_path = os.path.join(directory, SNAPSHOT_FILE + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, os.path.join(directory, SNAPSHOT_FILE))
+        
+        # Só depois de publicado o snapshot os segmentos que ele cobre podem sair
+        for path in covered:
+            os.remove(path)
+        
+        elapsed = time.perf_counter() - started
+        PERSISTENCE_STATS['last_snapshot_seq'] = seq
+        PERSISTENCE_STATS['last_snapshot_at'] = datetime.now().isoformat()
+        PERSISTENCE_STATS['last_snapshot_seconds'] = round(elapsed, 3)
+    logger.info(f"Snapshot written: {len(records)} users up to seq {seq} in {elapsed:.2f}s")
+    return seq
+
+
+def restore_from_disk(store, directory):
+    """
+    Carrega o snapshot mais recente e reaplica o restante do journal
+    
+    Returns:
+        int: última seq aplicada
+    """
+    started = time.perf_counter()
+    seq = 0
+    snapshot_path = os.path.join(directory, SNAPSHOT_FILE)
+    
+    # Milhões de dicts novos disparariam coletas do GC sem nada para coletar
+    gc.disable()
+    try:
+        if os.path.exists(snapshot_path):
+            with open(snapshot_path, 'rb') as f:
+                snapshot = pickle.loads(zlib.decompress(f.read()))
+            columns = [snapshot['columns'][field] for field in USER_FIELDS]
+            store.load(UserRecord(*row) for row in zip(*columns))
+            store.last_id = max(store.last_id, snapshot['last_id'])
+            seq = snapshot['seq']
+            del snapshot
+    finally:
+        gc.enable()
+    
+    # O replay reconstrói o estado anterior: não gera eventos de alteração
+    changes, store.changes = store.changes, None
+    replayed = 0
+    try:
+        with store.write_batch():
+            for path in journal_segments(directory):
+                with open(path, encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except json.JSONDecodeError:
+                            # Linha parcial de uma escrita interrompida
+                            logger.warning(f"Ignoring truncated journal record in {path}")
+                            break
+                        if record['seq'] <= seq:
+                            continue
+                        if record['op'] == 'create':
+                            store.add(record['data'])
+                        elif store.contains(record['id']):
+                            store.update(record['id'], record['data'], op=record['op'])
+                        seq = record['seq']
+                        replayed += 1
+    finally:
+        store.changes = changes
+    
+    elapsed = time.perf_counter() - started
+    PERSISTENCE_STATS['restored_users'] = len(store)
+    PERSISTENCE_STATS['replayed_records'] = replayed
+    PERSISTENCE_STATS['restore_seconds'] = round(elapsed, 3)
+    logger.info(f"Restored {len(store)} users ({replayed} journal records) in {elapsed:.2f}s")
+    return seq
+
+
+def snapshot_loop(store, directory, interval=SNAPSHOT_INTERVAL):
+    while True:
+        time.sleep(interval)
+        try:
+            if store.journal and store.journal.seq > PERSISTENCE_STATS['last_snapshot_seq']:
+                write_snapshot(store, directory)
+        except Exception as e:
+            logger.error(f"Snapshot failed: {e}")
+
+
+def init_persistence(store, directory=DATA_DIR):
+    """
+    Restaura o estado do disco e liga o journal ao store
+    
+    Returns:
+        bool: True se havia dados persistidos
+    """
+    os.makedirs(directory, exist_ok=True)
+    had_data = (os.path.exists(os.path.join(directory, SNAPSHOT_FILE))
+                or bool(journal_segments(directory)))
+    seq = restore_from_disk(store, directory) if had_data else 0
+    
+    store.journal = UserJournal(directory, seq=seq)
+    PERSISTENCE_STATS['enabled'] = True
+    PERSISTENCE_STATS['last_snapshot_seq'] = seq if had_data else 0
+    threading.Thread(target=snapshot_loop, args=(store, directory), daemon=True).start()
+    return had_data
+
+
+PERSISTENCE_STATS = {
+    'enabled': False,
+    'restored_users': 0,
+    'replayed_records': 0,
+    'restore_seconds': None,
+    'last_snapshot_seq': 0,
+    'last_snapshot_at': None,
+    'last_snapshot_seconds': None
+}
+
+# Última importação/exportação em lote (throughput em /stats)
+BULK_STATS = {
+    'last_import': None,
+    'last_export': None
+}
 
 STATS = {
     'total_requests': 0,
@@ -21,6 +852,136 @@ STATS = {
     'users_updated': 0,
     'start_time': datetime.now().isoformat()
 }
+STATS_LOCK = threading.Lock()
+
+
+def count_stat(name):
+    # "+=" em item de dict não é atômico entre threads do servidor
+    with STATS_LOCK:
+        STATS[name] += 1
+
+
+# ============================================================================
+# MÉTRICAS - HISTOGRAMAS DE LATÊNCIA
+# ============================================================================
+
+# A lógica deste bloco (LATENCY_BUCKETS até prometheus_metric) é a mesma nos
+# dois serviços de propósito: cada um é uma imagem Docker com um único app.py,
+# e os percentis só são comparáveis se os buckets forem os mesmos. Ao alterar
+# um, replique no outro (só o Service B tem type hints).
+
+# Limites superiores dos buckets: 4 por oitava, de 64 µs a ~67 s, então um
+# percentil estimado pelo bucket erra no máximo ~19% para cima
+LATENCY_BUCKETS = tuple(2 ** (6 + i / 4) / 1e6 for i in range(81))
+
+
+class Histogram:
+    """
+    Histograma de latências com buckets fixos (log-lineares)
+    
+    Registrar uma medida é uma busca binária e um incremento, sem guardar
+    amostras; p50/p90/p99 saem das contagens acumuladas (limite superior do
+    bucket, nunca acima do máximo observado).
+    """
+    
+    __slots__ = ('lock', 'counts', 'count', 'sum', 'max')
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+    
+    def record(self, seconds, count=1):
+        """Registra `count` medidas de `seconds` (média de um lote)"""
+        index = bisect_left(LATENCY_BUCKETS, seconds)
+        with self.lock:
+            self.counts[index] += count
+            self.count += count
+            self.sum += seconds * count
+            if seconds > self.max:
+                self.max = seconds
+    
+    def _snapshot(self):
+        with self.lock:
+            return list(self.counts), self.count, self.sum, self.max
+    
+    def to_dict(self):
+        """Percentis em milissegundos"""
+        counts, total, total_sum, maximum = self._snapshot()
+        
+        def percentile(fraction):
+            if not total:
+                return None
+            rank = fraction * total
+            cumulative = 0
+            for index, count in enumerate(counts):
+                cumulative += count
+                if cumulative >= rank:
+                    bound = LATENCY_BUCKETS[index] if index < len(LATENCY_BUCKETS) else maximum
+                    return round(min(bound, maximum) * 1000, 3)
+        
+        return {
+            'count': total,
+            'mean': round(total_sum / total * 1000, 3) if total else None,
+            'p50': percentile(0.50),
+            'p90': percentile(0.90),
+            'p99': percentile(0.99),
+            'max': round(maximum * 1000, 3) if total else None
+        }
+    
+    def prometheus(self, name, labels=''):
+        """Linhas _bucket/_sum/_count (buckets exportados: uma por oitava)"""
+        counts, total, total_sum, _ = self._snapshot()
+        separator = ',' if labels else ''
+        lines = []
+        cumulative = 0
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            cumulative += counts[index]
+            if index % 4 == 0:
+                lines.append(f'{name}_bucket{{{labels}{separator}le="{bound:.6g}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels}{separator}le="+Inf"}} {total}')
+        suffix = f'{{{labels}}}' if labels else ''
+        lines.append(f'{name}_sum{suffix} {total_sum:.6f}')
+        lines.append(f'{name}_count{suffix} {total}')
+        return lines
+
+
+class HistogramSet:
+    """Um Histogram por endpoint, criado no primeiro registro"""
+    
+    def __init__(self, keys=()):
+        self.lock = threading.Lock()
+        self.histograms = {key: Histogram() for key in keys}
+    
+    def get(self, key):
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(key, Histogram())
+        return histogram
+    
+    def record(self, key, seconds, count=1):
+        self.get(key).record(seconds, count)
+    
+    def to_dict(self):
+        return {key: histogram.to_dict() for key, histogram in sorted(self.histograms.items())}
+    
+    def prometheus(self, name, help_text):
+        lines = [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for key, histogram in sorted(self.histograms.items()):
+            lines.extend(histogram.prometheus(name, f'endpoint="{key}"'))
+        return lines
+
+
+def prometheus_metric(name, metric_type, help_text, value):
+    """Linhas de uma métrica simples (counter ou gauge) no formato Prometheus"""
+    return [f'# HELP {name} {help_text}', f'# TYPE {name} {metric_type}', f'{name} {value}']
+
+
+# Tempo de processamento de cada endpoint (do before_request ao after_request)
+REQUEST_LATENCY = HistogramSet()
 
 
 def initialize_sample_data():
@@ -112,22 +1073,195 @@ def initialize_sample_data():
     ]
     
     for user in sample_users:
-        USERS_DB[user['id']] = user
+        users_store.add(user)
     
     logger.info(f"Initialized database with {len(sample_users)} sample users")
 
 
+# ============================================================================
+# DADOS SINTÉTICOS
+# ============================================================================
+
+# Departamento, peso e cargos. Poucos departamentos concentram a maioria
+# dos usuários e, dentro de cada um, o primeiro cargo é o mais comum
+# (pesos ~1/k), como numa empresa real
+SYNTHETIC_DEPARTMENTS = (
+    ('Engineering', 38, ('Software Engineer', 'Senior Developer', 'QA Engineer', 'Tech Lead', 'Staff Engineer')),
+    ('Sales', 16, ('Account Executive', 'Sales Development Rep', 'Sales Manager')),
+    ('Operations', 11, ('DevOps Engineer', 'Site Reliability Engineer', 'IT Support')),
+    ('Product', 9, ('Product Manager', 'UX Designer', 'Product Analyst')),
+    ('Customer Success', 8, ('Support Specialist', 'Customer Success Manager')),
+    ('Analytics', 6, ('Data Scientist', 'Data Engineer', 'BI Analyst')),
+    ('Marketing', 5, ('Marketing Specialist', 'Content Writer', 'Growth Manager')),
+    ('Finance', 3, ('Financial Analyst', 'Accountant')),
+    ('People', 2, ('Recruiter', 'HR Business Partner')),
+    ('Legal', 1, ('Legal Counsel', 'Compliance Analyst')),
+    ('Security', 1, ('Security Engineer',))
+)
+SYNTHETIC_SKILLS = (
+    'Python', 'SQL', 'Docker', 'Git', 'Communication', 'JavaScript', 'Kubernetes', 'AWS',
+    'Excel', 'Agile', 'Java', 'Go', 'React', 'Terraform', 'Figma', 'Negotiation',
+    'Salesforce', 'Pandas', 'Linux', 'Jira', 'TypeScript', 'Spark', 'Rust', 'GraphQL'
+)
+SYNTHETIC_PROJECTS = tuple(f'Project {name}' for name in (
+    'Alpha', 'Beta', 'Gamma', 'Delta', 'Epsilon', 'Zeta', 'Eta', 'Theta', 'Iota', 'Kappa',
+    'Lambda', 'Mu', 'Nu', 'Xi', 'Omicron', 'Pi', 'Rho', 'Sigma', 'Tau', 'Upsilon'
+))
+SYNTHETIC_LOCATIONS = (
+    ('Remote', 30), ('San Francisco, CA', 12), ('New York, NY', 11), ('São Paulo, SP', 9),
+    ('London, UK', 7), ('Austin, TX', 6), ('Seattle, WA', 5), ('Berlin, DE', 4),
+    ('Boston, MA', 4), ('Chicago, IL', 3), ('Lisbon, PT', 2), ('Toronto, CA', 2)
+)
+SYNTHETIC_FIRST_NAMES = (
+    'Ana', 'Bruno', 'Carla', 'Daniel', 'Elena', 'Felipe', 'Gabriela', 'Hugo', 'Isabel', 'João',
+    'Karen', 'Lucas', 'Mariana', 'Nicolas', 'Olivia', 'Pedro', 'Rafaela', 'Samuel', 'Tatiana', 'Victor'
+)
+SYNTHETIC_LAST_NAMES = (
+    'Silva', 'Santos', 'Oliveira', 'Souza', 'Lima', 'Pereira', 'Costa', 'Rodrigues', 'Almeida',
+    'Nascimento', 'Smith', 'Johnson', 'Brown', 'Garcia', 'Miller', 'Davis', 'Martin', 'Lee'
+)
+
+# Usuários gerados por semente de RNG: o bloco `k` de uma semente é sempre
+# igual, então gerar [0, N) de uma vez ou em várias etapas dá o mesmo resultado
+SYNTHETIC_BLOCK_SIZE = 1000
+SYNTHETIC_INSERT_BATCH = 10000
+SEED_LOCK = threading.Lock()
+
+
+def zipf_weights(n):
+    return [1 / (k + 1) for k in range(n)]
+
+
+SKILL_WEIGHTS = zipf_weights(len(SYNTHETIC_SKILLS))
+PROJECT_WEIGHTS = zipf_weights(len(SYNTHETIC_PROJECTS))
+
+
+def synthetic_username(seed, index):
+    return f'synthetic_{seed}_{index}'
+
+
+def synthetic_block(seed, block, now):
+    """Os SYNTHETIC_BLOCK_SIZE usuários (sem ID) do bloco `block` da semente `seed`"""
+    rng = random.Random(seed * 1_000_003 + block)
+    departments = [name for name, _, _ in SYNTHETIC_DEPARTMENTS]
+    department_weights = [weight for _, weight, _ in SYNTHETIC_DEPARTMENTS]
+    role_table = {name: (roles, zipf_weights(len(roles))) for name, _, roles in SYNTHETIC_DEPARTMENTS}
+    locations = [name for name, _ in SYNTHETIC_LOCATIONS]
+    location_weights = [weight for _, weight in SYNTHETIC_LOCATIONS]
+    
+    users = []
+    for index in range(block * SYNTHETIC_BLOCK_SIZE, (block + 1) * SYNTHETIC_BLOCK_SIZE):
+        first = rng.choice(SYNTHETIC_FIRST_NAMES)
+        last = rng.choice(SYNTHETIC_LAST_NAMES)
+        department = rng.choices(departments, department_weights)[0]
+        role_names, role_weights = role_table[department]
+        
+        # Registro concentrado nos últimos anos (crescimento), até 10 anos atrás
+        registered_days = min(3650, rng.expovariate(1 / 540))
+        # Atividade com cauda longa: parte online agora, a maioria na última
+        # semana e o resto espalhado por meses
+        bucket = rng.random()
+        if bucket < 0.06:
+            login_hours = rng.uniform(0, 1)
+        elif bucket < 0.35:
+            login_hours = rng.uniform(1, 24)
+        elif bucket < 0.65:
+            login_hours = rng.uniform(24, 168)
+        else:
+            login_hours = 168 + rng.expovariate(1 / 1080)
+        login_hours = min(login_hours, registered_days * 24)
+        
+        users.append({
+            'username': synthetic_username(seed, index),
+            'email': f'{first}.{last}.{index}@example.com'.lower(),
+            'full_name': f'{first} {last}',
+            'role': rng.choices(role_names, role_weights)[0],
+            'department': department,
+            'active': rng.random() < 0.88,
+            'registration_date': (now - timedelta(days=registered_days)).isoformat(),
+            'last_login': (now - timedelta(hours=login_hours)).isoformat(),
+            'projects': list(dict.fromkeys(rng.choices(SYNTHETIC_PROJECTS, PROJECT_WEIGHTS,
+                                                       k=rng.choice((0, 1, 1, 2, 2, 3, 4))))),
+            'skills': list(dict.fromkeys(rng.choices(SYNTHETIC_SKILLS, SKILL_WEIGHTS,
+                                                     k=rng.randint(1, 8)))),
+            'location': rng.choices(locations, location_weights)[0]
+        })
+    return users
+
+
+def generate_synthetic_users(seed, start, stop, now):
+    """Usuários sintéticos de índice start..stop-1 (sem ID)"""
+    for block in range(start // SYNTHETIC_BLOCK_SIZE, -(-stop // SYNTHETIC_BLOCK_SIZE)):
+        offset = block * SYNTHETIC_BLOCK_SIZE
+        users = synthetic_block(seed, block, now)
+        yield from users[max(start - offset, 0):stop - offset]
+
+
+def seed_synthetic_users(target, seed=SYNTHETIC_SEED):
+    """
+    Completa o store até ter `target` usuários sintéticos da semente `seed`
+    
+    Os usuários de uma semente são sempre inseridos em ordem de índice, então
+    os já existentes (de um seed anterior ou restaurados do disco) são
+    achados por busca binária pelo username e só os que faltam são gerados.
+    A inserção é feita em lotes atômicos de SYNTHETIC_INSERT_BATCH usuários.
+    """
+    with SEED_LOCK:
+        started = time.perf_counter()
+        low, high = 0, target
+        while low < high:
+            middle = (low + high) // 2
+            if users_store.username_exists(synthetic_username(seed, middle)):
+                low = middle + 1
+            else:
+                high = middle
+        existing = low
+        
+        now = datetime.now()
+        created = 0
+        batch = []
+        for data in generate_synthetic_users(seed, existing, target, now):
+            batch.append(data)
+            if len(batch) == SYNTHETIC_INSERT_BATCH:
+                created += len(users_store.create_many(batch))
+                batch = []
+        if batch:
+            created += len(users_store.create_many(batch))
+        with STATS_LOCK:
+            STATS['users_created'] += created
+        
+        elapsed = time.perf_counter() - started
+        logger.info(f"Seeded {created} synthetic users (seed {seed}, {existing} already present) in {elapsed:.2f}s")
+        return {
+            'seed': seed,
+            'target': target,
+            'already_present': existing,
+            'created': created,
+            'total_users': len(users_store),
+            'seconds': round(elapsed, 3),
+            'users_per_second': round(created / elapsed) if elapsed > 0 else None
+        }
+
+
 @app.before_request
 def before_request():
-    STATS['total_requests'] += 1
+    g.request_started = time.perf_counter()
+    count_stat('total_requests')
     logger.info(f"{request.method} {request.path} - Client: {request.remote_addr}")
 
 
-def get_next_user_id():
-    """Gera próximo ID disponível para novo usuário"""
-    if not USERS_DB:
-        return 1
-    return max(USERS_DB.keys()) + 1
+@app.after_request
+def after_request(response):
+    """
+    Registra o tempo de processamento por endpoint e o informa ao cliente
+    em Server-Timing (o Service B separa assim rede de processamento)
+    
+    Em respostas em streaming o tempo vai até o início do corpo.
+    """
+    elapsed = time.perf_counter() - g.get('request_started', time.perf_counter())
+    REQUEST_LATENCY.record(request.endpoint or 'unmatched', elapsed)
+    response.headers['Server-Timing'] = f'app;dur={elapsed * 1000:.3f}'
+    return response
 
 
 def validate_user_data(data, is_update=False):
@@ -154,13 +1288,30 @@ def validate_user_data(data, is_update=False):
     
     # Valida username único
     if 'username' in data and not is_update:
-        for user in USERS_DB.values():
-            if user['username'] == data['username']:
-                return False, f"Username '{data['username']}' already exists"
+        if users_store.username_exists(data['username']):
+            return False, f"Username '{data['username']}' already exists"
     
     return True, None
 
 
+def build_new_user(data):
+    """Dict de um usuário novo (sem ID) a partir do body validado"""
+    now = datetime.now().isoformat()
+    return {
+        'username': data['username'],
+        'email': data['email'],
+        'full_name': data['full_name'],
+        'role': data['role'],
+        'department': data.get('department', 'General'),
+        'active': True,
+        'registration_date': now,
+        'last_login': now,
+        'projects': data.get('projects', []),
+        'skills': data.get('skills', []),
+        'location': data.get('location', 'Remote')
+    }
+
+
 # ============================================================================
 # ENDPOINTS - INFORMAÇÕES DO SERVIÇO
 # ============================================================================
@@ -175,8 +1326,15 @@ def index():
         'endpoints': {
             'users': '/users',
             'user_detail': '/users/<id>',
+            'users_batch': '/users/batch',
+            'users_bulk': '/users/bulk',
+            'users_export': '/users/export',
+            'users_changes': '/users/changes?since=<seq>',
             'health': '/health',
-            'stats': '/stats'
+            'stats': '/stats',
+            'metrics': '/metrics',
+            'snapshot': '/admin/snapshot',
+            'seed': '/admin/seed'
         },
         'timestamp': datetime.now().isoformat()
     })
@@ -191,8 +1349,8 @@ def health():
         'status': 'healthy',
         'service': 'Users Service',
         'uptime_seconds': round(uptime, 2),
-        'total_users': len(USERS_DB),
-        'active_users': sum(1 for u in USERS_DB.values() if u['active']),
+        'total_users': len(users_store),
+        'active_users': users_store.active_count(),
         'timestamp': datetime.now().isoformat()
     })
 
@@ -202,17 +1360,13 @@ def stats():
     """Estatísticas detalhadas do serviço"""
     uptime = (datetime.now() - datetime.fromisoformat(STATS['start_time'])).total_seconds()
     
-    # Calcula estatísticas
-    total_users = len(USERS_DB)
-    active_users = sum(1 for u in USERS_DB.values() if u['active'])
-    
-    departments = {}
-    roles = {}
-    for user in USERS_DB.values():
-        dept = user.get('department', 'Unknown')
-        role = user.get('role', 'Unknown')
-        departments[dept] = departments.get(dept, 0) + 1
-        roles[role] = roles.get(role, 0) + 1
+    # Contadores mantidos incrementalmente pelo UserStore, lidos de um
+    # único StoreView para que total, ativos e agrupamentos sejam coerentes
+    view = users_store.snapshot()
+    total_users = len(view)
+    active_users = view.active
+    departments = dict(view.department_counts)
+    roles = dict(view.role_counts)
     
     return jsonify({
         'service': 'Users Service',
@@ -229,10 +1383,176 @@ def stats():
             'by_department': departments,
             'by_role': roles
         },
+        'persistence': {
+            **PERSISTENCE_STATS,
+            'journal_seq': users_store.journal.seq if users_store.journal else None
+        },
+        'bulk': BULK_STATS,
+        'changes': users_store.changes.to_dict(),
+        'latency_ms': REQUEST_LATENCY.to_dict(),
         'timestamp': datetime.now().isoformat()
     })
 
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Métricas no formato de exposição do Prometheus"""
+    view = users_store.snapshot()
+    lines = [
+        *prometheus_metric('users_service_requests_total', 'counter',
+                           'HTTP requests received', STATS['total_requests']),
+        *prometheus_metric('users_service_users_created_total', 'counter',
+                           'Users created', STATS['users_created']),
+        *prometheus_metric('users_service_users_updated_total', 'counter',
+                           'Users updated', STATS['users_updated']),
+        *prometheus_metric('users_service_users', 'gauge', 'Users in the store', len(view)),
+        *prometheus_metric('users_service_active_users', 'gauge', 'Active users in the store', view.active),
+        *prometheus_metric('users_service_change_seq', 'gauge', 'Latest change log sequence', view.seq),
+        *REQUEST_LATENCY.prometheus('users_service_request_duration_seconds',
+                                    'Request processing time by endpoint')
+    ]
+    return app.response_class('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/admin/seed', methods=['POST'])
+def seed_users():
+    """
+    Gera usuários sintéticos reprodutíveis
+    
+    Body: {"users": <total de usuários sintéticos desejado>, "seed": <semente>}
+    Chamadas repetidas só criam os que faltam, então 10k -> 100k -> 1M
+    reaproveita os usuários já gerados.
+    """
+    data = request.get_json(silent=True) or {}
+    target = data.get('users')
+    seed = data.get('seed', SYNTHETIC_SEED)
+    if not isinstance(target, int) or isinstance(target, bool) or not 0 < target <= SYNTHETIC_MAX_USERS:
+        return jsonify({'error': f'users must be an integer between 1 and {SYNTHETIC_MAX_USERS}'}), 400
+    if not isinstance(seed, int) or isinstance(seed, bool):
+        return jsonify({'error': 'seed must be an integer'}), 400
+    
+    try:
+        result = seed_synthetic_users(target, seed)
+    except ValueError as e:
+        # Username sintético criado por outro caminho (ex.: POST /users)
+        return jsonify({'error': str(e)}), 409
+    
+    return jsonify({
+        'message': 'Synthetic users seeded successfully',
+        **result
+    }), 201 if result['created'] else 200
+
+
+@app.route('/admin/snapshot', methods=['POST'])
+def create_snapshot():
+    """Força a gravação de um snapshot e a compactação do journal"""
+    if not users_store.journal:
+        return jsonify({'error': 'Persistence is disabled'}), 409
+    
+    seq = write_snapshot(users_store, DATA_DIR)
+    
+    return jsonify({
+        'message': 'Snapshot written successfully',
+        'seq': seq,
+        'seconds': PERSISTENCE_STATS['last_snapshot_seconds']
+    })
+
+
+# ============================================================================
+# RESPOSTAS DE LISTAGEM
+# ============================================================================
+
+def parse_fields(raw):
+    """
+    Interpreta o parâmetro fields= (id sempre incluído)
+    
+    Returns:
+        tuple: (lista de campos ou None, mensagem de erro ou None)
+    """
+    if not raw:
+        return None, None
+    fields = ['id'] + [f for f in dict.fromkeys(raw.split(',')) if f and f != 'id']
+    unknown = [f for f in fields if f not in USER_FIELDS]
+    if unknown:
+        return None, f"Unknown fields: {', '.join(unknown)}"
+    return fields, None
+
+
+def parse_ids(raw):
+    """
+    Interpreta a lista de IDs de ?ids=1,5,9 ou do body de /users/batch
+    
+    Returns:
+        tuple: (lista de IDs na ordem pedida ou None, mensagem de erro ou None)
+    """
+    if isinstance(raw, str):
+        raw = [part for part in raw.split(',') if part.strip()]
+    if not isinstance(raw, list) or not raw:
+        return None, 'ids must be a non-empty list of integers'
+    try:
+        ids = [int(user_id) for user_id in raw]
+    except (TypeError, ValueError):
+        return None, 'ids must be a non-empty list of integers'
+    if len(ids) > MAX_BATCH_IDS:
+        return None, f'At most {MAX_BATCH_IDS} ids per request'
+    return ids, None
+
+
+def users_response(envelope, fragments, key='users', headers=None):
+    """
+    Resposta JSON montada a partir de fragmentos já serializados
+    
+    Em GET /users o envelope só tem chaves que ordenam antes de "users",
+    então o resultado é idêntico ao que o jsonify produziria.
+    """
+    head = encode_json(envelope)
+    body = f'{head[:-1]},"{key}":[{",".join(fragments)}]}}\n'
+    return app.response_class(body, mimetype='application/json', headers=headers)
+
+
+def change_headers(view):
+    """Posição no log de alterações refletida pela view usada na resposta"""
+    return {
+        'X-Change-Epoch': users_store.changes.epoch,
+        'X-Change-Seq': str(view.seq)
+    }
+
+
+def encode_users(users, fields):
+    if fields:
+        return [encode_json(user.project(fields)) for user in users]
+    return [user.to_json() for user in users]
+
+
+def batch_response(ids, fields):
+    """
+    Usuários na ordem pedida; IDs inexistentes viram um marcador
+    {"id": ..., "error": "User not found"} na mesma posição
+    
+    Todos os IDs são lidos do mesmo StoreView, então o lote é consistente.
+    """
+    view = users_store.snapshot()
+    fragments = []
+    not_found = []
+    for user_id in ids:
+        user = view.get(user_id)
+        if user is None:
+            not_found.append(user_id)
+            fragments.append(encode_json({'id': user_id, 'error': 'User not found'}))
+        else:
+            fragments.extend(encode_users((user,), fields))
+    
+    logger.info(f"Returning batch of {len(ids)} ids ({len(not_found)} not found)")
+    
+    return users_response({
+        'total': len(ids),
+        'found': len(ids) - len(not_found),
+        'not_found': not_found,
+        'fields': fields,
+        'timestamp': datetime.now().isoformat()
+    }, fragments, headers=change_headers(view))
+
+
 # ============================================================================
 # ENDPOINTS - CRUD DE USUÁRIOS
 # ============================================================================
@@ -246,42 +1566,101 @@ def get_users():
         active (bool): Filtra por status ativo/inativo
         department (str): Filtra por departamento
         role (str): Filtra por cargo
+        limit (int): Tamanho da página (máx. MAX_PAGE_LIMIT); sem limit retorna tudo
+        cursor (str): Valor de next_cursor da página anterior
+        fields (str): Campos a retornar, separados por vírgula (id sempre incluído)
+        ids (str): Lista de IDs separados por vírgula (ver /users/batch);
+            quando presente, filtros e paginação são ignorados
     """
+    fields, error = parse_fields(request.args.get('fields'))
+    if error:
+        return jsonify({'error': error}), 400
+    
+    if request.args.get('ids') is not None:
+        ids, error = parse_ids(request.args.get('ids'))
+        if error:
+            return jsonify({'error': error}), 400
+        return batch_response(ids, fields)
+    
     # Obtém filtros
     active_filter = request.args.get('active')
     department_filter = request.args.get('department')
     role_filter = request.args.get('role')
     
-    # Aplica filtros
-    users = list(USERS_DB.values())
-    
-    if active_filter is not None:
-        active_bool = active_filter.lower() == 'true'
-        users = [u for u in users if u['active'] == active_bool]
-    
-    if department_filter:
-        users = [u for u in users if u.get('department', '').lower() == department_filter.lower()]
+    # Paginação por cursor: o cursor é o último ID entregue e a ordem é
+    # sempre por ID, então páginas não se sobrepõem mesmo com criações
+    # acontecendo entre uma chamada e outra
+    limit = request.args.get('limit')
+    cursor = request.args.get('cursor')
+    try:
+        limit = int(limit) if limit is not None else None
+        after = int(cursor) if cursor else 0
+    except ValueError:
+        return jsonify({'error': 'limit and cursor must be integers'}), 400
+    if limit is not None and not 1 <= limit <= MAX_PAGE_LIMIT:
+        return jsonify({'error': f'limit must be between 1 and {MAX_PAGE_LIMIT}'}), 400
     
-    if role_filter:
-        users = [u for u in users if u.get('role', '').lower() == role_filter.lower()]
+    # Aplica filtros pelos índices
+    view = users_store.snapshot()
+    users, has_more = view.page(
+        after=after,
+        limit=limit,
+        active=active_filter.lower() == 'true' if active_filter is not None else None,
+        department=department_filter,
+        role=role_filter
+    )
+    next_cursor = str(users[-1].id) if has_more else None
     
     logger.info(f"Returning {len(users)} users (filters: active={active_filter}, dept={department_filter}, role={role_filter})")
     
-    return jsonify({
+    # Monta o JSON a partir dos fragmentos já serializados de cada usuário
+    return users_response({
         'total': len(users),
-        'users': users,
+        'fields': fields,
         'filters_applied': {
             'active': active_filter,
             'department': department_filter,
             'role': role_filter
         },
+        'pagination': {
+            'limit': limit,
+            'cursor': cursor,
+            'next_cursor': next_cursor
+        },
         'timestamp': datetime.now().isoformat()
-    })
+    }, encode_users(users, fields), headers=change_headers(view))
+
+
+@app.route('/users/batch', methods=['POST'])
+def get_users_batch():
+    """
+    Busca vários usuários de uma vez, na ordem pedida
+    
+    Body (JSON):
+        ids (list): IDs dos usuários (máx. MAX_BATCH_IDS)
+        fields (list, optional): Campos a retornar (id sempre incluído)
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'No data provided'}), 400
+    
+    ids, error = parse_ids(data.get('ids'))
+    if error:
+        return jsonify({'error': error}), 400
+    
+    fields = data.get('fields')
+    if isinstance(fields, list):
+        fields = ','.join(str(f) for f in fields)
+    fields, error = parse_fields(fields)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    return batch_response(ids, fields)
 
 
 @app.route('/users/<int:user_id>', methods=['GET'])
 def get_user(user_id):
-    user = USERS_DB.get(user_id)
+    user = users_store.get(user_id)
     
     if not user:
         logger.warning(f"User {user_id} not found")
@@ -293,7 +1672,7 @@ def get_user(user_id):
     logger.info(f"Returning user {user_id}: {user['username']}")
     
     return jsonify({
-        'user': user,
+        'user': user.to_dict(),
         'timestamp': datetime.now().isoformat()
     })
 
@@ -322,31 +1701,22 @@ def create_user():
     if not is_valid:
         return jsonify({'error': error_msg}), 400
     
-    # Cria novo usuário
-    user_id = get_next_user_id()
-    new_user = {
-        'id': user_id,
-        'username': data['username'],
-        'email': data['email'],
-        'full_name': data['full_name'],
-        'role': data['role'],
-        'department': data.get('department', 'General'),
-        'active': True,
-        'registration_date': datetime.now().isoformat(),
-        'last_login': datetime.now().isoformat(),
-        'projects': data.get('projects', []),
-        'skills': data.get('skills', []),
-        'location': data.get('location', 'Remote')
-    }
+    # Cria novo usuário (ID alocado pelo store)
+    new_user = build_new_user(data)
     
-    USERS_DB[user_id] = new_user
-    STATS['users_created'] += 1
+    try:
+        # Revalida o username sob o lock do store: duas requisições
+        # simultâneas podem ter passado juntas por validate_user_data
+        user = users_store.create(new_user)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    count_stat('users_created')
     
-    logger.info(f"Created user {user_id}: {new_user['username']}")
+    logger.info(f"Created user {user.id}: {user.username}")
     
     return jsonify({
         'message': 'User created successfully',
-        'user': new_user
+        'user': user.to_dict()
     }), 201
 
 
@@ -357,7 +1727,7 @@ def update_user(user_id):
     
     Body (JSON): Campos a serem atualizados
     """
-    user = USERS_DB.get(user_id)
+    user = users_store.get(user_id)
     
     if not user:
         return jsonify({
@@ -380,24 +1750,22 @@ def update_user(user_id):
         'active', 'projects', 'skills', 'location'
     ]
     
-    for field in updatable_fields:
-        if field in data:
-            user[field] = data[field]
-    
-    user['last_login'] = datetime.now().isoformat()
-    STATS['users_updated'] += 1
+    changes = {field: data[field] for field in updatable_fields if field in data}
+    changes['last_login'] = datetime.now().isoformat()
+    user = users_store.update(user_id, changes)
+    count_stat('users_updated')
     
     logger.info(f"Updated user {user_id}: {user['username']}")
     
     return jsonify({
         'message': 'User updated successfully',
-        'user': user
+        'user': user.to_dict()
     })
 
 
 @app.route('/users/<int:user_id>', methods=['DELETE'])
 def delete_user(user_id):
-    user = USERS_DB.get(user_id)
+    user = users_store.get(user_id)
     
     if not user:
         return jsonify({
@@ -406,7 +1774,7 @@ def delete_user(user_id):
         }), 404
     
     # Soft delete - apenas marca como inativo
-    user['active'] = False
+    user = users_store.deactivate(user_id)
     
     logger.info(f"Deactivated user {user_id}: {user['username']}")
     
@@ -416,6 +1784,187 @@ def delete_user(user_id):
     })
 
 
+# ============================================================================
+# ENDPOINTS - LOG DE ALTERAÇÕES
+# ============================================================================
+
+def encode_event(event):
+    seq, op, user, at = event
+    head = encode_json({'seq': seq, 'op': op, 'id': user.id, 'at': at})
+    return f'{head[:-1]},"user":{user.to_json()}}}'
+
+
+@app.route('/users/changes', methods=['GET'])
+def get_changes():
+    """
+    Eventos de alteração (create, update, deactivate) posteriores a `since`
+    
+    Long-poll: sem eventos novos, a requisição espera até `wait` segundos.
+    O consumidor guarda `epoch` e `next_since` e repete a chamada. Se o
+    `since` já saiu da janela de retenção, ou o epoch mudou (Service A
+    reiniciado), a resposta é 410 com resync_required=true: o consumidor
+    deve recarregar tudo (/users/export) e recomeçar de `latest_seq`.
+    
+    Query Parameters:
+        since (int): Último seq já aplicado pelo consumidor (0 no início)
+        epoch (str, optional): Epoch recebido na resposta anterior
+        limit (int): Máximo de eventos (padrão/máx. MAX_PAGE_LIMIT)
+        wait (float): Segundos de espera por eventos (máx. CHANGES_MAX_WAIT)
+    """
+    change_log = users_store.changes
+    try:
+        since = int(request.args.get('since', 0))
+        limit = int(request.args.get('limit', MAX_PAGE_LIMIT))
+        wait = min(float(request.args.get('wait', 0)), CHANGES_MAX_WAIT)
+    except ValueError:
+        return jsonify({'error': 'since, limit and wait must be numbers'}), 400
+    if since < 0 or not 1 <= limit <= MAX_PAGE_LIMIT:
+        return jsonify({'error': f'since must be >= 0 and limit between 1 and {MAX_PAGE_LIMIT}'}), 400
+    
+    epoch = request.args.get('epoch')
+    events = None
+    if not epoch or epoch == change_log.epoch:
+        events = change_log.read(since, limit, timeout=wait)
+    
+    if events is None:
+        logger.info(f"Change log resync required (since={since}, epoch={epoch})")
+        return jsonify({
+            'error': 'Change log position is no longer available, full resync required',
+            'resync_required': True,
+            **change_log.to_dict()
+        }), 410
+    
+    return users_response({
+        'epoch': change_log.epoch,
+        'latest_seq': change_log.seq,
+        'next_since': events[-1][0] if events else since,
+        'resync_required': False
+    }, [encode_event(event) for event in events], key='events')
+
+
+# ============================================================================
+# ENDPOINTS - IMPORTAÇÃO E EXPORTAÇÃO EM LOTE
+# ============================================================================
+
+def throughput(count, nbytes, elapsed):
+    return {
+        'users': count,
+        'bytes': nbytes,
+        'seconds': round(elapsed, 3),
+        'users_per_second': round(count / elapsed) if elapsed > 0 else None,
+        'at': datetime.now().isoformat()
+    }
+
+
+@app.route('/users/bulk', methods=['POST'])
+def bulk_create_users():
+    """
+    Importa usuários em lote a partir de NDJSON (um usuário por linha)
+    
+    Cada linha tem o mesmo formato do body de POST /users. O lote inteiro é
+    validado numa passada (campos, usernames já existentes e repetidos no
+    próprio lote) e só então inserido de uma vez: ou todos os usuários são
+    criados ou nenhum.
+    """
+    started = time.perf_counter()
+    nbytes = 0
+    new_users = []
+    seen = set()
+    errors = []
+    
+    # Lê o body linha a linha, sem montar o texto inteiro em memória
+    # (o buffer evita que o stream do WSGI seja lido byte a byte)
+    stream = io.BufferedReader(request.stream, 1 << 16)
+    for line_number, line in enumerate(stream, start=1):
+        nbytes += len(line)
+        if not line.strip():
+            continue
+        if len(new_users) >= BULK_MAX_USERS:
+            return jsonify({'error': f'At most {BULK_MAX_USERS} users per request'}), 413
+        try:
+            data = json.loads(line)
+        except ValueError:
+            errors.append({'line': line_number, 'error': 'Invalid JSON'})
+            continue
+        if not isinstance(data, dict):
+            errors.append({'line': line_number, 'error': 'Each line must be a JSON object'})
+            continue
+        is_valid, error_msg = validate_user_data(data)
+        if is_valid and data['username'] in seen:
+            is_valid, error_msg = False, f"Username '{data['username']}' is repeated in this batch"
+        if not is_valid:
+            errors.append({'line': line_number, 'error': error_msg})
+            continue
+        seen.add(data['username'])
+        new_users.append(build_new_user(data))
+    
+    if errors:
+        return jsonify({
+            'error': 'Validation failed, no users were created',
+            'errors': errors[:100],
+            'total_errors': len(errors)
+        }), 400
+    if not new_users:
+        return jsonify({'error': 'No data provided'}), 400
+    
+    try:
+        users = users_store.create_many(new_users)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 409
+    with STATS_LOCK:
+        STATS['users_created'] += len(users)
+    
+    BULK_STATS['last_import'] = throughput(len(users), nbytes, time.perf_counter() - started)
+    logger.info(f"Bulk imported {len(users)} users ({BULK_STATS['last_import']['users_per_second']} users/s)")
+    
+    return jsonify({
+        'message': 'Users created successfully',
+        'created': len(users),
+        'first_id': users[0].id,
+        'last_id': users[-1].id,
+        'throughput': BULK_STATS['last_import']
+    }), 201
+
+
+@app.route('/users/export', methods=['GET'])
+def export_users():
+    """
+    Exporta todos os usuários em NDJSON (um usuário por linha, em ordem de ID)
+    
+    A resposta é gerada em streaming, um shard por vez, a partir do
+    StoreView do início da requisição: o export é consistente mesmo com
+    escritas acontecendo e não monta a resposta inteira em memória.
+    
+    Query Parameters:
+        fields (str): Campos a exportar, separados por vírgula (id sempre incluído)
+    """
+    fields, error = parse_fields(request.args.get('fields'))
+    if error:
+        return jsonify({'error': error}), 400
+    
+    view = users_store.snapshot()
+    
+    def generate():
+        started = time.perf_counter()
+        count = 0
+        nbytes = 0
+        for shard in view.shards:
+            if not shard.users:
+                continue
+            chunk = '\n'.join(encode_users(shard.users.values(), fields)) + '\n'
+            count += len(shard.users)
+            nbytes += len(chunk)
+            yield chunk
+        BULK_STATS['last_export'] = throughput(count, nbytes, time.perf_counter() - started)
+        logger.info(f"Exported {count} users ({BULK_STATS['last_export']['users_per_second']} users/s)")
+    
+    return app.response_class(generate(), mimetype='application/x-ndjson', headers={
+        'X-Total-Count': str(len(view)),
+        **change_headers(view),
+        'Content-Disposition': 'attachment; filename=users.ndjson'
+    })
+
+
 # ============================================================================
 # INICIALIZAÇÃO
 # ============================================================================
@@ -425,12 +1974,25 @@ if __name__ == '__main__':
     logger.info("Starting Users Service (Microservice A)")
     logger.info("=" * 60)
     
-    # Inicializa dados de exemplo
-    initialize_sample_data()
+    # Restaura dados persistidos ou inicializa dados de exemplo
+    restored = False
+    if PERSISTENCE_ENABLED:
+        try:
+            restored = init_persistence(users_store)
+        except OSError as e:
+            logger.error(f"Persistence disabled: {e}")
+    
+    if not restored:
+        initialize_sample_data()
+    
+    # Completa os usuários sintéticos pedidos (no-op se já restaurados do disco)
+    if SYNTHETIC_USERS > 0:
+        seed_synthetic_users(SYNTHETIC_USERS, SYNTHETIC_SEED)
     
     # Inicia servidor
     app.run(
         host='0.0.0.0',
         port=5000,
-        debug=False
+        debug=False,
+        threaded=True
     )
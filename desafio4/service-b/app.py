@@ -1,8 +1,20 @@
-from flask import Flask, jsonify, request
+from flask import Flask, g, jsonify, request
 from datetime import datetime, timedelta
 import requests
+import json
 import logging
-from typing import Dict, List, Optional
+import os
+import random
+import re
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlencode
+
+import numpy as np
 
 logging.basicConfig(
     level=logging.INFO,
@@ -13,7 +25,55 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
-USERS_SERVICE_URL = "http://service-a:5000"
+USERS_SERVICE_URL = os.getenv('USERS_SERVICE_URL', "http://service-a:5000")
+SERVICE_PORT = int(os.getenv('PORT', 5001))
+
+# Modo de execução: "threaded" (Flask, uma thread por requisição) ou
+# "async" (aiohttp, ver async_app.py)
+SERVING_MODE = os.getenv('SERVING_MODE', 'threaded').lower()
+
+# Tamanho de cada lote enviado para POST /users/batch do Service A
+USERS_BATCH_CHUNK_SIZE = 200
+
+# Réplica local dos usuários (opcional)
+REPLICA_ENABLED = os.getenv('REPLICA_ENABLED', 'false').lower() == 'true'
+REPLICA_MAX_STALENESS = float(os.getenv('REPLICA_MAX_STALENESS', 30))
+REPLICA_POLL_WAIT = float(os.getenv('REPLICA_POLL_WAIT', 20))
+
+# Cache de respostas do Service A no UsersServiceClient
+CLIENT_CACHE_SIZE = int(os.getenv('CLIENT_CACHE_SIZE', 1000))
+CLIENT_CACHE_TTL = float(os.getenv('CLIENT_CACHE_TTL', 5))
+CLIENT_CACHE_STALE_TTL = float(os.getenv('CLIENT_CACHE_STALE_TTL', 30))
+CLIENT_CACHE_STALE_IF_ERROR = float(os.getenv('CLIENT_CACHE_STALE_IF_ERROR', 300))
+
+# Prazo total (todas as tentativas) de cada tipo de chamada ao Service A, em segundos
+SERVICE_A_DEADLINES = {
+    'list_users': float(os.getenv('DEADLINE_LIST_USERS', 5)),
+    'get_user': float(os.getenv('DEADLINE_GET_USER', 1.5)),
+    'batch_users': float(os.getenv('DEADLINE_BATCH_USERS', 3)),
+    'page_users': float(os.getenv('DEADLINE_PAGE_USERS', 5)),
+    'health': float(os.getenv('DEADLINE_HEALTH', 1))
+}
+
+# Retries com backoff exponencial + jitter, limitados por um orçamento global
+RETRY_MAX_ATTEMPTS = int(os.getenv('RETRY_MAX_ATTEMPTS', 3))
+RETRY_BASE_DELAY = float(os.getenv('RETRY_BASE_DELAY', 0.05))
+RETRY_MAX_DELAY = float(os.getenv('RETRY_MAX_DELAY', 1))
+RETRY_BUDGET_RATIO = float(os.getenv('RETRY_BUDGET_RATIO', 0.1))
+RETRY_BUDGET_MIN_PER_SECOND = float(os.getenv('RETRY_BUDGET_MIN_PER_SECOND', 1))
+
+# Circuit breaker: abre com BREAKER_FAILURE_RATIO de falhas nas últimas
+# BREAKER_WINDOW chamadas e tenta de novo depois de BREAKER_OPEN_SECONDS
+BREAKER_WINDOW = int(os.getenv('BREAKER_WINDOW', 20))
+BREAKER_MIN_CALLS = int(os.getenv('BREAKER_MIN_CALLS', 10))
+BREAKER_FAILURE_RATIO = float(os.getenv('BREAKER_FAILURE_RATIO', 0.5))
+BREAKER_OPEN_SECONDS = float(os.getenv('BREAKER_OPEN_SECONDS', 10))
+
+# Modo streaming de /profiles: usuários pedidos ao Service A por página
+STREAM_PAGE_SIZE = int(os.getenv('STREAM_PAGE_SIZE', 500))
+
+# Cache de perfis enriquecidos e resumos
+PROFILE_CACHE_SIZE = int(os.getenv('PROFILE_CACHE_SIZE', 10000))
 
 STATS = {
     'total_requests': 0,
@@ -24,15 +84,550 @@ STATS = {
 }
 
 
+# ============================================================================
+# MÉTRICAS - HISTOGRAMAS DE LATÊNCIA
+# ============================================================================
+
+# A lógica deste bloco (LATENCY_BUCKETS até prometheus_metric) é a mesma nos
+# dois serviços de propósito: cada um é uma imagem Docker com um único app.py,
+# e os percentis só são comparáveis se os buckets forem os mesmos. Ao alterar
+# um, replique no outro (só o Service B tem type hints).
+
+# Limites superiores dos buckets: 4 por oitava, de 64 µs a ~67 s, então um
+# percentil estimado pelo bucket erra no máximo ~19% para cima
+LATENCY_BUCKETS = tuple(2 ** (6 + i / 4) / 1e6 for i in range(81))
+
+
+class Histogram:
+    """
+    Histograma de latências com buckets fixos (log-lineares)
+    
+    Registrar uma medida é uma busca binária e um incremento, sem guardar
+    amostras; p50/p90/p99 saem das contagens acumuladas (limite superior do
+    bucket, nunca acima do máximo observado).
+    """
+    
+    __slots__ = ('lock', 'counts', 'count', 'sum', 'max')
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+    
+    def record(self, seconds: float, count: int = 1):
+        """Registra `count` medidas de `seconds` (média de um lote)"""
+        index = bisect_left(LATENCY_BUCKETS, seconds)
+        with self.lock:
+            self.counts[index] += count
+            self.count += count
+            self.sum += seconds * count
+            if seconds > self.max:
+                self.max = seconds
+    
+    def _snapshot(self):
+        with self.lock:
+            return list(self.counts), self.count, self.sum, self.max
+    
+    def to_dict(self) -> Dict:
+        """Percentis em milissegundos"""
+        counts, total, total_sum, maximum = self._snapshot()
+        
+        def percentile(fraction: float) -> Optional[float]:
+            if not total:
+                return None
+            rank = fraction * total
+            cumulative = 0
+            for index, count in enumerate(counts):
+                cumulative += count
+                if cumulative >= rank:
+                    bound = LATENCY_BUCKETS[index] if index < len(LATENCY_BUCKETS) else maximum
+                    return round(min(bound, maximum) * 1000, 3)
+        
+        return {
+            'count': total,
+            'mean': round(total_sum / total * 1000, 3) if total else None,
+            'p50': percentile(0.50),
+            'p90': percentile(0.90),
+            'p99': percentile(0.99),
+            'max': round(maximum * 1000, 3) if total else None
+        }
+    
+    def prometheus(self, name: str, labels: str = '') -> List[str]:
+        """Linhas _bucket/_sum/_count (buckets exportados: uma por oitava)"""
+        counts, total, total_sum, _ = self._snapshot()
+        separator = ',' if labels else ''
+        lines = []
+        cumulative = 0
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            cumulative += counts[index]
+            if index % 4 == 0:
+                lines.append(f'{name}_bucket{{{labels}{separator}le="{bound:.6g}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels}{separator}le="+Inf"}} {total}')
+        suffix = f'{{{labels}}}' if labels else ''
+        lines.append(f'{name}_sum{suffix} {total_sum:.6f}')
+        lines.append(f'{name}_count{suffix} {total}')
+        return lines
+
+
+class HistogramSet:
+    """Um Histogram por endpoint, criado no primeiro registro"""
+    
+    def __init__(self, keys=()):
+        self.lock = threading.Lock()
+        self.histograms = {key: Histogram() for key in keys}
+    
+    def get(self, key: str) -> Histogram:
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(key, Histogram())
+        return histogram
+    
+    def record(self, key: str, seconds: float, count: int = 1):
+        self.get(key).record(seconds, count)
+    
+    def to_dict(self) -> Dict:
+        return {key: histogram.to_dict() for key, histogram in sorted(self.histograms.items())}
+    
+    def prometheus(self, name: str, help_text: str) -> List[str]:
+        lines = [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for key, histogram in sorted(self.histograms.items()):
+            lines.extend(histogram.prometheus(name, f'endpoint="{key}"'))
+        return lines
+
+
+def prometheus_metric(name: str, metric_type: str, help_text: str, value) -> List[str]:
+    """Linhas de uma métrica simples (counter ou gauge) no formato Prometheus"""
+    return [f'# HELP {name} {help_text}', f'# TYPE {name} {metric_type}', f'{name} {value}']
+
+
+# Tempo total de cada endpoint e do enriquecimento feito em cada requisição:
+# o lote inteiro e a média por perfil (uma medida por perfil enriquecido)
+REQUEST_LATENCY = HistogramSet()
+ENRICHMENT_LATENCY = HistogramSet()
+ENRICHMENT_PER_PROFILE_LATENCY = HistogramSet()
+
+# Server-Timing devolvido pelo Service A (tempo de processamento lá dentro)
+SERVER_TIMING_APP = re.compile(r'\bapp;dur=([0-9.]+)')
+
+
+def server_timing_seconds(header: Optional[str]) -> Optional[float]:
+    match = SERVER_TIMING_APP.search(header or '')
+    return float(match.group(1)) / 1000 if match else None
+
+
+class ResponseCache:
+    """
+    Cache LRU com TTL para respostas do Service A
+    
+    Uma entrada é "fresca" até `ttl` segundos; entre `ttl` e `ttl + stale_ttl`
+    ainda é servida (stale-while-revalidate) enquanto uma thread busca a
+    versão nova. Se o Service A falhar, entradas com até `stale_if_error`
+    segundos são usadas no lugar do erro (stale-if-error).
+    """
+    
+    def __init__(self, max_entries: int = CLIENT_CACHE_SIZE, ttl: float = CLIENT_CACHE_TTL,
+                 stale_ttl: float = CLIENT_CACHE_STALE_TTL,
+                 stale_if_error: float = CLIENT_CACHE_STALE_IF_ERROR):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.stale_if_error = stale_if_error
+        self.lock = threading.Lock()
+        self.entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self.revalidating = set()
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'stale': 0,
+            'stale_if_error': 0,
+            'revalidations': 0,
+            'evictions': 0
+        }
+    
+    def get(self, key: str) -> Optional[tuple]:
+        """(valor, idade em segundos) ou None"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            self.entries.move_to_end(key)
+            return entry[0], time.monotonic() - entry[1]
+    
+    def set(self, key: str, value):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic())
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.stats['evictions'] += 1
+    
+    def store(self, key: str, value):
+        """
+        Guarda uma resposta; None (404) não é cacheado e remove a entrada,
+        então um usuário criado depois aparece na próxima chamada
+        """
+        if value is None:
+            with self.lock:
+                self.entries.pop(key, None)
+            return
+        self.set(key, value)
+    
+    def count(self, name: str):
+        with self.lock:
+            self.stats[name] += 1
+    
+    def to_dict(self) -> Dict:
+        with self.lock:
+            lookups = self.stats['hits'] + self.stats['stale'] + self.stats['misses']
+            served = self.stats['hits'] + self.stats['stale']
+            return {
+                **self.stats,
+                'hit_rate_percent': round(served / lookups * 100, 2) if lookups else 0,
+                'entries': len(self.entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'stale_ttl_seconds': self.stale_ttl,
+                'stale_if_error_seconds': self.stale_if_error
+            }
+
+
+# ============================================================================
+# RESILIÊNCIA NAS CHAMADAS AO SERVICE A
+# ============================================================================
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Chamada recusada sem tentar o Service A (circuit breaker aberto)"""
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    """Prazo da chamada esgotado antes de uma nova tentativa"""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker por taxa de falhas numa janela das últimas chamadas
+    
+    closed: chamadas passam; com pelo menos `min_calls` resultados e
+    `failure_ratio` de falhas na janela, abre.
+    open: chamadas são recusadas na hora por `open_seconds`.
+    half_open: uma única chamada de teste passa; sucesso fecha o circuito,
+    falha abre de novo.
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, window: int = BREAKER_WINDOW, min_calls: int = BREAKER_MIN_CALLS,
+                 failure_ratio: float = BREAKER_FAILURE_RATIO, open_seconds: float = BREAKER_OPEN_SECONDS):
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.open_seconds = open_seconds
+        self.lock = threading.Lock()
+        self.state = self.CLOSED
+        self.outcomes = deque(maxlen=window)
+        self.opened_at = 0.0
+        self.probing = False
+        self.stats = {
+            'opened': 0,
+            'rejected': 0
+        }
+    
+    def allow(self) -> bool:
+        with self.lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.open_seconds:
+                    self.stats['rejected'] += 1
+                    return False
+                self.state = self.HALF_OPEN
+                self.probing = False
+            if self.state == self.HALF_OPEN:
+                if self.probing:
+                    self.stats['rejected'] += 1
+                    return False
+                self.probing = True
+            return True
+    
+    def record(self, success: bool):
+        with self.lock:
+            if self.state == self.HALF_OPEN:
+                self.probing = False
+                if success:
+                    self.state = self.CLOSED
+                    self.outcomes.clear()
+                    logger.info("Circuit breaker closed: Service A recovered")
+                else:
+                    self._open()
+                return
+            if self.state == self.OPEN:
+                # Chamada iniciada antes de o circuito abrir
+                return
+            self.outcomes.append(success)
+            failures = self.outcomes.count(False)
+            if len(self.outcomes) >= self.min_calls and failures / len(self.outcomes) >= self.failure_ratio:
+                self._open()
+    
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.outcomes.clear()
+        self.stats['opened'] += 1
+        logger.warning(f"Circuit breaker open: failing fast for {self.open_seconds}s")
+    
+    def to_dict(self) -> Dict:
+        with self.lock:
+            failures = self.outcomes.count(False)
+            retry_in = self.open_seconds - (time.monotonic() - self.opened_at)
+            return {
+                'state': self.state,
+                'window_calls': len(self.outcomes),
+                'window_failure_rate_percent': round(failures / len(self.outcomes) * 100, 2) if self.outcomes else 0,
+                'retry_in_seconds': round(max(retry_in, 0), 2) if self.state == self.OPEN else None,
+                **self.stats
+            }
+
+
+class RetryBudget:
+    """
+    Orçamento global de retries (token bucket)
+    
+    Cada chamada nova deposita `ratio` fichas e cada retry gasta uma, então
+    os retries ficam em no máximo ~ratio das chamadas; `min_per_second`
+    garante alguns retries com pouco tráfego. Com o Service A fora do ar os
+    retries param de multiplicar a carga sobre ele.
+    """
+    
+    def __init__(self, ratio: float = RETRY_BUDGET_RATIO, min_per_second: float = RETRY_BUDGET_MIN_PER_SECOND,
+                 max_tokens: float = 10):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self.lock = threading.Lock()
+        self.tokens = max_tokens
+        self.updated = time.monotonic()
+    
+    def _refill(self, amount: float):
+        now = time.monotonic()
+        self.tokens = min(self.max_tokens,
+                          self.tokens + amount + (now - self.updated) * self.min_per_second)
+        self.updated = now
+    
+    def deposit(self):
+        with self.lock:
+            self._refill(self.ratio)
+    
+    def try_spend(self) -> bool:
+        with self.lock:
+            self._refill(0)
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+    
+    def available(self) -> float:
+        with self.lock:
+            self._refill(0)
+            return round(self.tokens, 2)
+
+
+class UpstreamPolicy:
+    """
+    Prazos, retries e circuit breaker das chamadas ao Service A
+    
+    Compartilhado pelos clientes síncrono e assíncrono, que só executam as
+    tentativas: start() abre o prazo da chamada, before_attempt() recusa
+    tentativas sem prazo ou com o circuito aberto, record() alimenta o
+    breaker e as latências e retry_delay() decide se e quando repetir.
+    """
+    
+    def __init__(self, deadlines: Dict[str, float] = SERVICE_A_DEADLINES,
+                 max_attempts: int = RETRY_MAX_ATTEMPTS, base_delay: float = RETRY_BASE_DELAY,
+                 max_delay: float = RETRY_MAX_DELAY):
+        self.deadlines = deadlines
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = CircuitBreaker()
+        self.budget = RetryBudget()
+        # Tempo de cada tentativa visto pelo Service B e, do Server-Timing,
+        # quanto dele foi processamento no Service A (o resto é rede e fila)
+        self.latency = HistogramSet(deadlines)
+        self.processing = HistogramSet(deadlines)
+        self.stats = {
+            'retries': 0,
+            'retries_denied_by_budget': 0,
+            'deadline_exceeded': 0
+        }
+    
+    def start(self, endpoint: str) -> float:
+        """Instante limite (time.monotonic) de uma nova chamada"""
+        self.budget.deposit()
+        return time.monotonic() + self.deadlines[endpoint]
+    
+    def before_attempt(self, deadline: float) -> float:
+        """
+        Tempo restante para a próxima tentativa
+        
+        Raises:
+            DeadlineExceeded: prazo esgotado
+            CircuitOpenError: circuito aberto
+        """
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            self.stats['deadline_exceeded'] += 1
+            raise DeadlineExceeded('Service A call deadline exceeded')
+        if not self.breaker.allow():
+            raise CircuitOpenError('Service A circuit breaker is open')
+        return remaining
+    
+    def record(self, endpoint: str, seconds: float, success: bool, server_seconds: Optional[float] = None):
+        self.latency.record(endpoint, seconds)
+        if server_seconds is not None:
+            self.processing.record(endpoint, server_seconds)
+        self.breaker.record(success)
+    
+    def retry_delay(self, attempt: int, deadline: float) -> Optional[float]:
+        """Espera antes do retry (full jitter) ou None se não deve repetir"""
+        if attempt + 1 >= self.max_attempts:
+            return None
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if time.monotonic() + delay >= deadline:
+            return None
+        if not self.budget.try_spend():
+            self.stats['retries_denied_by_budget'] += 1
+            return None
+        self.stats['retries'] += 1
+        return delay
+    
+    def latency_dict(self) -> Dict:
+        return self.latency.to_dict()
+    
+    def to_dict(self) -> Dict:
+        return {
+            'deadlines_seconds': self.deadlines,
+            'max_attempts': self.max_attempts,
+            'retry_budget_tokens': self.budget.available(),
+            **self.stats,
+            'circuit_breaker': self.breaker.to_dict(),
+            'latency_ms': self.latency_dict(),
+            'service_a_processing_ms': self.processing.to_dict()
+        }
+
+
+service_a_policy = UpstreamPolicy()
+
+
 class UsersServiceClient:
     
-    def __init__(self, base_url: str):
+    def __init__(self, base_url: str, policy: UpstreamPolicy = service_a_policy):
         self.base_url = base_url
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'ProfileService/1.0',
             'Accept': 'application/json'
         })
+        self.cache = ResponseCache()
+        self.policy = policy
+    
+    def _request(self, endpoint: str, method: str, url: str, **kwargs) -> Optional[Dict]:
+        """
+        Chamada ao Service A com prazo, retries e circuit breaker
+        
+        Falhas de rede, timeouts e respostas 5xx são repetidas com backoff
+        exponencial com jitter enquanto houver prazo, tentativas e
+        orçamento de retries; cada tentativa usa como timeout o que resta
+        do prazo de `endpoint`.
+        
+        Returns:
+            JSON da resposta (None no 404)
+            
+        Raises:
+            requests.exceptions.RequestException: falha final, prazo
+                esgotado (DeadlineExceeded) ou circuito aberto (CircuitOpenError)
+        """
+        deadline = self.policy.start(endpoint)
+        attempt = 0
+        while True:
+            remaining = self.policy.before_attempt(deadline)
+            STATS['service_a_calls'] += 1
+            started = time.perf_counter()
+            server_seconds = None
+            try:
+                response = self.session.request(method, url, timeout=remaining, **kwargs)
+                server_seconds = server_timing_seconds(response.headers.get('Server-Timing'))
+                error = None
+                if response.status_code >= 500:
+                    error = requests.exceptions.HTTPError(
+                        f"{response.status_code} Server Error for url: {response.url}", response=response)
+            except requests.exceptions.RequestException as e:
+                error = e
+            self.policy.record(endpoint, time.perf_counter() - started, error is None, server_seconds)
+            
+            if error is None:
+                if response.status_code == 404:
+                    return None
+                response.raise_for_status()
+                return response.json()
+            
+            STATS['service_a_errors'] += 1
+            delay = self.policy.retry_delay(attempt, deadline)
+            if delay is None:
+                raise error
+            attempt += 1
+            time.sleep(delay)
+    
+    def _cached(self, key: str, fetch: Callable):
+        """
+        Resposta do cache ou de `fetch()`, aplicando TTL,
+        stale-while-revalidate e stale-if-error
+        
+        Raises:
+            requests.exceptions.RequestException: falha sem entrada utilizável
+        """
+        cached = self.cache.get(key)
+        if cached is not None:
+            value, age = cached
+            if age <= self.cache.ttl:
+                self.cache.count('hits')
+                return value
+            if age <= self.cache.ttl + self.cache.stale_ttl:
+                self.cache.count('stale')
+                self._revalidate(key, fetch)
+                return value
+        
+        self.cache.count('misses')
+        try:
+            value = fetch()
+        except requests.exceptions.RequestException:
+            if cached is not None and cached[1] <= self.cache.stale_if_error:
+                self.cache.count('stale_if_error')
+                logger.warning(f"Service A failed, serving cached response for {key} ({cached[1]:.0f}s old)")
+                return cached[0]
+            raise
+        self.cache.store(key, value)
+        return value
+    
+    def _revalidate(self, key: str, fetch: Callable):
+        """Atualiza a entrada em background (uma thread por chave)"""
+        with self.cache.lock:
+            if key in self.cache.revalidating:
+                return
+            self.cache.revalidating.add(key)
+        
+        def refresh():
+            try:
+                self.cache.store(key, fetch())
+                self.cache.count('revalidations')
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"Background revalidation of {key} failed: {e}")
+            finally:
+                with self.cache.lock:
+                    self.cache.revalidating.discard(key)
+        
+        threading.Thread(target=refresh, daemon=True).start()
     
     def get_all_users(self, filters: Optional[Dict] = None) -> Optional[Dict]:
         """
@@ -44,19 +639,16 @@ class UsersServiceClient:
         Returns:
             Dicionário com resposta ou None em caso de erro
         """
-        try:
-            url = f"{self.base_url}/users"
-            STATS['service_a_calls'] += 1
-            
-            response = self.session.get(url, params=filters or {}, timeout=5)
-            response.raise_for_status()
-            
-            data = response.json()
+        url = f"{self.base_url}/users"
+        
+        def fetch():
+            data = self._request('list_users', 'GET', url, params=filters or {})
             logger.info(f"Successfully fetched {data.get('total', 0)} users from Service A")
             return data
-            
+        
+        try:
+            return self._cached(f"{url}?{urlencode(sorted((filters or {}).items()))}", fetch)
         except requests.exceptions.RequestException as e:
-            STATS['service_a_errors'] += 1
             logger.error(f"Error fetching users from Service A: {e}")
             return None
     
@@ -70,22 +662,77 @@ class UsersServiceClient:
         Returns:
             Dicionário com usuário ou None em caso de erro
         """
-        try:
-            url = f"{self.base_url}/users/{user_id}"
-            STATS['service_a_calls'] += 1
-            
-            response = self.session.get(url, timeout=5)
-            response.raise_for_status()
-            
-            data = response.json()
+        url = f"{self.base_url}/users/{user_id}"
+        
+        def fetch():
+            # Usuário inexistente não é falha do Service A (e não é cacheado)
+            data = self._request('get_user', 'GET', url)
+            if data is None:
+                return None
             logger.info(f"Successfully fetched user {user_id} from Service A")
             return data.get('user')
-            
+        
+        try:
+            return self._cached(url, fetch)
         except requests.exceptions.RequestException as e:
-            STATS['service_a_errors'] += 1
             logger.error(f"Error fetching user {user_id} from Service A: {e}")
             return None
     
+    def get_users_by_ids(self, user_ids: List[int],
+                         chunk_size: int = USERS_BATCH_CHUNK_SIZE) -> Optional[List[Optional[Dict]]]:
+        """
+        Busca vários usuários do Service A via POST /users/batch
+        
+        Conjuntos grandes de IDs são divididos em lotes de chunk_size,
+        então N usuários custam ceil(N / chunk_size) chamadas em vez de N.
+        
+        Args:
+            user_ids: IDs dos usuários
+            chunk_size: Quantidade de IDs por chamada
+            
+        Returns:
+            Lista na mesma ordem de user_ids (None para IDs inexistentes)
+            ou None em caso de erro
+        """
+        users = []
+        url = f"{self.base_url}/users/batch"
+        for start in range(0, len(user_ids), chunk_size):
+            chunk = user_ids[start:start + chunk_size]
+            try:
+                data = self._request('batch_users', 'POST', url, json={'ids': chunk})
+                users.extend(None if 'error' in user else user for user in data.get('users', []))
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Error fetching batch of {len(chunk)} users from Service A: {e}")
+                return None
+        
+        logger.info(f"Successfully fetched {len(user_ids)} users by id from Service A "
+                    f"({-(-len(user_ids) // chunk_size)} calls)")
+        return users
+    
+    def iter_users(self, filters: Optional[Dict] = None, page_size: int = STREAM_PAGE_SIZE):
+        """
+        Percorre os usuários do Service A página a página (limit/cursor)
+        
+        Só uma página fica em memória por vez. Não passa pelo cache de
+        respostas: cada página é buscada uma única vez.
+        
+        Yields:
+            Lista de usuários de cada página
+            
+        Raises:
+            requests.exceptions.RequestException: falha em qualquer página
+        """
+        url = f"{self.base_url}/users"
+        params = {**(filters or {}), 'limit': page_size}
+        while True:
+            data = self._request('page_users', 'GET', url, params=params)
+            yield data.get('users', [])
+            
+            next_cursor = data.get('pagination', {}).get('next_cursor')
+            if not next_cursor:
+                return
+            params['cursor'] = next_cursor
+    
     def check_health(self) -> bool:
         """
         Verifica se Service A está disponível
@@ -95,7 +742,7 @@ class UsersServiceClient:
         """
         try:
             url = f"{self.base_url}/health"
-            response = self.session.get(url, timeout=3)
+            response = self.session.get(url, timeout=self.policy.deadlines['health'])
             return response.status_code == 200
         except requests.exceptions.RequestException:
             return False
@@ -105,113 +752,294 @@ class UsersServiceClient:
 users_client = UsersServiceClient(USERS_SERVICE_URL)
 
 
+# ============================================================================
+# RÉPLICA LOCAL DE USUÁRIOS
+# ============================================================================
+
+class UsersReplica:
+    """
+    Cópia em memória dos usuários do Service A
+    
+    Faz a carga inicial por GET /users/export (NDJSON) e se mantém
+    atualizada acompanhando GET /users/changes em long-poll, numa thread
+    própria. Cada evento traz o usuário já alterado, então aplicar um
+    evento é só substituir o registro. Se o Service A pedir resync (410:
+    posição fora da janela de retenção ou serviço reiniciado), a carga
+    completa é refeita.
+    
+    A réplica só é usada enquanto estiver "fresca": o último contato bem
+    sucedido com o Service A foi há no máximo REPLICA_MAX_STALENESS
+    segundos. Fora disso as requisições voltam a ir direto ao Service A.
+    """
+    
+    def __init__(self, client: UsersServiceClient, max_staleness: float = REPLICA_MAX_STALENESS,
+                 poll_wait: float = REPLICA_POLL_WAIT):
+        self.client = client
+        self.max_staleness = max_staleness
+        self.poll_wait = poll_wait
+        self.lock = threading.Lock()
+        self.users: Dict[int, Dict] = {}
+        self.epoch = None
+        self.seq = 0
+        self.latest_seq = 0
+        self.last_sync = None
+        self.stats = {
+            'bootstraps': 0,
+            'events_applied': 0,
+            'resyncs': 0,
+            'errors': 0
+        }
+    
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+    
+    def _run(self):
+        backoff = 1
+        while True:
+            try:
+                if self.epoch is None:
+                    self.bootstrap()
+                else:
+                    self.poll()
+                backoff = 1
+            except (requests.exceptions.RequestException, ValueError) as e:
+                self.stats['errors'] += 1
+                logger.warning(f"Replica sync failed: {e}")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+    
+    def bootstrap(self):
+        """Carga completa a partir de GET /users/export"""
+        started = time.perf_counter()
+        url = f"{self.client.base_url}/users/export"
+        with self.client.session.get(url, stream=True, timeout=(5, 60)) as response:
+            response.raise_for_status()
+            epoch = response.headers['X-Change-Epoch']
+            seq = int(response.headers['X-Change-Seq'])
+            users = {}
+            for line in response.iter_lines():
+                if line:
+                    user = json.loads(line)
+                    users[user['id']] = user
+        
+        with self.lock:
+            self.users = users
+            self.epoch = epoch
+            self.seq = self.latest_seq = seq
+            self.last_sync = time.time()
+        self.stats['bootstraps'] += 1
+        logger.info(f"Replica loaded {len(users)} users at seq {seq} in {time.perf_counter() - started:.2f}s")
+    
+    def poll(self):
+        """Aplica os eventos posteriores ao último seq (long-poll)"""
+        url = f"{self.client.base_url}/users/changes"
+        response = self.client.session.get(url, params={
+            'since': self.seq,
+            'epoch': self.epoch,
+            'wait': self.poll_wait
+        }, timeout=self.poll_wait + 5)
+        
+        if response.status_code == 410:
+            self.stats['resyncs'] += 1
+            logger.warning("Replica fell behind the Users Service change log, reloading")
+            self.epoch = None
+            return
+        response.raise_for_status()
+        
+        data = response.json()
+        with self.lock:
+            for event in data['events']:
+                self.users[event['id']] = event['user']
+            self.seq = data['next_since']
+            self.latest_seq = data['latest_seq']
+            self.last_sync = time.time()
+        self.stats['events_applied'] += len(data['events'])
+    
+    def lag_seconds(self) -> Optional[float]:
+        return time.time() - self.last_sync if self.last_sync else None
+    
+    def is_fresh(self) -> bool:
+        lag = self.lag_seconds()
+        return lag is not None and lag <= self.max_staleness
+    
+    def get(self, user_id: int) -> Optional[Dict]:
+        return self.users.get(user_id)
+    
+    def filter(self, filters: Dict) -> List[Dict]:
+        """Mesma semântica dos filtros de GET /users do Service A"""
+        with self.lock:
+            users = list(self.users.values())
+        if 'active' in filters:
+            active = filters['active'].lower() == 'true'
+            users = [u for u in users if u.get('active') == active]
+        if 'department' in filters:
+            department = filters['department'].casefold()
+            users = [u for u in users if (u.get('department') or '').casefold() == department]
+        if 'role' in filters:
+            role = filters['role'].casefold()
+            users = [u for u in users if (u.get('role') or '').casefold() == role]
+        return sorted(users, key=lambda u: u['id'])
+    
+    def to_dict(self) -> Dict:
+        lag = self.lag_seconds()
+        return {
+            'enabled': True,
+            'fresh': self.is_fresh(),
+            'users': len(self.users),
+            'epoch': self.epoch,
+            'applied_seq': self.seq,
+            'latest_seq': self.latest_seq,
+            'lag_events': self.latest_seq - self.seq,
+            'lag_seconds': round(lag, 3) if lag is not None else None,
+            'max_staleness_seconds': self.max_staleness,
+            **self.stats
+        }
+
+
+users_replica = UsersReplica(users_client) if REPLICA_ENABLED else None
+
+
+def fetch_users(filters: Dict) -> Optional[List[Dict]]:
+    """Usuários filtrados, da réplica local se estiver fresca ou do Service A"""
+    if users_replica and users_replica.is_fresh():
+        return users_replica.filter(filters)
+    response = users_client.get_all_users(filters)
+    return response.get('users', []) if response else None
+
+
+def fetch_user(user_id: int) -> Optional[Dict]:
+    """Usuário por ID, da réplica local se estiver fresca ou do Service A"""
+    if users_replica and users_replica.is_fresh():
+        return users_replica.get(user_id)
+    return users_client.get_user_by_id(user_id)
+
+
+def fetch_users_by_ids(user_ids: List[int]) -> Optional[List[Optional[Dict]]]:
+    """Usuários na ordem de user_ids, da réplica local se estiver fresca ou do Service A"""
+    if users_replica and users_replica.is_fresh():
+        return [users_replica.get(user_id) for user_id in user_ids]
+    return users_client.get_users_by_ids(user_ids)
+
+
+def iter_user_pages(filters: Dict, page_size: int = STREAM_PAGE_SIZE):
+    """Páginas de usuários filtrados, da réplica local se estiver fresca ou do Service A"""
+    if users_replica and users_replica.is_fresh():
+        users = users_replica.filter(filters)
+        return (users[i:i + page_size] for i in range(0, len(users), page_size))
+    return users_client.iter_users(filters, page_size)
+
+
+def data_source() -> str:
+    if users_replica and users_replica.is_fresh():
+        return 'Local replica of Users Service (Microservice A)'
+    return 'Users Service (Microservice A)'
+
+
 # ============================================================================
 # FUNÇÕES DE ENRIQUECIMENTO DE PERFIL
 # ============================================================================
 
-def calculate_experience_level(registration_date: str) -> str:
+EXPERIENCE_LEVELS = ("Junior", "Mid-Level", "Senior", "Expert")
+EXPERIENCE_THRESHOLDS_DAYS = (180, 365, 730)
+ACTIVITY_THRESHOLDS_HOURS = (1, 24, 168)  # 1 hora, 1 dia, 7 dias
+
+INACTIVE_ACCOUNT = {
+    'status': 'Inactive',
+    'description': 'Account deactivated',
+    'last_seen': 'N/A'
+}
+UNKNOWN_ACTIVITY = {
+    'status': 'Unknown',
+    'description': 'Unable to determine activity',
+    'last_seen': 'N/A'
+}
+
+
+def experience_level_for_days(days_active: int) -> str:
+    if days_active < 180:
+        return "Junior"
+    elif days_active < 365:
+        return "Mid-Level"
+    elif days_active < 730:
+        return "Senior"
+    else:
+        return "Expert"
+
+
+def activity_for_hours(hours_since_login: float, last_seen: str) -> Dict:
+    """Status de atividade de um usuário ativo a partir das horas desde o login"""
+    if hours_since_login < 1:
+        status = 'Online'
+        description = 'Active right now'
+    elif hours_since_login < 24:
+        status = 'Recently Active'
+        description = f'Last seen {int(hours_since_login)} hours ago'
+    elif hours_since_login < 168:  # 7 days
+        days = int(hours_since_login / 24)
+        status = 'Active This Week'
+        description = f'Last seen {days} day{"s" if days > 1 else ""} ago'
+    else:
+        days = int(hours_since_login / 24)
+        status = 'Inactive'
+        description = f'Last seen {days} days ago'
+    
+    return {
+        'status': status,
+        'description': description,
+        'last_seen': last_seen
+    }
+
+
+def calculate_experience_level(registration_date: str, now: Optional[datetime] = None) -> str:
     """
     Calcula nível de experiência baseado na data de registro
     
     Args:
         registration_date: Data de registro (ISO format)
+        now: Momento de referência (padrão: agora)
         
     Returns:
         Nível de experiência (Junior/Mid/Senior/Expert)
     """
     try:
         reg_date = datetime.fromisoformat(registration_date)
-        days_active = (datetime.now() - reg_date).days
-        
-        if days_active < 180:
-            return "Junior"
-        elif days_active < 365:
-            return "Mid-Level"
-        elif days_active < 730:
-            return "Senior"
-        else:
-            return "Expert"
+        days_active = ((now or datetime.now()) - reg_date).days
+        return experience_level_for_days(days_active)
     except Exception:
         return "Unknown"
 
 
-def calculate_activity_status(last_login: str, active: bool) -> Dict:
+def calculate_activity_status(last_login: str, active: bool, now: Optional[datetime] = None) -> Dict:
     """
     Calcula status de atividade do usuário
     
     Args:
         last_login: Data do último login (ISO format)
         active: Se usuário está ativo
+        now: Momento de referência (padrão: agora)
         
     Returns:
         Dicionário com informações de atividade
     """
     if not active:
-        return {
-            'status': 'Inactive',
-            'description': 'Account deactivated',
-            'last_seen': 'N/A'
-        }
+        return dict(INACTIVE_ACCOUNT)
     
     try:
         login_date = datetime.fromisoformat(last_login)
-        hours_since_login = (datetime.now() - login_date).total_seconds() / 3600
-        
-        if hours_since_login < 1:
-            status = 'Online'
-            description = 'Active right now'
-        elif hours_since_login < 24:
-            status = 'Recently Active'
-            description = f'Last seen {int(hours_since_login)} hours ago'
-        elif hours_since_login < 168:  # 7 days
-            days = int(hours_since_login / 24)
-            status = 'Active This Week'
-            description = f'Last seen {days} day{"s" if days > 1 else ""} ago'
-        else:
-            days = int(hours_since_login / 24)
-            status = 'Inactive'
-            description = f'Last seen {days} days ago'
-        
-        return {
-            'status': status,
-            'description': description,
-            'last_seen': login_date.strftime('%Y-%m-%d %H:%M')
-        }
+        hours_since_login = ((now or datetime.now()) - login_date).total_seconds() / 3600
+        return activity_for_hours(hours_since_login, login_date.strftime('%Y-%m-%d %H:%M'))
     except Exception:
-        return {
-            'status': 'Unknown',
-            'description': 'Unable to determine activity',
-            'last_seen': 'N/A'
-        }
+        return dict(UNKNOWN_ACTIVITY)
 
 
-def enrich_user_profile(user: Dict) -> Dict:
-    """
-    Enriquece perfil do usuário com informações adicionais
-    
-    Args:
-        user: Dados básicos do usuário do Service A
-        
-    Returns:
-        Perfil enriquecido com informações combinadas
-    """
-    STATS['profiles_generated'] += 1
-    
-    # Calcula informações adicionais
-    experience_level = calculate_experience_level(user.get('registration_date', ''))
-    activity = calculate_activity_status(user.get('last_login', ''), user.get('active', False))
-    
-    # Calcula tempo na plataforma
-    try:
-        reg_date = datetime.fromisoformat(user.get('registration_date', ''))
-        days_active = (datetime.now() - reg_date).days
-        years = days_active // 365
-        months = (days_active % 365) // 30
-    except Exception:
-        years, months = 0, 0
-    
-    # Monta perfil enriquecido
-    enriched_profile = {
+def format_tenure(years: int, months: int) -> str:
+    return f"{years} year{'s' if years != 1 else ''}, {months} month{'s' if months != 1 else ''}"
+
+
+def build_profile(user: Dict, experience_level: str, activity: Dict,
+                  tenure: str, generated_at: str) -> Dict:
+    """Monta o perfil enriquecido (comum aos caminhos individual e em lote)"""
+    return {
         # Dados básicos do usuário (Service A)
         'user_id': user.get('id'),
         'username': user.get('username'),
@@ -234,26 +1062,143 @@ def enrich_user_profile(user: Dict) -> Dict:
         # Métricas calculadas
         'metrics': {
             'member_since': user.get('registration_date', '').split('T')[0],
-            'tenure': f"{years} year{'s' if years != 1 else ''}, {months} month{'s' if months != 1 else ''}",
+            'tenure': tenure,
             'total_projects': len(user.get('projects', [])),
             'skill_count': len(user.get('skills', [])),
             'account_status': 'Active' if user.get('active') else 'Inactive'
         },
         
         # Metadata
-        'profile_generated_at': datetime.now().isoformat(),
-        'data_source': 'Users Service (Microservice A)'
+        'profile_generated_at': generated_at,
+        'data_source': data_source()
     }
+
+
+def enrich_user_profile(user: Dict, now: Optional[datetime] = None) -> Dict:
+    """
+    Enriquece perfil do usuário com informações adicionais
     
-    return enriched_profile
+    Args:
+        user: Dados básicos do usuário do Service A
+        now: Momento de referência (padrão: agora)
+        
+    Returns:
+        Perfil enriquecido com informações combinadas
+    """
+    STATS['profiles_generated'] += 1
+    now = now or datetime.now()
+    
+    # Calcula informações adicionais
+    experience_level = calculate_experience_level(user.get('registration_date', ''), now)
+    activity = calculate_activity_status(user.get('last_login', ''), user.get('active', False), now)
+    
+    # Calcula tempo na plataforma
+    try:
+        reg_date = datetime.fromisoformat(user.get('registration_date', ''))
+        days_active = (now - reg_date).days
+        years = days_active // 365
+        months = (days_active % 365) // 30
+    except Exception:
+        years, months = 0, 0
+    
+    return build_profile(user, experience_level, activity, format_tenure(years, months), now.isoformat())
+
+
+# Formato gerado pelo Service A (datetime.isoformat() sem timezone), que o
+# NumPy interpreta exatamente como datetime.fromisoformat
+SIMPLE_ISO_DATETIME = re.compile(r'\d{4}-\d{2}-\d{2}(T\d{2}:\d{2}:\d{2}(\.\d{6})?)?')
+
+
+def parse_timestamps(values: List) -> np.ndarray:
+    """
+    Converte datas ISO em datetime64[us] de uma vez (NaT onde a data é inválida)
+    
+    Strings no formato do Service A vão direto para o parser do NumPy; o
+    resto passa por datetime.fromisoformat, com as mesmas regras do caminho
+    individual (datas com timezone não podem ser comparadas com o "agora"
+    local e viram NaT).
+    """
+    parsed = np.full(len(values), np.datetime64('NaT'), dtype='datetime64[us]')
+    simple = [i for i, value in enumerate(values)
+              if isinstance(value, str) and SIMPLE_ISO_DATETIME.fullmatch(value)]
+    try:
+        parsed[simple] = np.array([values[i] for i in simple], dtype='datetime64[us]')
+        fallback = set(range(len(values))).difference(simple)
+    except ValueError:
+        fallback = range(len(values))
+    
+    for i in fallback:
+        try:
+            value = datetime.fromisoformat(values[i])
+        except (TypeError, ValueError):
+            continue
+        if value.tzinfo is None:
+            parsed[i] = np.datetime64(value, 'us')
+    return parsed
+
+
+def enrich_user_profiles(users: List[Dict], now: Optional[datetime] = None) -> List[Dict]:
+    """
+    Enriquece uma lista de usuários de uma vez
+    
+    Mesma saída de enrich_user_profile() para cada usuário (com o mesmo
+    `now`), mas cada data é convertida uma única vez e nível de
+    experiência, faixa de atividade e tempo de casa são calculados com
+    arrays datetime64 contra um único momento de referência.
+    """
+    if not users:
+        return []
+    STATS['profiles_generated'] += len(users)
+    now = now or datetime.now()
+    now64 = np.datetime64(now, 'us')
+    
+    # Tempo de casa e nível de experiência
+    registered = parse_timestamps([user.get('registration_date', '') for user in users])
+    reg_valid = ~np.isnat(registered)
+    reg_us = np.where(reg_valid, (now64 - registered).astype(np.int64), 0)
+    days_active = reg_us // 86_400_000_000  # timedelta.days arredonda para baixo
+    years = np.where(reg_valid, days_active // 365, 0).tolist()
+    months = np.where(reg_valid, (days_active % 365) // 30, 0).tolist()
+    levels = np.array(EXPERIENCE_LEVELS + ("Unknown",), dtype=object)[
+        np.where(reg_valid, np.searchsorted(EXPERIENCE_THRESHOLDS_DAYS, days_active, side='right'), 4)
+    ].tolist()
+    
+    # Horas desde o último login (mesma aritmética de timedelta.total_seconds())
+    logins = parse_timestamps([user.get('last_login', '') for user in users])
+    login_valid = (~np.isnat(logins)).tolist()
+    login_us = np.where(~np.isnat(logins), (now64 - logins).astype(np.int64), 0)
+    hours = (login_us / 10**6 / 3600).tolist()
+    last_seen = np.char.replace(np.datetime_as_string(logins, unit='m'), 'T', ' ').tolist()
+    # strftime('%Y') não completa anos < 1000 com zeros, o NumPy sim
+    for i in np.flatnonzero(logins < np.datetime64('1000-01-01')).tolist():
+        last_seen[i] = logins[i].item().strftime('%Y-%m-%d %H:%M')
+    
+    # Poucos pares (anos, meses) distintos: cada texto de tempo de casa é formatado uma vez
+    tenures = {}
+    generated_at = now.isoformat()
+    profiles = []
+    for i, user in enumerate(users):
+        if not user.get('active', False):
+            activity = dict(INACTIVE_ACCOUNT)
+        elif login_valid[i]:
+            activity = activity_for_hours(hours[i], last_seen[i])
+        else:
+            activity = dict(UNKNOWN_ACTIVITY)
+        tenure_key = (years[i], months[i])
+        tenure = tenures.get(tenure_key)
+        if tenure is None:
+            tenure = tenures[tenure_key] = format_tenure(*tenure_key)
+        profiles.append(build_profile(user, levels[i], activity, tenure, generated_at))
+    return profiles
 
 
-def generate_profile_summary(profile: Dict) -> Dict:
+def generate_profile_summary(profile: Dict, now: Optional[datetime] = None) -> Dict:
     """
     Gera resumo executivo do perfil
     
     Args:
         profile: Perfil enriquecido
+        now: Momento de referência (padrão: agora)
         
     Returns:
         Resumo executivo formatado
@@ -293,10 +1238,191 @@ def generate_profile_summary(profile: Dict) -> Dict:
             'projects_count': len(projects),
             'skills_count': len(skills)
         },
-        'generated_at': datetime.now().isoformat()
+        'generated_at': (now or datetime.now()).isoformat()
     }
 
 
+# ============================================================================
+# CACHE DE PERFIS ENRIQUECIDOS
+# ============================================================================
+
+def profile_valid_until(user: Dict, now: datetime) -> datetime:
+    """
+    Próximo instante em que algum campo dependente do tempo muda de faixa
+    
+    Nível de experiência e tempo de casa mudam quando completa mais um dia
+    desde o registro; a descrição de atividade muda a cada hora nas
+    primeiras 24h desde o login e a cada dia depois disso.
+    """
+    boundaries = [datetime.max]
+    try:
+        reg_date = datetime.fromisoformat(user.get('registration_date', ''))
+        boundaries.append(reg_date + timedelta(days=(now - reg_date).days + 1))
+    except Exception:
+        pass
+    if user.get('active', False):
+        try:
+            login_date = datetime.fromisoformat(user.get('last_login', ''))
+            hours_since_login = (now - login_date).total_seconds() / 3600
+            if hours_since_login < 24:
+                boundaries.append(login_date + timedelta(hours=int(hours_since_login) + 1))
+            else:
+                boundaries.append(login_date + timedelta(days=int(hours_since_login / 24) + 1))
+        except Exception:
+            pass
+    return min(boundaries)
+
+
+def deep_sizeof(value) -> int:
+    """Memória aproximada de um valor JSON (dicts, listas e escalares)"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(deep_sizeof(k) + deep_sizeof(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(deep_sizeof(item) for item in value)
+    return size
+
+
+class ProfileCacheEntry:
+    __slots__ = ('source', 'fingerprint', 'valid_until', 'profile', 'summary', 'size')
+    
+    def __init__(self, source: Dict, fingerprint: int, valid_until: datetime, profile: Dict):
+        # A réplica e o cache do cliente devolvem o mesmo dict enquanto o
+        # usuário não muda: nesse caso nem é preciso recalcular o hash
+        self.source = source
+        self.fingerprint = fingerprint
+        self.valid_until = valid_until
+        self.profile = profile
+        self.summary = None
+        self.size = deep_sizeof(profile)
+
+
+class ProfileCache:
+    """
+    Cache LRU de perfis e resumos, por ID do usuário + hash do registro
+    
+    Uma entrada é reutilizada enquanto o registro do Service A não mudar
+    (mesmo hash) e nenhum campo dependente do tempo tiver mudado de faixa
+    (ver profile_valid_until). Só o timestamp de geração é atualizado a
+    cada resposta.
+    """
+    
+    def __init__(self, max_entries: int = PROFILE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries: 'OrderedDict[int, ProfileCacheEntry]' = OrderedDict()
+        self.total_size = 0
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'changed': 0,
+            'expired': 0,
+            'evictions': 0
+        }
+    
+    @staticmethod
+    def fingerprint(user: Dict) -> int:
+        return hash(tuple((key, tuple(value) if isinstance(value, list) else value)
+                          for key, value in sorted(user.items())))
+    
+    def lookup(self, users: List[Dict], now: datetime) -> List[Optional[ProfileCacheEntry]]:
+        """Entrada válida de cada usuário (None quando precisa recalcular)"""
+        found = []
+        with self.lock:
+            for user in users:
+                entry = self.entries.get(user.get('id'))
+                if entry is None:
+                    self.stats['misses'] += 1
+                elif entry.source is not user and entry.fingerprint != self.fingerprint(user):
+                    self.stats['changed'] += 1
+                    entry = None
+                elif now >= entry.valid_until:
+                    self.stats['expired'] += 1
+                    entry = None
+                else:
+                    self.stats['hits'] += 1
+                    self.entries.move_to_end(user.get('id'))
+                found.append(entry)
+        return found
+    
+    def store(self, user: Dict, profile: Dict, now: datetime) -> ProfileCacheEntry:
+        entry = ProfileCacheEntry(user, self.fingerprint(user), profile_valid_until(user, now), profile)
+        with self.lock:
+            previous = self.entries.pop(user.get('id'), None)
+            if previous is not None:
+                self.total_size -= previous.size
+            self.entries[user.get('id')] = entry
+            self.total_size += entry.size
+            while len(self.entries) > self.max_entries:
+                _, evicted = self.entries.popitem(last=False)
+                self.total_size -= evicted.size
+                self.stats['evictions'] += 1
+        return entry
+    
+    def to_dict(self) -> Dict:
+        with self.lock:
+            lookups = self.stats['hits'] + self.stats['misses'] + self.stats['changed'] + self.stats['expired']
+            return {
+                **self.stats,
+                'hit_rate_percent': round(self.stats['hits'] / lookups * 100, 2) if lookups else 0,
+                'entries': len(self.entries),
+                'max_entries': self.max_entries,
+                'memory_bytes': self.total_size,
+                'bytes_per_entry': round(self.total_size / len(self.entries)) if self.entries else 0
+            }
+
+
+profile_cache = ProfileCache()
+
+
+def cached_profiles(users: List[Dict], endpoint: str,
+                    now: Optional[datetime] = None) -> List[ProfileCacheEntry]:
+    """
+    Entradas de cache dos usuários, enriquecendo em lote só os que faltam
+    
+    O tempo do lote (uma medida por chamada) vai para ENRICHMENT_LATENCY
+    sob `endpoint`. O enriquecimento é vetorizado, então o custo por perfil
+    é o tempo do lote dividido pelo número de perfis, registrado uma vez
+    por perfil em ENRICHMENT_PER_PROFILE_LATENCY; assim uma listagem de
+    1000 perfis e um único miss ficam comparáveis.
+    """
+    now = now or datetime.now()
+    entries = profile_cache.lookup(users, now)
+    missing = [i for i, entry in enumerate(entries) if entry is None]
+    if missing:
+        started = time.perf_counter()
+        profiles = enrich_user_profiles([users[i] for i in missing], now)
+        elapsed = time.perf_counter() - started
+        ENRICHMENT_LATENCY.record(endpoint, elapsed)
+        ENRICHMENT_PER_PROFILE_LATENCY.record(endpoint, elapsed / len(missing), len(missing))
+        for i, profile in zip(missing, profiles):
+            entries[i] = profile_cache.store(users[i], profile, now)
+    return entries
+
+
+def get_enriched_profiles(users: List[Dict], endpoint: str, source: Optional[str] = None) -> List[Dict]:
+    """
+    Perfis enriquecidos (com cache) na ordem de `users`
+    
+    `profile_generated_at` e `data_source` (por padrão data_source()) são
+    definidos a cada resposta, não no perfil cacheado.
+    """
+    now = datetime.now()
+    generated_at = now.isoformat()
+    source = source or data_source()
+    return [{**entry.profile, 'profile_generated_at': generated_at, 'data_source': source}
+            for entry in cached_profiles(users, endpoint, now)]
+
+
+def get_profile_summary_for(user: Dict, endpoint: str) -> Dict:
+    """Resumo executivo (com cache) de um usuário"""
+    now = datetime.now()
+    entry = cached_profiles([user], endpoint, now)[0]
+    if entry.summary is None:
+        entry.summary = generate_profile_summary(entry.profile, now)
+    return {**entry.summary, 'generated_at': now.isoformat()}
+
+
 # ============================================================================
 # MIDDLEWARE
 # ============================================================================
@@ -304,18 +1430,26 @@ def generate_profile_summary(profile: Dict) -> Dict:
 @app.before_request
 def before_request():
     """Executa antes de cada requisição"""
+    g.request_started = time.perf_counter()
     STATS['total_requests'] += 1
     logger.info(f"{request.method} {request.path} - Client: {request.remote_addr}")
 
 
+@app.after_request
+def after_request(response):
+    """Registra o tempo total por endpoint (em streaming, até o início do corpo)"""
+    REQUEST_LATENCY.record(request.endpoint or 'unmatched',
+                           time.perf_counter() - g.get('request_started', time.perf_counter()))
+    return response
+
+
 # ============================================================================
 # ENDPOINTS - INFORMAÇÕES DO SERVIÇO
 # ============================================================================
 
-@app.route('/', methods=['GET'])
-def index():
-    """Informações básicas do serviço"""
-    return jsonify({
+def service_info() -> Dict:
+    """Informações básicas do serviço (comum aos dois modos de execução)"""
+    return {
         'service': 'Profile Service (Microservice B)',
         'version': '1.0.0',
         'description': 'API REST que enriquece dados de usuários consumindo o Users Service',
@@ -325,37 +1459,43 @@ def index():
             'profile_detail': '/profiles/<id>',
             'profile_summary': '/profiles/<id>/summary',
             'health': '/health',
-            'stats': '/stats'
+            'stats': '/stats',
+            'metrics': '/metrics'
         },
         'timestamp': datetime.now().isoformat()
-    })
+    }
 
 
-@app.route('/health', methods=['GET'])
-def health():
-    """Health check do serviço e dependências"""
-    service_a_healthy = users_client.check_health()
-    
+def health_report(service_a_healthy: bool) -> tuple:
+    """Corpo e status HTTP do health check"""
     uptime = (datetime.now() - datetime.fromisoformat(STATS['start_time'])).total_seconds()
     
-    overall_status = 'healthy' if service_a_healthy else 'degraded'
+    breaker = service_a_policy.breaker.to_dict()
+    overall_status = 'healthy' if service_a_healthy and breaker['state'] == CircuitBreaker.CLOSED else 'degraded'
     
-    return jsonify({
+    # Com a réplica fresca os perfis continuam sendo servidos sem o Service A
+    replica_fresh = bool(users_replica and users_replica.is_fresh())
+    
+    return {
         'status': overall_status,
         'service': 'Profile Service',
         'uptime_seconds': round(uptime, 2),
         'dependencies': {
             'users_service': {
                 'status': 'available' if service_a_healthy else 'unavailable',
-                'url': USERS_SERVICE_URL
+                'url': USERS_SERVICE_URL,
+                'circuit_breaker': breaker,
+                'latency_ms': service_a_policy.latency_dict()
+            },
+            'users_replica': {
+                'status': ('fresh' if replica_fresh else 'stale') if users_replica else 'disabled'
             }
         },
         'timestamp': datetime.now().isoformat()
-    }), 200 if service_a_healthy else 503
+    }, 200 if service_a_healthy or replica_fresh else 503
 
 
-@app.route('/stats', methods=['GET'])
-def stats():
+def stats_report(client_cache: ResponseCache) -> Dict:
     """Estatísticas detalhadas do serviço"""
     uptime = (datetime.now() - datetime.fromisoformat(STATS['start_time'])).total_seconds()
     
@@ -363,8 +1503,9 @@ def stats():
     total_calls = STATS['service_a_calls']
     error_rate = (STATS['service_a_errors'] / total_calls * 100) if total_calls > 0 else 0
     
-    return jsonify({
+    return {
         'service': 'Profile Service',
+        'serving_mode': SERVING_MODE,
         'uptime_seconds': round(uptime, 2),
         'requests': {
             'total': STATS['total_requests'],
@@ -374,10 +1515,81 @@ def stats():
             'total_calls': STATS['service_a_calls'],
             'errors': STATS['service_a_errors'],
             'error_rate_percent': round(error_rate, 2),
-            'url': USERS_SERVICE_URL
+            'url': USERS_SERVICE_URL,
+            'resilience': service_a_policy.to_dict(),
+            'cache': client_cache.to_dict()
+        },
+        'profile_cache': profile_cache.to_dict(),
+        'replica': users_replica.to_dict() if users_replica else {'enabled': False},
+        'latency_ms': {
+            'handler': REQUEST_LATENCY.to_dict(),
+            'enrichment': ENRICHMENT_LATENCY.to_dict(),
+            'enrichment_per_profile': ENRICHMENT_PER_PROFILE_LATENCY.to_dict()
         },
         'timestamp': datetime.now().isoformat()
-    })
+    }
+
+
+def metrics_report(client_cache: ResponseCache) -> str:
+    """Métricas no formato de exposição do Prometheus"""
+    breaker_state = service_a_policy.breaker.to_dict()['state']
+    cache = client_cache.to_dict()
+    lines = [
+        *prometheus_metric('profile_service_requests_total', 'counter',
+                           'HTTP requests received', STATS['total_requests']),
+        *prometheus_metric('profile_service_profiles_generated_total', 'counter',
+                           'Profiles enriched (cache misses)', STATS['profiles_generated']),
+        *prometheus_metric('profile_service_service_a_calls_total', 'counter',
+                           'Attempts to call the Users Service', STATS['service_a_calls']),
+        *prometheus_metric('profile_service_service_a_errors_total', 'counter',
+                           'Failed attempts to call the Users Service', STATS['service_a_errors']),
+        *prometheus_metric('profile_service_service_a_retries_total', 'counter',
+                           'Retried Users Service calls', service_a_policy.stats['retries']),
+        *prometheus_metric('profile_service_response_cache_hits_total', 'counter',
+                           'Users Service responses served from cache', cache['hits'] + cache['stale']),
+        *prometheus_metric('profile_service_response_cache_misses_total', 'counter',
+                           'Users Service responses not found in cache', cache['misses']),
+        '# HELP profile_service_circuit_breaker_state Users Service circuit breaker state',
+        '# TYPE profile_service_circuit_breaker_state gauge',
+        *(f'profile_service_circuit_breaker_state{{state="{state}"}} {int(state == breaker_state)}'
+          for state in (CircuitBreaker.CLOSED, CircuitBreaker.OPEN, CircuitBreaker.HALF_OPEN)),
+        *REQUEST_LATENCY.prometheus('profile_service_request_duration_seconds',
+                                    'Total request handling time by endpoint'),
+        *service_a_policy.latency.prometheus('profile_service_service_a_duration_seconds',
+                                             'Users Service call time seen by this service, per attempt'),
+        *service_a_policy.processing.prometheus('profile_service_service_a_processing_seconds',
+                                                'Users Service processing time reported in Server-Timing'),
+        *ENRICHMENT_LATENCY.prometheus('profile_service_enrichment_seconds',
+                                       'Profile enrichment time per request by endpoint (cache misses only)'),
+        *ENRICHMENT_PER_PROFILE_LATENCY.prometheus('profile_service_enrichment_per_profile_seconds',
+                                                   'Profile enrichment time per profile by endpoint (batch time / batch size)')
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+@app.route('/', methods=['GET'])
+def index():
+    """Informações básicas do serviço"""
+    return jsonify(service_info())
+
+
+@app.route('/health', methods=['GET'])
+def health():
+    """Health check do serviço e dependências"""
+    body, status = health_report(users_client.check_health())
+    return jsonify(body), status
+
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    """Estatísticas detalhadas do serviço"""
+    return jsonify(stats_report(users_client.cache))
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Métricas no formato de exposição do Prometheus"""
+    return app.response_class(metrics_report(users_client.cache), mimetype='text/plain; version=0.0.4')
 
 
 # ============================================================================
@@ -393,7 +1605,17 @@ def get_profiles():
         active (bool): Filtra por status ativo/inativo
         department (str): Filtra por departamento
         role (str): Filtra por cargo
+        ids (str): Lista de IDs separados por vírgula; retorna os perfis
+            nessa ordem (filtros são ignorados)
+        stream (int): 1 para resposta NDJSON em streaming (também com
+            Accept: application/x-ndjson)
     """
+    if request.args.get('ids'):
+        return get_profiles_by_ids(request.args.get('ids'))
+    
+    stream = request.args.get('stream') == '1' or request.accept_mimetypes.best_match(
+        ['application/json', 'application/x-ndjson']) == 'application/x-ndjson'
+    
     # Obtém filtros da query string
     filters = {}
     if request.args.get('active'):
@@ -403,19 +1625,21 @@ def get_profiles():
     if request.args.get('role'):
         filters['role'] = request.args.get('role')
     
-    # Busca usuários do Service A
-    response = users_client.get_all_users(filters)
+    if stream:
+        return stream_profiles(filters)
     
-    if not response:
+    # Busca usuários (réplica local ou Service A)
+    users = fetch_users(filters)
+    
+    if users is None:
         return jsonify({
             'error': 'Unable to fetch users from Users Service',
             'service_a_url': USERS_SERVICE_URL
         }), 503
     
-    users = response.get('users', [])
-    
-    # Enriquece cada perfil
-    enriched_profiles = [enrich_user_profile(user) for user in users]
+    # Enriquece todos os perfis de uma vez (reaproveitando o cache)
+    source = data_source()
+    enriched_profiles = get_enriched_profiles(users, request.endpoint, source)
     
     logger.info(f"Generated {len(enriched_profiles)} enriched profiles")
     
@@ -423,7 +1647,83 @@ def get_profiles():
         'total': len(enriched_profiles),
         'profiles': enriched_profiles,
         'filters_applied': filters,
-        'data_source': 'Users Service (Microservice A)',
+        'data_source': source,
+        'timestamp': datetime.now().isoformat()
+    })
+
+
+def stream_profiles(filters: Dict):
+    """
+    Perfis enriquecidos em NDJSON (um perfil por linha), gerados página a página
+    
+    Cada página de usuários é enriquecida e enviada assim que chega, então
+    o primeiro byte sai depois da primeira página e a memória fica limitada
+    a uma página, independente do total de usuários. Uma falha do Service A
+    no meio do stream vira uma última linha {"error": ...}.
+    """
+    pages = iter_user_pages(filters)
+    
+    # A primeira página é buscada antes de responder para ainda poder devolver 503
+    try:
+        first_page = next(pages, [])
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Error fetching users from Service A: {e}")
+        return jsonify({
+            'error': 'Unable to fetch users from Users Service',
+            'service_a_url': USERS_SERVICE_URL
+        }), 503
+    
+    # O gerador roda fora do contexto da requisição
+    endpoint = request.endpoint
+    
+    def generate():
+        total = 0
+        page = first_page
+        try:
+            while True:
+                if page:
+                    profiles = get_enriched_profiles(page, endpoint)
+                    total += len(profiles)
+                    yield ''.join(json.dumps(profile, sort_keys=True, separators=(',', ':')) + '\n'
+                                  for profile in profiles)
+                page = next(pages, None)
+                if page is None:
+                    break
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Profile stream interrupted after {total} profiles: {e}")
+            yield json.dumps({'error': 'Users Service failed during the stream', 'profiles_sent': total}) + '\n'
+            return
+        logger.info(f"Streamed {total} enriched profiles")
+    
+    return app.response_class(generate(), mimetype='application/x-ndjson')
+
+
+def get_profiles_by_ids(raw_ids: str):
+    """Perfis enriquecidos de um conjunto de IDs, com uma chamada por lote"""
+    try:
+        user_ids = [int(part) for part in raw_ids.split(',') if part.strip()]
+    except ValueError:
+        return jsonify({'error': 'ids must be a comma-separated list of integers'}), 400
+    
+    users = fetch_users_by_ids(user_ids)
+    
+    if users is None:
+        return jsonify({
+            'error': 'Unable to fetch users from Users Service',
+            'service_a_url': USERS_SERVICE_URL
+        }), 503
+    
+    source = data_source()
+    enriched_profiles = get_enriched_profiles([user for user in users if user], request.endpoint, source)
+    not_found = [user_id for user_id, user in zip(user_ids, users) if not user]
+    
+    logger.info(f"Generated {len(enriched_profiles)} enriched profiles by id")
+    
+    return jsonify({
+        'total': len(enriched_profiles),
+        'profiles': enriched_profiles,
+        'not_found': not_found,
+        'data_source': source,
         'timestamp': datetime.now().isoformat()
     })
 
@@ -431,8 +1731,8 @@ def get_profiles():
 @app.route('/profiles/<int:user_id>', methods=['GET'])
 def get_profile(user_id):
     """Busca perfil enriquecido de usuário específico"""
-    # Busca usuário do Service A
-    user = users_client.get_user_by_id(user_id)
+    # Busca usuário (réplica local ou Service A)
+    user = fetch_user(user_id)
     
     if not user:
         return jsonify({
@@ -442,7 +1742,7 @@ def get_profile(user_id):
         }), 404
     
     # Enriquece perfil
-    enriched_profile = enrich_user_profile(user)
+    enriched_profile = get_enriched_profiles([user], request.endpoint)[0]
     
     logger.info(f"Generated enriched profile for user {user_id}")
     
@@ -460,8 +1760,8 @@ def get_profile_summary(user_id):
     Retorna uma descrição textual formatada combinando informações do Service A
     com análises calculadas pelo Service B.
     """
-    # Busca usuário do Service A
-    user = users_client.get_user_by_id(user_id)
+    # Busca usuário (réplica local ou Service A)
+    user = fetch_user(user_id)
     
     if not user:
         return jsonify({
@@ -470,8 +1770,7 @@ def get_profile_summary(user_id):
         }), 404
     
     # Enriquece perfil e gera resumo
-    enriched_profile = enrich_user_profile(user)
-    summary = generate_profile_summary(enriched_profile)
+    summary = get_profile_summary_for(user, request.endpoint)
     
     logger.info(f"Generated summary for user {user_id}")
     
@@ -483,14 +1782,26 @@ def get_profile_summary(user_id):
 # ============================================================================
 
 if __name__ == '__main__':
+    if SERVING_MODE == 'async':
+        # async_app importa este módulo como "app": registra o módulo já
+        # carregado para não criar um segundo conjunto de caches e STATS
+        sys.modules.setdefault('app', sys.modules[__name__])
+        import async_app
+        async_app.main()
+        sys.exit(0)
+    
     logger.info("=" * 60)
     logger.info("Starting Profile Service (Microservice B)")
     logger.info(f"Users Service URL: {USERS_SERVICE_URL}")
     logger.info("=" * 60)
     
+    if users_replica:
+        logger.info(f"Local users replica enabled (max staleness {REPLICA_MAX_STALENESS}s)")
+        users_replica.start()
+    
     # Inicia servidor
     app.run(
         host='0.0.0.0',
-        port=5001,
+        port=SERVICE_PORT,
         debug=False
     )
@@ -0,0 +1,599 @@
+"""
+Profile Service (Microservice B) - modo de execução assíncrono
+
+Mesmos endpoints, enriquecimento e caches de app.py, servidos com aiohttp
+num único event loop. As chamadas ao Service A usam um cliente HTTP
+assíncrono com pool de conexões limitado (ASYNC_POOL_SIZE): enquanto uma
+resposta lenta do Service A não chega, o loop segue atendendo outras
+requisições, em vez de prender uma thread por chamada.
+
+Iniciado por app.py com SERVING_MODE=async (ou direto: python async_app.py).
+"""
+
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+from functools import partial
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlencode
+
+import aiohttp
+from aiohttp import web
+
+from app import (
+    REPLICA_MAX_STALENESS,
+    SERVICE_PORT,
+    STATS,
+    STREAM_PAGE_SIZE,
+    USERS_BATCH_CHUNK_SIZE,
+    USERS_SERVICE_URL,
+    REQUEST_LATENCY,
+    CircuitOpenError,
+    DeadlineExceeded,
+    ResponseCache,
+    UpstreamPolicy,
+    get_enriched_profiles,
+    get_profile_summary_for,
+    health_report,
+    logger,
+    metrics_report,
+    service_a_policy,
+    server_timing_seconds,
+    service_info,
+    stats_report,
+    users_replica
+)
+
+# Conexões simultâneas com o Service A (compartilhadas por todas as requisições)
+ASYNC_POOL_SIZE = int(os.getenv('ASYNC_POOL_SIZE', 100))
+
+# Lotes de POST /users/batch em paralelo por requisição de /profiles?ids=
+ASYNC_FETCH_CONCURRENCY = int(os.getenv('ASYNC_FETCH_CONCURRENCY', 8))
+
+# Falhas de rede, status HTTP de erro e timeouts do cliente aiohttp, corpo
+# que não é JSON (no modo threaded o requests levanta RequestException), mais
+# prazo esgotado e circuito aberto (UpstreamPolicy)
+UPSTREAM_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, json.JSONDecodeError,
+                   CircuitOpenError, DeadlineExceeded)
+
+encode_json = partial(json.dumps, sort_keys=True, separators=(',', ':'))
+
+
+def describe(error: Exception) -> str:
+    """Mensagem de log de uma falha (timeouts do asyncio não têm texto)"""
+    return str(error) or type(error).__name__
+
+
+def json_response(data, status: int = 200) -> web.Response:
+    """Resposta JSON no mesmo formato do jsonify do Flask"""
+    return web.json_response(data, status=status, dumps=encode_json)
+
+
+class AsyncUsersServiceClient:
+    """
+    Versão assíncrona do UsersServiceClient
+    
+    Usa o mesmo ResponseCache (TTL, stale-while-revalidate e
+    stale-if-error) e a mesma UpstreamPolicy (prazos, retries e circuit
+    breaker); a revalidação em background é uma task do loop em vez de uma
+    thread.
+    """
+    
+    def __init__(self, base_url: str, pool_size: int = ASYNC_POOL_SIZE,
+                 policy: UpstreamPolicy = service_a_policy):
+        self.base_url = base_url
+        self.pool_size = pool_size
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.cache = ResponseCache()
+        self.policy = policy
+        self.tasks = set()
+    
+    async def start(self):
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.pool_size),
+            headers={
+                'User-Agent': 'ProfileService/1.0',
+                'Accept': 'application/json'
+            }
+        )
+    
+    async def close(self):
+        if self.session:
+            await self.session.close()
+    
+    async def _cached(self, key: str, fetch: Callable):
+        """
+        Resposta do cache ou de `await fetch()`, com as mesmas regras de
+        UsersServiceClient._cached
+        
+        Raises:
+            aiohttp.ClientError, asyncio.TimeoutError: falha sem entrada utilizável
+        """
+        cached = self.cache.get(key)
+        if cached is not None:
+            value, age = cached
+            if age <= self.cache.ttl:
+                self.cache.count('hits')
+                return value
+            if age <= self.cache.ttl + self.cache.stale_ttl:
+                self.cache.count('stale')
+                self._revalidate(key, fetch)
+                return value
+        
+        self.cache.count('misses')
+        try:
+            value = await fetch()
+        except UPSTREAM_ERRORS:
+            if cached is not None and cached[1] <= self.cache.stale_if_error:
+                self.cache.count('stale_if_error')
+                logger.warning(f"Service A failed, serving cached response for {key} ({cached[1]:.0f}s old)")
+                return cached[0]
+            raise
+        self.cache.store(key, value)
+        return value
+    
+    def _revalidate(self, key: str, fetch: Callable):
+        """Atualiza a entrada em background (uma task por chave)"""
+        with self.cache.lock:
+            if key in self.cache.revalidating:
+                return
+            self.cache.revalidating.add(key)
+        
+        async def refresh():
+            try:
+                self.cache.store(key, await fetch())
+                self.cache.count('revalidations')
+            except UPSTREAM_ERRORS as e:
+                logger.warning(f"Background revalidation of {key} failed: {describe(e)}")
+            finally:
+                with self.cache.lock:
+                    self.cache.revalidating.discard(key)
+        
+        # O loop só guarda referência fraca às tasks
+        task = asyncio.create_task(refresh())
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+    
+    async def _request(self, endpoint: str, method: str, url: str, **kwargs) -> Optional[Dict]:
+        """
+        Chamada ao Service A com prazo, retries e circuit breaker (mesmas
+        regras de UsersServiceClient._request)
+        
+        Returns:
+            JSON da resposta (None no 404)
+        """
+        deadline = self.policy.start(endpoint)
+        attempt = 0
+        while True:
+            remaining = self.policy.before_attempt(deadline)
+            STATS['service_a_calls'] += 1
+            started = time.perf_counter()
+            try:
+                async with self.session.request(method, url, timeout=aiohttp.ClientTimeout(total=remaining),
+                                                **kwargs) as response:
+                    body = await response.read()
+                    server_seconds = server_timing_seconds(response.headers.get('Server-Timing'))
+                    error = None
+                    if response.status >= 500:
+                        error = aiohttp.ClientResponseError(response.request_info, response.history,
+                                                            status=response.status, message=response.reason)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error, server_seconds = e, None
+            self.policy.record(endpoint, time.perf_counter() - started, error is None, server_seconds)
+            
+            if error is None:
+                if response.status == 404:
+                    return None
+                response.raise_for_status()
+                return json.loads(body)
+            
+            STATS['service_a_errors'] += 1
+            delay = self.policy.retry_delay(attempt, deadline)
+            if delay is None:
+                raise error
+            attempt += 1
+            await asyncio.sleep(delay)
+    
+    async def get_all_users(self, filters: Optional[Dict] = None) -> Optional[Dict]:
+        """Busca todos os usuários do Service A (None em caso de erro)"""
+        url = f"{self.base_url}/users"
+        
+        async def fetch():
+            data = await self._request('list_users', 'GET', url, params=filters or {})
+            logger.info(f"Successfully fetched {data.get('total', 0)} users from Service A")
+            return data
+        
+        try:
+            return await self._cached(f"{url}?{urlencode(sorted((filters or {}).items()))}", fetch)
+        except UPSTREAM_ERRORS as e:
+            logger.error(f"Error fetching users from Service A: {describe(e)}")
+            return None
+    
+    async def get_user_by_id(self, user_id: int) -> Optional[Dict]:
+        """Busca usuário específico do Service A (None se inexistente ou em caso de erro)"""
+        url = f"{self.base_url}/users/{user_id}"
+        
+        async def fetch():
+            # Usuário inexistente não é falha do Service A (e não é cacheado)
+            data = await self._request('get_user', 'GET', url)
+            if data is None:
+                return None
+            logger.info(f"Successfully fetched user {user_id} from Service A")
+            return data.get('user')
+        
+        try:
+            return await self._cached(url, fetch)
+        except UPSTREAM_ERRORS as e:
+            logger.error(f"Error fetching user {user_id} from Service A: {describe(e)}")
+            return None
+    
+    async def get_users_by_ids(self, user_ids: List[int], chunk_size: int = USERS_BATCH_CHUNK_SIZE,
+                               concurrency: int = ASYNC_FETCH_CONCURRENCY) -> Optional[List[Optional[Dict]]]:
+        """
+        Busca vários usuários do Service A via POST /users/batch
+        
+        Os lotes são buscados em paralelo, no máximo `concurrency` ao mesmo
+        tempo, para que uma lista grande de IDs não ocupe sozinha o pool
+        de conexões.
+        
+        Returns:
+            Lista na mesma ordem de user_ids (None para IDs inexistentes)
+            ou None em caso de erro
+        """
+        url = f"{self.base_url}/users/batch"
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def fetch_chunk(chunk: List[int]) -> List[Optional[Dict]]:
+            async with semaphore:
+                data = await self._request('batch_users', 'POST', url, json={'ids': chunk})
+            return [None if 'error' in user else user for user in data.get('users', [])]
+        
+        chunks = [user_ids[start:start + chunk_size] for start in range(0, len(user_ids), chunk_size)]
+        try:
+            results = await asyncio.gather(*(fetch_chunk(chunk) for chunk in chunks))
+        except UPSTREAM_ERRORS as e:
+            logger.error(f"Error fetching batch of {len(user_ids)} users from Service A: {describe(e)}")
+            return None
+        
+        logger.info(f"Successfully fetched {len(user_ids)} users by id from Service A "
+                    f"({len(chunks)} calls)")
+        return [user for chunk in results for user in chunk]
+    
+    async def iter_users(self, filters: Optional[Dict] = None, page_size: int = STREAM_PAGE_SIZE):
+        """
+        Percorre os usuários do Service A página a página (limit/cursor)
+        
+        Raises:
+            aiohttp.ClientError, asyncio.TimeoutError: falha em qualquer página
+        """
+        url = f"{self.base_url}/users"
+        params = {**(filters or {}), 'limit': page_size}
+        while True:
+            data = await self._request('page_users', 'GET', url, params=params)
+            yield data.get('users', [])
+            
+            next_cursor = data.get('pagination', {}).get('next_cursor')
+            if not next_cursor:
+                return
+            params['cursor'] = next_cursor
+    
+    async def check_health(self) -> bool:
+        try:
+            async with self.session.get(f"{self.base_url}/health",
+                                        timeout=aiohttp.ClientTimeout(total=self.policy.deadlines['health'])) as response:
+                return response.status == 200
+        except UPSTREAM_ERRORS:
+            return False
+
+
+users_client = AsyncUsersServiceClient(USERS_SERVICE_URL)
+
+
+def replica_is_fresh() -> bool:
+    return bool(users_replica and users_replica.is_fresh())
+
+
+async def fetch_users(filters: Dict) -> Optional[List[Dict]]:
+    """Usuários filtrados, da réplica local se estiver fresca ou do Service A"""
+    if replica_is_fresh():
+        return users_replica.filter(filters)
+    response = await users_client.get_all_users(filters)
+    return response.get('users', []) if response else None
+
+
+async def fetch_user(user_id: int) -> Optional[Dict]:
+    """Usuário por ID, da réplica local se estiver fresca ou do Service A"""
+    if replica_is_fresh():
+        return users_replica.get(user_id)
+    return await users_client.get_user_by_id(user_id)
+
+
+async def fetch_users_by_ids(user_ids: List[int]) -> Optional[List[Optional[Dict]]]:
+    """Usuários na ordem de user_ids, da réplica local se estiver fresca ou do Service A"""
+    if replica_is_fresh():
+        return [users_replica.get(user_id) for user_id in user_ids]
+    return await users_client.get_users_by_ids(user_ids)
+
+
+async def iter_user_pages(filters: Dict, page_size: int = STREAM_PAGE_SIZE):
+    """Páginas de usuários filtrados, da réplica local se estiver fresca ou do Service A"""
+    if replica_is_fresh():
+        users = users_replica.filter(filters)
+        for i in range(0, len(users), page_size):
+            yield users[i:i + page_size]
+        return
+    async for page in users_client.iter_users(filters, page_size):
+        yield page
+
+
+def data_source() -> str:
+    if replica_is_fresh():
+        return 'Local replica of Users Service (Microservice A)'
+    return 'Users Service (Microservice A)'
+
+
+async def run_blocking(func: Callable, *args):
+    """
+    Executa trabalho de CPU (enriquecimento e serialização de listas) no
+    executor padrão para não parar o event loop durante respostas grandes
+    """
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+
+def unavailable_response() -> web.Response:
+    return json_response({
+        'error': 'Unable to fetch users from Users Service',
+        'service_a_url': USERS_SERVICE_URL
+    }, 503)
+
+
+def prefers_ndjson(accept: str) -> bool:
+    """Mesma escolha do accept_mimetypes.best_match do Flask entre JSON e NDJSON"""
+    quality = {}
+    for part in accept.split(','):
+        media_type, _, params = part.strip().partition(';')
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        quality[media_type.strip().lower()] = max(q, quality.get(media_type.strip().lower(), 0.0))
+    wildcard = max(quality.get('*/*', 0.0), quality.get('application/*', 0.0))
+    return quality.get('application/x-ndjson', 0.0) > quality.get('application/json', wildcard)
+
+
+# ============================================================================
+# MIDDLEWARE
+# ============================================================================
+
+def endpoint_name(request: web.Request) -> str:
+    """Mesmos nomes de endpoint do Flask (nome da função do handler)"""
+    match_info = request.match_info
+    return 'unmatched' if match_info.http_exception else match_info.handler.__name__
+
+
+@web.middleware
+async def count_requests(request: web.Request, handler):
+    """Executa antes de cada requisição e registra o tempo total por endpoint"""
+    started = time.perf_counter()
+    STATS['total_requests'] += 1
+    logger.info(f"{request.method} {request.path} - Client: {request.remote}")
+    try:
+        return await handler(request)
+    finally:
+        REQUEST_LATENCY.record(endpoint_name(request), time.perf_counter() - started)
+
+
+# ============================================================================
+# ENDPOINTS
+# ============================================================================
+
+routes = web.RouteTableDef()
+
+
+@routes.get('/')
+async def index(request: web.Request):
+    """Informações básicas do serviço"""
+    return json_response(service_info())
+
+
+@routes.get('/health')
+async def health(request: web.Request):
+    """Health check do serviço e dependências"""
+    body, status = health_report(await users_client.check_health())
+    return json_response(body, status)
+
+
+@routes.get('/stats')
+async def stats(request: web.Request):
+    """Estatísticas detalhadas do serviço"""
+    return json_response(stats_report(users_client.cache))
+
+
+@routes.get('/metrics')
+async def metrics(request: web.Request):
+    """Métricas no formato de exposição do Prometheus"""
+    return web.Response(text=metrics_report(users_client.cache),
+                        headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'})
+
+
+@routes.get('/profiles')
+async def get_profiles(request: web.Request):
+    """Lista perfis enriquecidos (mesmos parâmetros do modo threaded)"""
+    query = request.query
+    if query.get('ids'):
+        return await get_profiles_by_ids(query.get('ids'), endpoint_name(request))
+    
+    stream = query.get('stream') == '1' or prefers_ndjson(request.headers.get('Accept', ''))
+    
+    filters = {name: query.get(name) for name in ('active', 'department', 'role') if query.get(name)}
+    
+    if stream:
+        return await stream_profiles(request, filters)
+    
+    users = await fetch_users(filters)
+    
+    if users is None:
+        return unavailable_response()
+    
+    endpoint = endpoint_name(request)
+    
+    def build_body() -> str:
+        source = data_source()
+        enriched_profiles = get_enriched_profiles(users, endpoint, source)
+        logger.info(f"Generated {len(enriched_profiles)} enriched profiles")
+        return encode_json({
+            'total': len(enriched_profiles),
+            'profiles': enriched_profiles,
+            'filters_applied': filters,
+            'data_source': source,
+            'timestamp': datetime.now().isoformat()
+        })
+    
+    return web.Response(text=await run_blocking(build_body), content_type='application/json')
+
+
+async def stream_profiles(request: web.Request, filters: Dict) -> web.StreamResponse:
+    """Perfis enriquecidos em NDJSON, gerados e enviados página a página"""
+    pages = iter_user_pages(filters)
+    
+    # A primeira página é buscada antes de responder para ainda poder devolver 503
+    try:
+        page = await anext(pages, [])
+    except UPSTREAM_ERRORS as e:
+        logger.error(f"Error fetching users from Service A: {describe(e)}")
+        return unavailable_response()
+    
+    endpoint = endpoint_name(request)
+    
+    def encode_page(users: List[Dict]) -> bytes:
+        return ''.join(encode_json(profile) + '\n' for profile in get_enriched_profiles(users, endpoint)).encode()
+    
+    response = web.StreamResponse(headers={'Content-Type': 'application/x-ndjson'})
+    await response.prepare(request)
+    total = 0
+    try:
+        while page is not None:
+            if page:
+                await response.write(await run_blocking(encode_page, page))
+                total += len(page)
+            page = await anext(pages, None)
+    except UPSTREAM_ERRORS as e:
+        logger.error(f"Profile stream interrupted after {total} profiles: {describe(e)}")
+        await response.write((json.dumps({'error': 'Users Service failed during the stream',
+                                          'profiles_sent': total}) + '\n').encode())
+    else:
+        logger.info(f"Streamed {total} enriched profiles")
+    await response.write_eof()
+    return response
+
+
+async def get_profiles_by_ids(raw_ids: str, endpoint: str) -> web.Response:
+    """Perfis enriquecidos de um conjunto de IDs, com lotes buscados em paralelo"""
+    try:
+        user_ids = [int(part) for part in raw_ids.split(',') if part.strip()]
+    except ValueError:
+        return json_response({'error': 'ids must be a comma-separated list of integers'}, 400)
+    
+    users = await fetch_users_by_ids(user_ids)
+    
+    if users is None:
+        return unavailable_response()
+    
+    def build_body() -> str:
+        source = data_source()
+        enriched_profiles = get_enriched_profiles([user for user in users if user], endpoint, source)
+        logger.info(f"Generated {len(enriched_profiles)} enriched profiles by id")
+        return encode_json({
+            'total': len(enriched_profiles),
+            'profiles': enriched_profiles,
+            'not_found': [user_id for user_id, user in zip(user_ids, users) if not user],
+            'data_source': source,
+            'timestamp': datetime.now().isoformat()
+        })
+    
+    return web.Response(text=await run_blocking(build_body), content_type='application/json')
+
+
+@routes.get(r'/profiles/{user_id:\d+}')
+async def get_profile(request: web.Request):
+    """Busca perfil enriquecido de usuário específico"""
+    user_id = int(request.match_info['user_id'])
+    user = await fetch_user(user_id)
+    
+    if not user:
+        return json_response({
+            'error': 'User not found or service unavailable',
+            'user_id': user_id,
+            'service_a_url': USERS_SERVICE_URL
+        }, 404)
+    
+    # Um único perfil: barato o bastante para rodar no próprio loop
+    enriched_profile = get_enriched_profiles([user], endpoint_name(request))[0]
+    
+    logger.info(f"Generated enriched profile for user {user_id}")
+    
+    return json_response({
+        'profile': enriched_profile,
+        'timestamp': datetime.now().isoformat()
+    })
+
+
+@routes.get(r'/profiles/{user_id:\d+}/summary')
+async def get_profile_summary(request: web.Request):
+    """Busca resumo executivo do perfil do usuário"""
+    user_id = int(request.match_info['user_id'])
+    user = await fetch_user(user_id)
+    
+    if not user:
+        return json_response({
+            'error': 'User not found or service unavailable',
+            'user_id': user_id
+        }, 404)
+    
+    summary = get_profile_summary_for(user, endpoint_name(request))
+    
+    logger.info(f"Generated summary for user {user_id}")
+    
+    return json_response(summary)
+
+
+# ============================================================================
+# INICIALIZAÇÃO
+# ============================================================================
+
+def create_app() -> web.Application:
+    application = web.Application(middlewares=[count_requests])
+    application.add_routes(routes)
+    
+    async def client_context(_app):
+        await users_client.start()
+        yield
+        await users_client.close()
+    
+    application.cleanup_ctx.append(client_context)
+    return application
+
+
+def main():
+    logger.info("=" * 60)
+    logger.info("Starting Profile Service (Microservice B) - async mode")
+    logger.info(f"Users Service URL: {USERS_SERVICE_URL}")
+    logger.info(f"Connection pool: {ASYNC_POOL_SIZE}, batch concurrency: {ASYNC_FETCH_CONCURRENCY}")
+    logger.info("=" * 60)
+    
+    # A réplica continua numa thread própria, com o cliente síncrono
+    if users_replica:
+        logger.info(f"Local users replica enabled (max staleness {REPLICA_MAX_STALENESS}s)")
+        users_replica.start()
+    
+    web.run_app(create_app(), host='0.0.0.0', port=SERVICE_PORT, access_log=None, print=None)
+
+
+if __name__ == '__main__':
+    main()